@@ -0,0 +1,279 @@
+"""
+Load test of the ORM and AsyncPGClient against a local PostgreSQL.
+
+Every combination of pool size, concurrency and model width runs a mixed
+workload of create, get, filter().all() and update from asyncio workers
+for a fixed duration. The tables are created from the benchmark models
+and dropped afterwards.
+
+    python -m benchmarks.load --dsn postgresql://postgres@localhost/postgres
+    python -m benchmarks.load --pool-sizes 5 20 --concurrency 10 100 \\
+        --widths 1 10 --mix create=1 get=4 filter=2 update=1 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Type
+
+from benchmarks.run import model_of_width
+from pyasync_orm.clients.asyncpg_client import AsyncPGClient
+from pyasync_orm.models import Model
+from pyasync_orm.orm import ORM
+
+FILTER_PAGE_SIZE = 50
+
+OPERATIONS: Dict[str, Callable[['Workload'], Awaitable[Any]]] = {}
+
+
+def operation(name: str):
+    def register(function: Callable[['Workload'], Awaitable[Any]]):
+        OPERATIONS[name] = function
+        return function
+    return register
+
+
+class Workload:
+    """The model under load and the primary keys it has created so far."""
+
+    def __init__(self, model_class: Type[Model], width: int, seed: int):
+        self.model_class = model_class
+        self.width = width
+        self.random = random.Random(seed)
+        self.ids: List[int] = []
+
+    def payload(self) -> Model:
+        value = f'{self.random.getrandbits(64):x}'
+        return self.model_class(**{
+            f'field_{index}': value for index in range(self.width)
+        })
+
+    def random_id(self) -> int:
+        return self.random.choice(self.ids)
+
+
+@operation('create')
+async def create(workload: Workload):
+    pk = await workload.model_class.orm.create(workload.payload(), returning='pk')
+    workload.ids.append(pk)
+
+
+@operation('get')
+async def get(workload: Workload):
+    model_class = workload.model_class
+    await model_class.orm.get(model_class.id == workload.random_id())
+
+
+@operation('filter')
+async def filter_all(workload: Workload):
+    model_class = workload.model_class
+    start = workload.random_id()
+    await model_class.orm.filter(
+        model_class.id >= start,
+        model_class.id < start + FILTER_PAGE_SIZE,
+    ).all()
+
+
+@operation('update')
+async def update(workload: Workload):
+    model_class = workload.model_class
+    await model_class.orm.filter(model_class.id == workload.random_id()).update(
+        workload.payload(),
+        returning=None,
+    )
+
+
+def percentile(sorted_values: List[int], percent: float) -> int:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+async def create_tables(models: List[Type[Model]]):
+    management_system = ORM.database.management_system
+    for model_class in models:
+        await ORM.database.execute(f'DROP TABLE IF EXISTS {model_class.table_name}')
+        await ORM.database.execute(management_system.get_create_table_sql(
+            model_table=management_system.table_class.from_model(model_class),
+        ))
+
+
+async def drop_tables(models: List[Type[Model]]):
+    for model_class in models:
+        await ORM.database.execute(f'DROP TABLE IF EXISTS {model_class.table_name}')
+
+
+async def seed(workload: Workload, rows: int, concurrency: int):
+    async def create_rows(count: int):
+        for _ in range(count):
+            await create(workload)
+
+    per_worker, remainder = divmod(rows, concurrency)
+    await asyncio.gather(*(
+        create_rows(per_worker + (1 if index < remainder else 0))
+        for index in range(concurrency)
+    ))
+
+
+async def run_scenario(
+    workload: Workload,
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+) -> Dict[str, dict]:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[int]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        while time.monotonic() < deadline:
+            name = workload.random.choices(names, weights)[0]
+            start = time.perf_counter_ns()
+            try:
+                await OPERATIONS[name](workload)
+            except Exception:
+                errors[name] += 1
+                continue
+            latencies[name].append(time.perf_counter_ns() - start)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    report = {}
+    for name in names:
+        timings = sorted(latencies[name])
+        report[name] = {
+            'count': len(timings),
+            'errors': errors[name],
+            'ops_per_second': len(timings) / elapsed,
+            'p50_ms': percentile(timings, 50) / 1e6 if timings else None,
+            'p99_ms': percentile(timings, 99) / 1e6 if timings else None,
+            'max_ms': timings[-1] / 1e6 if timings else None,
+        }
+    return report
+
+
+async def run_load(
+    dsn: str,
+    pool_sizes: List[int],
+    concurrencies: List[int],
+    widths: List[int],
+    mix: Dict[str, int],
+    duration: float,
+    seed_rows: int,
+    keep_tables: bool,
+) -> List[dict]:
+    models = [model_of_width(width) for width in widths]
+    results = []
+    for pool_size in pool_sizes:
+        await ORM.database.connect(
+            client=AsyncPGClient,
+            models=models,
+            dsn=dsn,
+            min_size=pool_size,
+            max_size=pool_size,
+        )
+        try:
+            for width, model_class in zip(widths, models):
+                for concurrency in concurrencies:
+                    # every scenario starts from the same freshly seeded table
+                    await create_tables([model_class])
+                    workload = Workload(model_class, width=width, seed=width)
+                    await seed(workload, rows=seed_rows, concurrency=pool_size)
+                    operations = await run_scenario(
+                        workload,
+                        mix=mix,
+                        concurrency=concurrency,
+                        duration=duration,
+                    )
+                    params = {
+                        'pool_size': pool_size,
+                        'concurrency': concurrency,
+                        'width': width,
+                    }
+                    results.append({'params': params, 'operations': operations})
+                    for name, result in operations.items():
+                        print(
+                            f'{json.dumps(params):<52} {name:<7} '
+                            f'{result["ops_per_second"]:>9.0f} ops/s '
+                            f'p50 {result["p50_ms"] or 0:>8.2f} ms '
+                            f'p99 {result["p99_ms"] or 0:>8.2f} ms '
+                            f'errors {result["errors"]}',
+                            file=sys.stderr,
+                        )
+            if not keep_tables:
+                await drop_tables(models)
+        finally:
+            await ORM.database.close()
+    return results
+
+
+def parse_mix(values: List[str]) -> Dict[str, int]:
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in OPERATIONS:
+            raise ValueError(f'unknown operation {name!r}, expected one of {", ".join(OPERATIONS)}')
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load')
+    parser.add_argument('--dsn', default='postgresql://postgres@localhost/postgres')
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[10])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--widths', type=int, nargs='+', default=[1, 10])
+    parser.add_argument(
+        '--mix',
+        nargs='+',
+        default=['create=1', 'get=4', 'filter=2', 'update=1'],
+        help=f'operation=weight pairs of {", ".join(OPERATIONS)}',
+    )
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--seed-rows', type=int, default=1000)
+    parser.add_argument('--keep-tables', action='store_true')
+    parser.add_argument('--output', help='write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.seed_rows < 1:
+        parser.error('--seed-rows must be at least 1, get and update need rows')
+    results = asyncio.run(run_load(
+        dsn=args.dsn,
+        pool_sizes=args.pool_sizes,
+        concurrencies=args.concurrency,
+        widths=args.widths,
+        mix=mix,
+        duration=args.duration,
+        seed_rows=args.seed_rows,
+        keep_tables=args.keep_tables,
+    ))
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'duration': args.duration,
+        'mix': mix,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
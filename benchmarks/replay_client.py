@@ -0,0 +1,77 @@
+from contextlib import asynccontextmanager
+from typing import Type, TYPE_CHECKING, List, Optional, Tuple
+
+from pyasync_orm.clients.abstract_client import AbstractClient
+from pyasync_orm.databases.postgresql import PostgreSQL
+
+if TYPE_CHECKING:
+    from pyasync_orm.databases.abstract_management_system import AbstractManagementSystem
+
+
+class ReplayConnection:
+    """Answers every query with the same canned rows and keeps no state."""
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+        self.queries: List[Tuple[str, tuple]] = []
+        self.record_queries = False
+
+    async def fetch(self, query: str, *args) -> List[dict]:
+        if self.record_queries:
+            self.queries.append((query, args))
+        return self.rows
+
+    async def fetchrow(self, query: str, *args) -> Optional[dict]:
+        rows = await self.fetch(query, *args)
+        return rows[0] if rows else None
+
+    async def execute(self, query: str, *args) -> str:
+        if self.record_queries:
+            self.queries.append((query, args))
+        return f'SELECT {len(self.rows)}'
+
+
+class ReplayClient(AbstractClient):
+    """
+    An in-memory client so the ORM's own overhead can be measured without a
+    database. Compiles SQL for PostgreSQL but never sends it anywhere.
+    """
+
+    def __init__(self, rows: Optional[List[dict]] = None, **db_kwargs):
+        self.connection = ReplayConnection(rows=rows or [])
+        self.data_types = PostgreSQL.data_types
+
+    @property
+    def management_system(self) -> Type['AbstractManagementSystem']:
+        return PostgreSQL
+
+    def replay(self, rows: List[dict]):
+        self.connection.rows = rows
+
+    async def create_connection_pool(self, **db_kwargs):
+        pass
+
+    async def close_connection_pool(self):
+        pass
+
+    @asynccontextmanager
+    async def get_connection(self, timeout: Optional[float] = None):
+        yield self.connection
+
+    async def fetch(
+        self,
+        connection: ReplayConnection,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> List[dict]:
+        return await connection.fetch(query, *args)
+
+    async def execute(
+        self,
+        connection: ReplayConnection,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> str:
+        return await connection.execute(query, *args)
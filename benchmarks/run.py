@@ -0,0 +1,254 @@
+"""
+Micro-benchmarks for the Python side of the ORM.
+
+Queries are answered by ReplayClient so only SQL compilation, search
+condition construction and model hydration are measured.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --compare baseline.json --max-slowdown 1.25
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Type, Any, Iterable
+
+from benchmarks.replay_client import ReplayClient
+from pyasync_orm import fields
+from pyasync_orm.models import Model
+from pyasync_orm.orm import ORM
+from pyasync_orm.sql import SQL
+
+ROW_COUNTS = (1, 100, 10_000)
+MODEL_WIDTHS = (1, 10, 50)
+CONDITION_COUNTS = (1, 5, 20)
+
+BENCHMARKS: Dict[str, Callable[..., Callable[[], Any]]] = {}
+PARAMETERS: Dict[str, Dict[str, Iterable[int]]] = {}
+
+
+def benchmark(name: str, **parameters: Iterable[int]):
+    def register(function: Callable[..., Callable[[], Any]]):
+        BENCHMARKS[name] = function
+        PARAMETERS[name] = parameters
+        return function
+    return register
+
+
+_models: Dict[int, Type[Model]] = {}
+
+
+def model_of_width(width: int) -> Type[Model]:
+    """A model with ``width`` varchar fields plus the implicit id."""
+    if width not in _models:
+        attributes = {
+            f'field_{index}': fields.VarCharField(max_length=100)
+            for index in range(width)
+        }
+        attributes['__module__'] = __name__
+        _models[width] = type(f'Width{width}', (Model,), attributes)
+    return _models[width]
+
+
+def rows_for(model_class: Type[Model], row_count: int) -> List[dict]:
+    field_names = [
+        name for name, value in vars(model_class).items()
+        if isinstance(value, fields.BaseField)
+    ]
+    return [
+        {
+            name: row_number if name == 'id' else f'{name}-{row_number}'
+            for name in field_names
+        }
+        for row_number in range(row_count)
+    ]
+
+
+@benchmark('sql.build_select', conditions=CONDITION_COUNTS)
+def bench_build_select(conditions: int):
+    def run():
+        sql = SQL(table_name='customers')
+        for index in range(conditions):
+            sql.add_where(field_name=f'field_{index}', symbol='=', field_value=index)
+        return sql.build_select()
+    return run
+
+
+@benchmark('sql.build_insert', width=MODEL_WIDTHS)
+def bench_build_insert(width: int):
+    fields_dict = {f'field_{index}': index for index in range(width)}
+
+    def run():
+        return SQL(table_name='customers').build_insert(fields_dict=fields_dict)
+    return run
+
+
+@benchmark('sql.build_update', width=MODEL_WIDTHS)
+def bench_build_update(width: int):
+    fields_dict = {f'field_{index}': index for index in range(width)}
+
+    def run():
+        sql = SQL(table_name='customers')
+        sql.add_where(field_name='id', symbol='=', field_value=1)
+        return sql.build_update(fields_dict=fields_dict)
+    return run
+
+
+@benchmark('fields.search_condition', conditions=CONDITION_COUNTS)
+def bench_search_condition(conditions: int):
+    model_class = model_of_width(max(CONDITION_COUNTS))
+    model_fields = [getattr(model_class, f'field_{index}') for index in range(conditions)]
+
+    def run():
+        return [field == 'value' for field in model_fields]
+    return run
+
+
+@benchmark('model.from_db', width=MODEL_WIDTHS, rows=ROW_COUNTS)
+def bench_from_db(width: int, rows: int):
+    model_class = model_of_width(width)
+    data = rows_for(model_class, rows)
+
+    def run():
+        return [model_class.from_db(row) for row in data]
+    return run
+
+
+@benchmark('model.__init__', width=MODEL_WIDTHS)
+def bench_model_init(width: int):
+    model_class = model_of_width(width)
+    kwargs = {f'field_{index}': 'value' for index in range(width)}
+
+    def run():
+        return model_class(**kwargs)
+    return run
+
+
+@benchmark('orm.filter.all', width=MODEL_WIDTHS, rows=ROW_COUNTS)
+def bench_orm_all(width: int, rows: int):
+    model_class = model_of_width(width)
+    data = rows_for(model_class, rows)
+
+    async def run():
+        ORM.database.client.replay(data)
+        return await model_class.orm.filter(model_class.id > 0).all()
+    return run
+
+
+def _time(function: Callable[[], Any], loop: asyncio.AbstractEventLoop, number: int) -> int:
+    if asyncio.iscoroutinefunction(function):
+        async def repeat():
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                await function()
+            return time.perf_counter_ns() - start
+        return loop.run_until_complete(repeat())
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        function()
+    return time.perf_counter_ns() - start
+
+
+def measure(
+    function: Callable[[], Any],
+    loop: asyncio.AbstractEventLoop,
+    repeat: int,
+    min_time: float,
+) -> dict:
+    # grow the loop count until one repeat takes at least min_time
+    number = 1
+    while _time(function, loop, number) < min_time * 1e9 and number < 1_000_000:
+        number *= 2
+    timings = [_time(function, loop, number) / number for _ in range(repeat)]
+    return {
+        'iterations': number,
+        'repeat': repeat,
+        'min_ns': min(timings),
+        'median_ns': statistics.median(timings),
+    }
+
+
+def run_benchmarks(
+    names: List[str],
+    repeat: int,
+    min_time: float,
+) -> List[dict]:
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(ORM.database.connect(client=ReplayClient))
+    results = []
+    try:
+        for name in names:
+            parameters = PARAMETERS[name]
+            for values in itertools.product(*parameters.values()):
+                params = dict(zip(parameters.keys(), values))
+                result = measure(BENCHMARKS[name](**params), loop, repeat, min_time)
+                results.append({'name': name, 'params': params, **result})
+                print(
+                    f'{name:<26} {json.dumps(params):<30} '
+                    f'{result["min_ns"] / 1000:>12.2f} us',
+                    file=sys.stderr,
+                )
+    finally:
+        loop.run_until_complete(ORM.database.close())
+        loop.close()
+    return results
+
+
+def _key(result: dict) -> str:
+    return f'{result["name"]} {json.dumps(result["params"], sort_keys=True)}'
+
+
+def compare(results: List[dict], baseline: List[dict], max_slowdown: float) -> List[str]:
+    baseline_by_key = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_key.get(_key(result))
+        if previous is None:
+            continue
+        slowdown = result['min_ns'] / previous['min_ns']
+        if slowdown > max_slowdown:
+            regressions.append(f'{_key(result)}: {slowdown:.2f}x slower')
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('names', nargs='*', help=f'any of {", ".join(BENCHMARKS)}')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--compare', help='JSON results of a previous run')
+    parser.add_argument('--max-slowdown', type=float, default=1.25)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per repeat')
+    args = parser.parse_args(argv)
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+    results = run_benchmarks(
+        names=args.names or list(BENCHMARKS),
+        repeat=args.repeat,
+        min_time=args.min_time,
+    )
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file)['results'], args.max_slowdown)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
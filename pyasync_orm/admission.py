@@ -0,0 +1,160 @@
+import asyncio
+import math
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional, Sequence
+
+# the priority class of the current Database.priority() block
+_priority: ContextVar[Optional[str]] = ContextVar('pyasync_orm_priority', default=None)
+
+
+class AdmissionError(Exception):
+    """A query was refused a connection instead of waiting for one."""
+
+
+class QueueFullError(AdmissionError):
+    pass
+
+
+class AcquireTimeoutError(AdmissionError, asyncio.TimeoutError):
+    pass
+
+
+class AdmissionControl:
+    """
+    Bounds the connections in use to limit and queues at most
+    max_queue_depth callers behind them, the ones over that fail with
+    QueueFullError right away. Waiters are admitted by priority class, in
+    the order of priorities, and a full queue makes room for a caller by
+    rejecting the newest waiter of a lower class. Waiting longer than
+    acquire_timeout raises AcquireTimeoutError.
+
+    With adaptive=True the limit follows the time connections are held:
+    it shrinks, down to min_limit, while the recent latency is over
+    tolerance times the long term average and grows back towards limit
+    when it is not, so fewer queries run at once on a struggling database.
+    """
+
+    def __init__(
+        self,
+        limit: int = 10,
+        max_queue_depth: int = 100,
+        acquire_timeout: Optional[float] = None,
+        priorities: Sequence[str] = ('interactive', 'batch'),
+        adaptive: bool = False,
+        min_limit: int = 1,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+    ):
+        if not priorities:
+            raise ValueError('priorities needs at least one class.')
+        self.max_limit = limit
+        self.limit = float(limit)
+        self.max_queue_depth = max_queue_depth
+        self.acquire_timeout = acquire_timeout
+        self.priorities = tuple(priorities)
+        self.adaptive = adaptive
+        self.min_limit = min_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._long_latency: Optional[float] = None
+        self._short_latency: Optional[float] = None
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {
+            priority: deque() for priority in self.priorities
+        }
+
+    def __str__(self):
+        return (
+            f'<AdmissionControl: {self.in_flight}/{int(self.limit)} in flight, '
+            f'{self.queued} queued>'
+        )
+
+    def __repr__(self):
+        return f'{self}'
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """Waits for a slot, release() it once the connection is back."""
+        priority = priority or self.priorities[0]
+        if priority not in self._waiters:
+            raise ValueError(f'Unknown priority {priority!r}, expected one of {self.priorities}.')
+        if self.in_flight < int(self.limit) and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if self.queued >= self.max_queue_depth and not self._shed(below=priority):
+            self.rejected += 1
+            raise QueueFullError(
+                f'{self.queued} queries are waiting for a connection, '
+                f'{priority} query rejected.'
+            )
+        if self.acquire_timeout is not None:
+            timeout = self.acquire_timeout if timeout is None else min(timeout, self.acquire_timeout)
+        future = asyncio.get_event_loop().create_future()
+        self._waiters[priority].append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._forget(priority, future)
+            self.timed_out += 1
+            raise AcquireTimeoutError(
+                f'No connection within {timeout} seconds, {self.in_flight} in use.'
+            ) from None
+        except asyncio.CancelledError:
+            self._forget(priority, future)
+            raise
+        self.admitted += 1
+
+    def _forget(self, priority: str, future: asyncio.Future):
+        try:
+            self._waiters[priority].remove(future)
+        except ValueError:
+            pass
+        if future.done() and not future.cancelled() and future.exception() is None:
+            # the slot was handed over just as the waiter gave up
+            self.release()
+
+    def _shed(self, below: str) -> bool:
+        """Rejects the newest waiter of the lowest class under below."""
+        rank = self.priorities.index(below)
+        for priority in reversed(self.priorities[rank + 1:]):
+            waiters = self._waiters[priority]
+            if waiters:
+                waiters.pop().set_exception(QueueFullError(
+                    f'{priority} query shed for a {below} query.'
+                ))
+                self.rejected += 1
+                return True
+        return False
+
+    def release(self, latency: Optional[float] = None):
+        self.in_flight -= 1
+        if self.adaptive and latency is not None:
+            self._update_limit(latency)
+        for priority in self.priorities:
+            waiters = self._waiters[priority]
+            while waiters and self.in_flight < int(self.limit):
+                future = waiters.popleft()
+                if not future.done():
+                    self.in_flight += 1
+                    future.set_result(None)
+
+    def _update_limit(self, latency: float):
+        if self._long_latency is None:
+            self._long_latency = self._short_latency = latency
+        # averages over roughly the last 10 and 500 connections
+        self._short_latency += (latency - self._short_latency) / 10
+        self._long_latency += (latency - self._long_latency) / 500
+        gradient = self.tolerance * self._long_latency / max(self._short_latency, 1e-9)
+        gradient = max(0.5, min(1.0, gradient))
+        # the square root lets the limit grow while latency holds steady
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        self.limit += (new_limit - self.limit) * self.smoothing
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), self.limit))
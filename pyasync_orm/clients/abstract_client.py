@@ -1,12 +1,53 @@
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
-from typing import TYPE_CHECKING, Type
+from typing import TYPE_CHECKING, Type, Dict, Tuple, Any, List, Optional, Sequence
+
+from pyasync_orm.databases.abstract_management_system import UnsupportedFeatureError
 
 if TYPE_CHECKING:
+    from pyasync_orm.codecs import Dumps, Loads
     from pyasync_orm.databases.abstract_management_system import AbstractManagementSystem
 
 
+class PoolOptions:
+    """
+    Connection lifecycle settings, see Database.connect. Clients apply
+    the ones that make sense for their backend.
+    """
+
+    def __init__(
+        self,
+        max_queries: Optional[int] = None,
+        max_lifetime: Optional[float] = None,
+        max_idle_time: Optional[float] = None,
+        validate_after_error: bool = True,
+        session_settings: Optional[Dict[str, str]] = None,
+        setup_statements: Sequence[str] = (),
+        pooler: Optional[str] = None,
+        prepared_statements: Sequence[str] = (),
+    ):
+        self.max_queries = max_queries
+        self.max_lifetime = max_lifetime
+        self.max_idle_time = max_idle_time
+        self.validate_after_error = validate_after_error
+        self.session_settings = session_settings or {}
+        self.setup_statements = setup_statements
+        self.pooler = pooler
+        self.prepared_statements = prepared_statements
+
+
 class AbstractClient(ABC):
+    # server type name -> (encoder, decoder) working on the binary format,
+    # set by Database.connect from the models' fields
+    type_codecs: Dict[str, Tuple['Dumps', 'Loads']] = {}
+    pool_options: PoolOptions = PoolOptions()
+    # connection poolers Database.connect(pooler=...) accepts
+    supported_poolers: Tuple[str, ...] = ()
+    # whether the client implements copy_from_query and copy_to_table
+    supports_copy: bool = False
+    # whether the client registers type_codecs on its connections
+    supports_type_codecs: bool = False
+
     @abstractmethod
     def __init__(self, **db_kwargs):
         pass
@@ -26,5 +67,38 @@ class AbstractClient(ABC):
 
     @abstractmethod
     @asynccontextmanager
-    async def get_connection(self):
+    async def get_connection(self, timeout: Optional[float] = None):
         pass
+
+    @abstractmethod
+    async def fetch(
+        self,
+        connection: Any,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        pass
+
+    @abstractmethod
+    async def execute(
+        self,
+        connection: Any,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> str:
+        pass
+
+    async def set_transaction_timeout(self, connection: Any, timeout: float):
+        """
+        Bounds the statements of the transaction just opened on connection
+        on the server too, for backends that can. Each statement also gets
+        its own timeout from fetch and execute.
+        """
+
+    async def create_listener_connection(self) -> Any:
+        """A connection outside the pool that can LISTEN for notifications."""
+        raise UnsupportedFeatureError(
+            f'{self.__class__.__name__} does not support notifications.'
+        )
@@ -0,0 +1,151 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Type, TYPE_CHECKING, List, Any, Optional, Awaitable
+
+import aiosqlite
+
+from pyasync_orm.clients.abstract_client import AbstractClient
+from pyasync_orm.databases.sqlite import SQLite
+
+if TYPE_CHECKING:
+    from pyasync_orm.databases.abstract_management_system import AbstractManagementSystem
+
+
+class AIOSQLiteConnection:
+    """Wraps an aiosqlite connection with the asyncpg methods the ORM uses."""
+
+    def __init__(self, connection: aiosqlite.Connection):
+        self._connection = connection
+        self._in_transaction = False
+
+    async def fetch(self, query: str, *args) -> List[dict]:
+        async with self._connection.execute(query, args) as cursor:
+            rows = await cursor.fetchall()
+            if cursor.description is None:
+                return []
+            column_names = [column[0] for column in cursor.description]
+        return [dict(zip(column_names, row)) for row in rows]
+
+    async def fetchrow(self, query: str, *args) -> Optional[dict]:
+        rows = await self.fetch(query, *args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: str, *args, column: int = 0) -> Any:
+        row = await self.fetchrow(query, *args)
+        return list(row.values())[column] if row is not None else None
+
+    async def execute(self, query: str, *args) -> str:
+        if not args and not self._in_transaction:
+            # like asyncpg, a query without arguments may hold several
+            # statements, executescript would commit an open transaction though
+            await self._connection.executescript(query)
+            return ''
+        async with self._connection.execute(query, args) as cursor:
+            row_count = cursor.rowcount
+        verb = query.lstrip().split(None, 1)[0].upper()
+        return f'{verb} 0 {row_count}' if verb == 'INSERT' else f'{verb} {row_count}'
+
+    async def close(self):
+        await self._connection.close()
+
+    async def interrupt(self):
+        await self._connection.interrupt()
+
+    async def executemany(self, query: str, args) -> None:
+        await self._connection.executemany(query, args)
+
+    @asynccontextmanager
+    async def transaction(self):
+        if self._in_transaction:
+            savepoint = f'pyasync_orm_{id(self)}'
+            await self._connection.execute(f'SAVEPOINT {savepoint}')
+            try:
+                yield
+            except BaseException:
+                await self._connection.execute(f'ROLLBACK TO SAVEPOINT {savepoint}')
+                raise
+            finally:
+                await self._connection.execute(f'RELEASE SAVEPOINT {savepoint}')
+            return
+        await self._connection.execute('BEGIN')
+        self._in_transaction = True
+        try:
+            yield
+        except BaseException:
+            await self._connection.execute('ROLLBACK')
+            raise
+        else:
+            await self._connection.execute('COMMIT')
+        finally:
+            self._in_transaction = False
+
+
+class AIOSQLiteClient(AbstractClient):
+    """
+    SQLite has no server side pool, so the client keeps a single connection
+    and hands it out to one task at a time.
+    """
+
+    def __init__(self, **db_kwargs):
+        self.connection = None
+        self.connection_lock = asyncio.Lock()
+        self.data_types = SQLite.data_types
+
+    @property
+    def management_system(self) -> Type['AbstractManagementSystem']:
+        return SQLite
+
+    async def create_connection_pool(self, database: str = ':memory:', **db_kwargs):
+        # autocommit, transactions are opened explicitly like with asyncpg
+        db_kwargs.setdefault('isolation_level', None)
+        self.connection = AIOSQLiteConnection(
+            await aiosqlite.connect(database, **db_kwargs),
+        )
+        for statement in self.pool_options.setup_statements:
+            await self.connection.execute(statement)
+
+    async def close_connection_pool(self):
+        await self.connection.close()
+
+    @asynccontextmanager
+    async def get_connection(self, timeout: Optional[float] = None):
+        await asyncio.wait_for(self.connection_lock.acquire(), timeout)
+        try:
+            yield self.connection
+        finally:
+            self.connection_lock.release()
+
+    @staticmethod
+    async def _run_with_timeout(
+        connection: AIOSQLiteConnection,
+        awaitable: Awaitable,
+        timeout: Optional[float],
+    ) -> Any:
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            # stop the statement still running in the connection's thread
+            await connection.interrupt()
+            raise
+
+    async def fetch(
+        self,
+        connection: AIOSQLiteConnection,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> List[dict]:
+        return await self._run_with_timeout(
+            connection, connection.fetch(query, *args), timeout,
+        )
+
+    async def execute(
+        self,
+        connection: AIOSQLiteConnection,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> str:
+        return await self._run_with_timeout(
+            connection, connection.execute(query, *args), timeout,
+        )
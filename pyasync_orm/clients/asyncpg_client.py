@@ -1,5 +1,9 @@
+import asyncio
+import random
+import re
+import time
 from contextlib import asynccontextmanager
-from typing import Type, TYPE_CHECKING
+from typing import Type, TYPE_CHECKING, Optional, List, Dict, Tuple, Any, Iterable, Sequence
 
 import asyncpg
 
@@ -10,22 +14,289 @@ if TYPE_CHECKING:
     from pyasync_orm.databases.abstract_management_system import AbstractManagementSystem
 
 
+POOL_KWARGS = {
+    'min_size',
+    'max_size',
+    'max_queries',
+    'max_inactive_connection_lifetime',
+    'connect',
+    'setup',
+    'init',
+    'reset',
+    'loop',
+    'init_size',
+}
+
+# errors after which the pool's other connections are suspect too, an
+# OSError only when it closed the connection
+CONNECTION_ERRORS = (
+    asyncpg.PostgresConnectionError,
+    asyncpg.ConnectionDoesNotExistError,
+    asyncpg.AdminShutdownError,
+    asyncpg.CannotConnectNowError,
+)
+
+# in transaction pooling the next transaction may run on another server
+# connection, so anything outliving a transaction would leak to other clients
+SESSION_STATE_PATTERNS = (
+    (re.compile(r'(^|;)\s*SET\s+(?!LOCAL\b)', re.IGNORECASE), 'SET without LOCAL'),
+    (re.compile(r'(^|;)\s*LISTEN\b', re.IGNORECASE), 'LISTEN'),
+    (re.compile(r'(^|;)\s*PREPARE\b', re.IGNORECASE), 'PREPARE'),
+    (re.compile(r'\bWITH\s+HOLD\b', re.IGNORECASE), 'cursors WITH HOLD'),
+    (
+        re.compile(r'\bpg_(try_)?advisory_lock(_shared)?\s*\(', re.IGNORECASE),
+        'session advisory locks, use pg_advisory_xact_lock',
+    ),
+)
+TEMPORARY_TABLE = re.compile(r'\bCREATE\s+((GLOBAL|LOCAL)\s+)?TEMP(ORARY)?\b', re.IGNORECASE)
+ON_COMMIT_DROP = re.compile(r'\bON\s+COMMIT\s+DROP\b', re.IGNORECASE)
+
+# the startup parameters PgBouncer forwards to the server
+POOLER_STARTUP_PARAMETERS = {'application_name'}
+
+
 class AsyncPGClient(AbstractClient):
+    supported_poolers: Tuple[str, ...] = ('pgbouncer', 'pgbouncer-prepared')
+    supports_copy = True
+    supports_type_codecs = True
+
     def __init__(self, **db_kwargs):
         self.connection_pool = None
         self.data_types = PostgreSQL.data_types
+        # server pid -> time.monotonic() after which the connection is recycled
+        self._connection_expiries: Dict[int, float] = {}
+        self._validate_connections = False
+        self.connect_kwargs = {
+            key: value for key, value in db_kwargs.items()
+            if key not in POOL_KWARGS
+        }
 
     @property
     def management_system(self) -> Type['AbstractManagementSystem']:
         return PostgreSQL
 
-    async def create_connection_pool(self, **db_kwargs):
-        self.connection_pool = await asyncpg.create_pool(**db_kwargs)
+    async def _init_connection(self, connection: asyncpg.Connection):
+        for data_type, (encoder, decoder) in self.type_codecs.items():
+            await connection.set_type_codec(
+                data_type,
+                schema='pg_catalog',
+                encoder=encoder,
+                decoder=decoder,
+                format='binary',
+            )
+        for statement in self.pool_options.setup_statements:
+            await connection.execute(statement)
+        if self.pool_options.pooler != 'pgbouncer':
+            for query in self.pool_options.prepared_statements:
+                await connection.prepare(query)
+
+    def _track_lifetime(self, connection: asyncpg.Connection):
+        max_lifetime = self.pool_options.max_lifetime
+        if max_lifetime is None:
+            return
+        pid = connection.get_server_pid()
+        # jitter so connections opened together are not all recycled together
+        self._connection_expiries[pid] = (
+            time.monotonic() + max_lifetime * random.uniform(0.9, 1.0)
+        )
+        connection.add_termination_listener(
+            lambda _: self._connection_expiries.pop(pid, None),
+        )
+
+    def _is_expired(self, connection: asyncpg.Connection) -> bool:
+        try:
+            if connection.is_closed():
+                return False
+            pid = connection.get_server_pid()
+        except asyncpg.InterfaceError:
+            # closing it already handed the connection back to the pool
+            return False
+        expires_at = self._connection_expiries.get(pid)
+        return expires_at is not None and time.monotonic() >= expires_at
+
+    def _get_pool_kwargs(self, db_kwargs: dict) -> dict:
+        pool_options = self.pool_options
+        pool_kwargs = dict(db_kwargs)
+        if pool_options.pooler is not None:
+            self._check_pooler_options(server_settings={
+                **pool_kwargs.get('server_settings', {}),
+                **pool_options.session_settings,
+            })
+        if pool_options.pooler == 'pgbouncer':
+            # named statements would be looked up on whichever server
+            # connection runs the next transaction, unnamed ones are parsed
+            # and planned with each query instead
+            pool_kwargs.setdefault('statement_cache_size', 0)
+        if pool_options.max_queries is not None:
+            pool_kwargs['max_queries'] = pool_options.max_queries
+        if pool_options.max_idle_time is not None:
+            pool_kwargs['max_inactive_connection_lifetime'] = pool_options.max_idle_time
+        if pool_options.session_settings:
+            # startup parameters survive the pool's RESET ALL, SET would not
+            pool_kwargs['server_settings'] = {
+                **pool_kwargs.get('server_settings', {}),
+                **pool_options.session_settings,
+            }
+            self.connect_kwargs['server_settings'] = pool_kwargs['server_settings']
+        return pool_kwargs
+
+    def _check_pooler_options(self, server_settings: Dict[str, str]):
+        pool_options = self.pool_options
+        settings = set(server_settings) - POOLER_STARTUP_PARAMETERS
+        if settings:
+            raise ValueError(
+                f'{pool_options.pooler} does not pass the session settings '
+                f'{sorted(settings)} on, set them on the database or role instead.'
+            )
+        if pool_options.setup_statements:
+            raise ValueError(
+                f'setup_statements would only run on one of {pool_options.pooler}\'s '
+                'server connections, set them on the database or role instead.'
+            )
+
+    @staticmethod
+    def _check_session_state(connection: asyncpg.Connection, query: str):
+        for pattern, name in SESSION_STATE_PATTERNS:
+            if pattern.search(query):
+                raise ValueError(f'{name} would leak to other clients of the pooler.')
+        if TEMPORARY_TABLE.search(query) and not (
+            connection.is_in_transaction() and ON_COMMIT_DROP.search(query)
+        ):
+            raise ValueError(
+                'Temporary tables would leak to other clients of the pooler, '
+                'create them with ON COMMIT DROP inside a transaction.'
+            )
+
+    async def create_connection_pool(self, init=None, **db_kwargs):
+        async def init_connection(connection: asyncpg.Connection):
+            await self._init_connection(connection)
+            self._track_lifetime(connection)
+            if init is not None:
+                await init(connection)
+
+        self.connection_pool = await asyncpg.create_pool(
+            init=init_connection,
+            **self._get_pool_kwargs(db_kwargs),
+        )
 
     async def close_connection_pool(self):
         await self.connection_pool.close()
 
+    def _connection_failed(self):
+        if not self.pool_options.validate_after_error:
+            return
+        # after a failover every idle connection points at the old server
+        self.connection_pool.expire_connections()
+        self._validate_connections = True
+
+    @staticmethod
+    async def _is_usable(connection: asyncpg.Connection) -> bool:
+        try:
+            await connection.execute('SELECT 1', timeout=5)
+        except CONNECTION_ERRORS + (OSError, asyncpg.InterfaceError, asyncio.TimeoutError):
+            return False
+        return True
+
+    async def _acquire(self, timeout: Optional[float]) -> asyncpg.Connection:
+        while True:
+            connection = await self.connection_pool.acquire(timeout=timeout)
+            if not self._validate_connections or await self._is_usable(connection):
+                self._validate_connections = False
+                return connection
+            connection.terminate()
+            await self.connection_pool.release(connection)
+
     @asynccontextmanager
-    async def get_connection(self):
-        async with self.connection_pool.acquire() as connection:
+    async def get_connection(self, timeout: Optional[float] = None):
+        connection = await self._acquire(timeout=timeout)
+        try:
             yield connection
+        except asyncio.TimeoutError:
+            # a subclass of OSError on Python 3.11+, but the connection is fine
+            raise
+        except CONNECTION_ERRORS:
+            self._connection_failed()
+            raise
+        except OSError:
+            # a network error broke the connection, or the block's own,
+            # e.g. a missing file to COPY from
+            if connection.is_closed():
+                self._connection_failed()
+            raise
+        finally:
+            if self._is_expired(connection):
+                # the pool opens a replacement on the next acquire
+                await connection.close()
+            await self.connection_pool.release(connection)
+
+    async def set_transaction_timeout(self, connection: asyncpg.Connection, timeout: float):
+        # 0 would disable the timeout
+        milliseconds = max(int(timeout * 1000), 1)
+        await connection.execute(f'SET LOCAL statement_timeout = {milliseconds}')
+
+    async def fetch(
+        self,
+        connection: asyncpg.Connection,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> List[asyncpg.Record]:
+        if self.pool_options.pooler is not None:
+            self._check_session_state(connection, query)
+        # on timeout asyncpg also cancels the statement on the server
+        return await connection.fetch(query, *args, timeout=timeout)
+
+    async def execute(
+        self,
+        connection: asyncpg.Connection,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> str:
+        if self.pool_options.pooler is not None:
+            self._check_session_state(connection, query)
+        return await connection.execute(query, *args, timeout=timeout)
+
+    async def copy_from_query(
+        self,
+        connection: asyncpg.Connection,
+        query: str,
+        *args,
+        output: Any,
+        timeout: Optional[float] = None,
+        **copy_options,
+    ) -> str:
+        return await connection.copy_from_query(
+            query,
+            *args,
+            output=output,
+            timeout=timeout,
+            **copy_options,
+        )
+
+    async def copy_to_table(
+        self,
+        connection: asyncpg.Connection,
+        table_name: str,
+        records: Optional[Iterable[Sequence[Any]]] = None,
+        timeout: Optional[float] = None,
+        **copy_options,
+    ) -> str:
+        if records is not None:
+            return await connection.copy_records_to_table(
+                table_name,
+                records=records,
+                timeout=timeout,
+                **copy_options,
+            )
+        return await connection.copy_to_table(table_name, timeout=timeout, **copy_options)
+
+    async def create_listener_connection(self) -> asyncpg.Connection:
+        if self.pool_options.pooler is not None:
+            raise ValueError(
+                f'LISTEN needs a session of its own, which {self.pool_options.pooler} '
+                'in transaction mode cannot give, subscribe through a direct connection.'
+            )
+        connection = await asyncpg.connect(**self.connect_kwargs)
+        await self._init_connection(connection)
+        return connection
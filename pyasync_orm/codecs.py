@@ -0,0 +1,67 @@
+import json
+from typing import Any, Callable, Optional, Type, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# the binary jsonb format is the json text prefixed with a version byte
+JSONB_VERSION = b'\x01'
+
+Dumps = Callable[[Any], bytes]
+Loads = Callable[[bytes], Any]
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+_json_library: Tuple[Dumps, Loads] = (
+    (orjson.dumps, orjson.loads) if orjson is not None
+    else (_stdlib_dumps, json.loads)
+)
+
+
+def set_json_library(dumps: Dumps, loads: Loads):
+    """
+    Replace the JSON library used by fields without their own encoder or
+    decoder. dumps must return bytes and loads must accept bytes,
+    e.g. set_json_library(orjson.dumps, orjson.loads).
+    Only connections opened afterwards pick up the change.
+    """
+    global _json_library
+    _json_library = (dumps, loads)
+
+
+def get_json_library() -> Tuple[Dumps, Loads]:
+    return _json_library
+
+
+def get_json_codec(
+    encoder: Optional[Type[json.JSONEncoder]] = None,
+    decoder: Optional[Type[json.JSONDecoder]] = None,
+) -> Tuple[Dumps, Loads]:
+    dumps, loads = _json_library
+    if encoder is not None:
+        def dumps(value: Any) -> bytes:
+            return json.dumps(value, cls=encoder).encode()
+    if decoder is not None:
+        def loads(data: bytes) -> Any:
+            return json.loads(data, cls=decoder)
+    return dumps, loads
+
+
+def get_jsonb_codec(
+    encoder: Optional[Type[json.JSONEncoder]] = None,
+    decoder: Optional[Type[json.JSONDecoder]] = None,
+) -> Tuple[Dumps, Loads]:
+    json_dumps, json_loads = get_json_codec(encoder=encoder, decoder=decoder)
+
+    def dumps(value: Any) -> bytes:
+        return JSONB_VERSION + json_dumps(value)
+
+    def loads(data: bytes) -> Any:
+        return json_loads(data[1:])
+
+    return dumps, loads
@@ -0,0 +1,49 @@
+import array
+import functools
+from typing import Any, List, Optional, Sequence
+
+
+@functools.lru_cache(maxsize=None)
+def _import_numpy():
+    # imported on first use, numpy takes long to import
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover
+        return None
+    return numpy
+
+
+def build_column(
+    records: List[Any],
+    key: str,
+    typecode: Optional[str] = None,
+) -> Sequence:
+    """
+    Reads column key of every record into one array. Columns with a
+    typecode become numpy arrays when numpy is installed, otherwise
+    array.array. NULLs in float columns become nan under numpy; any other
+    NULL, or a typecode without an array equivalent, falls back to python
+    objects (an object numpy array or a list).
+    """
+    numpy = _import_numpy()
+    if typecode == '?' and any(record[key] is None for record in records):
+        # numpy would read NULL as False
+        typecode = None
+    if typecode is not None:
+        try:
+            if numpy is not None:
+                return numpy.fromiter(
+                    (record[key] for record in records),
+                    dtype=typecode,
+                    count=len(records),
+                )
+            if typecode in array.typecodes:
+                return array.array(typecode, (record[key] for record in records))
+        except TypeError:
+            # a NULL in the column
+            pass
+    if numpy is not None:
+        column = numpy.empty(len(records), dtype=object)
+        column[:] = [record[key] for record in records]
+        return column
+    return [record[key] for record in records]
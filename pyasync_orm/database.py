@@ -1,11 +1,40 @@
-from contextlib import asynccontextmanager
-from typing import Type, TYPE_CHECKING, Union, List, Optional
+import asyncio
+import importlib
+import inspect
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Type, TYPE_CHECKING, Union, List, Optional, Dict, Tuple, Any, Sequence, Iterable
 
+from pyasync_orm.admission import AdmissionControl, _priority
+from pyasync_orm.clients.abstract_client import PoolOptions
+from pyasync_orm.databases.abstract_management_system import UnsupportedFeatureError
+from pyasync_orm.loaders import Loader, _loader
+from pyasync_orm.plans import QueryPlan, _plan_recorder
+from pyasync_orm.tracking import QueryTracker, _trackers
 
 if TYPE_CHECKING:
     from pyasync_orm.clients.abstract_client import AbstractClient
+    from pyasync_orm.codecs import Dumps, Loads
     from pyasync_orm.databases.abstract_management_system import AbstractManagementSystem
-    from pyasync_orm.models import Model
+    from pyasync_orm.models import MaterializedView, Model
+    from pyasync_orm.orm import ORM
+    from pyasync_orm.plans import PlanRecorder
+    from pyasync_orm.writers import BufferedWriter
+
+logger = logging.getLogger(__name__)
+
+# clients Database.connect accepts by name, imported on connect
+CLIENTS = {
+    'asyncpg': 'pyasync_orm.clients.asyncpg_client.AsyncPGClient',
+    'aiosqlite': 'pyasync_orm.clients.aiosqlite_client.AIOSQLiteClient',
+}
+
+# time.monotonic() by which every query of the current task must finish
+_deadline: ContextVar[Optional[float]] = ContextVar('pyasync_orm_deadline', default=None)
+# the connection of the current Database.transaction()
+_connection: ContextVar[Optional[Any]] = ContextVar('pyasync_orm_connection', default=None)
 
 
 class Database:
@@ -13,22 +42,483 @@ class Database:
         self.client: Optional['AbstractClient'] = None
         self.management_system: Optional[Type['AbstractManagementSystem']] = None
         self.models: Optional[List[Type['Model']]] = None
+        self._refresh_tasks: List[asyncio.Task] = []
+        self._writers: List['BufferedWriter'] = []
+        self.admission: Optional[AdmissionControl] = None
 
     async def connect(
         self,
-        client: Type['AbstractClient'],
+        client: Union[Type['AbstractClient'], str],
         models: Optional[List[Union[Type['Model'], str]]] = None,
+        max_queries: Optional[int] = None,
+        max_lifetime: Optional[float] = None,
+        max_idle_time: Optional[float] = None,
+        validate_after_error: bool = True,
+        session_settings: Optional[Dict[str, str]] = None,
+        setup_statements: Sequence[str] = (),
+        pooler: Optional[str] = None,
+        admission: Optional[AdmissionControl] = None,
+        prepare: Sequence[Union[str, 'ORM']] = (),
         **db_kwargs,
     ):
+        """
+        max_queries and max_lifetime (seconds) recycle a connection after
+        that many queries or that long, max_idle_time closes connections
+        idle for longer. After a connection error the pool's connections
+        are replaced and validated on acquire unless validate_after_error
+        is False. session_settings (e.g. search_path, application_name,
+        statement_timeout) are sent when connecting and setup_statements
+        run on every new connection. pooler='pgbouncer' connects through
+        PgBouncer in transaction mode without named prepared statements,
+        'pgbouncer-prepared' keeps them for PgBouncer 1.21+ with
+        max_prepared_statements set. Either way statements that leave
+        session state behind are refused. admission bounds the connections
+        in use and the queries waiting for one, see AdmissionControl.
+
+        client is a client class or the name of one in CLIENTS, which is
+        only imported then. The models' column metadata is computed once
+        here, the pool opens its minimum number of connections, and the
+        hot queries in prepare, SQL or ORM queries such as
+        Customer.orm.filter(Customer.id == 0), are prepared on every new
+        connection so the first requests do not pay for any of it.
+        Other keyword arguments go to the client.
+        """
+        if isinstance(client, str):
+            client = self._load_client(client)
         self.client = client(**db_kwargs)
+        if pooler is not None and pooler not in self.client.supported_poolers:
+            raise ValueError(
+                f'{client.__name__} does not support pooler {pooler!r}, '
+                f'expected one of {self.client.supported_poolers}.'
+            )
         self.management_system = self.client.management_system
-        self.models = models or []
+        self.models = self._load_models(models or [])
+        for model in self.models:
+            # fields get their data types from the ORM's database
+            if model.orm.database is self:
+                model.freeze()
+        self.admission = admission
+        self.client.type_codecs = self._get_type_codecs()
+        self.client.pool_options = PoolOptions(
+            max_queries=max_queries,
+            max_lifetime=max_lifetime,
+            max_idle_time=max_idle_time,
+            validate_after_error=validate_after_error,
+            session_settings=session_settings,
+            setup_statements=setup_statements,
+            pooler=pooler,
+            prepared_statements=[
+                query if isinstance(query, str) else query.build_select()[0]
+                for query in prepare
+            ],
+        )
         await self.client.create_connection_pool(**db_kwargs)
 
     async def close(self):
+        # buffered rows are written while the pool is still open
+        for writer in list(self._writers):
+            await writer.close()
+        for task in self._refresh_tasks:
+            task.cancel()
+        await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        self._refresh_tasks = []
         await self.client.close_connection_pool()
 
     @asynccontextmanager
-    async def get_connection(self):
-        async with self.client.get_connection() as connection:
+    async def get_connection(self, timeout: Optional[float] = None):
+        connection = _connection.get()
+        if connection is not None:
             yield connection
+            return
+        if self.admission is None:
+            async with self.client.get_connection(timeout=timeout) as connection:
+                yield connection
+            return
+        started = time.monotonic()
+        await self.admission.acquire(priority=_priority.get(), timeout=timeout)
+        admitted = time.monotonic()
+        try:
+            async with self.client.get_connection(
+                timeout=self._remaining(started, timeout),
+            ) as connection:
+                yield connection
+        finally:
+            self.admission.release(latency=time.monotonic() - admitted)
+
+    @asynccontextmanager
+    async def transaction(self, timeout: Optional[float] = None):
+        """
+        Runs the queries of the block on one connection in a transaction,
+        committed when the block exits and rolled back on an exception.
+        Nested blocks use savepoints. Tasks created inside the block would
+        share the connection, so run their queries one at a time. Under a
+        deadline the server stops the transaction's statements at it too.
+        """
+        outermost = _connection.get() is None
+        async with self.get_connection(timeout=self.get_timeout(timeout)) as connection:
+            async with connection.transaction():
+                remaining = self.get_timeout()
+                if outermost and remaining is not None:
+                    await self.client.set_transaction_timeout(connection, remaining)
+                token = _connection.set(connection)
+                try:
+                    yield connection
+                finally:
+                    _connection.reset(token)
+
+    @asynccontextmanager
+    async def session(self, timeout: Optional[float] = None):
+        """
+        Runs the queries of the block on one connection without opening a
+        transaction, for session state like advisory locks.
+        """
+        async with self.get_connection(timeout=self.get_timeout(timeout)) as connection:
+            token = _connection.set(connection)
+            try:
+                yield connection
+            finally:
+                _connection.reset(token)
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """
+        Every query run inside the block, including ones in tasks created
+        from it, has to finish within seconds. Nested deadlines can only
+        shorten the outer one.
+        """
+        deadline_ = time.monotonic() + seconds
+        current_deadline = _deadline.get()
+        if current_deadline is not None:
+            deadline_ = min(deadline_, current_deadline)
+        token = _deadline.set(deadline_)
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+
+    @contextmanager
+    def priority(self, name: str):
+        """
+        Queries run inside the block wait for a connection in the priority
+        class name of the AdmissionControl passed to connect.
+        """
+        token = _priority.set(name)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    @staticmethod
+    def get_timeout(timeout: Optional[float] = None) -> Optional[float]:
+        """The smaller of timeout and what is left of the current deadline."""
+        deadline_ = _deadline.get()
+        if deadline_ is None:
+            return timeout
+        remaining = deadline_ - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError('Query deadline exceeded.')
+        return remaining if timeout is None else min(timeout, remaining)
+
+    @contextmanager
+    def batch_loads(self, window: float = 0.0):
+        """
+        Primary key gets, Model.orm.get(Model.id == pk), made inside the
+        block by concurrent tasks within window seconds, or the same event
+        loop tick by default, are loaded with one query per model. Wrap a
+        request in it to collapse N+1 lookups, e.g. from GraphQL resolvers.
+        Gets inside a transaction() or session() are not batched.
+        """
+        token = _loader.set(Loader(window=window))
+        try:
+            yield
+        finally:
+            _loader.reset(token)
+
+    @contextmanager
+    def record_plans(self, recorder: 'PlanRecorder'):
+        """
+        Every SELECT run inside the block is explained first and its plan
+        checked against recorder's baseline. Meant for test suites.
+        """
+        token = _plan_recorder.set(recorder)
+        try:
+            yield
+        finally:
+            _plan_recorder.reset(token)
+
+    @asynccontextmanager
+    async def track(self, tracker: Optional[QueryTracker] = None, **options):
+        """
+        Counts the queries run inside the block, see QueryTracker for the
+        budgets, e.g. track(max_queries=5, n_plus_one=3). The budgets are
+        checked when the block exits without an exception.
+        """
+        tracker = tracker or QueryTracker(**options)
+        token = _trackers.set(_trackers.get() + (tracker,))
+        try:
+            yield tracker
+        finally:
+            _trackers.reset(token)
+        tracker.check()
+
+    @staticmethod
+    def _track(query: str, args: Tuple[Any, ...], started: float):
+        trackers = _trackers.get()
+        if trackers:
+            seconds = time.monotonic() - started
+            for tracker in trackers:
+                tracker.record(query, args, seconds)
+
+    @staticmethod
+    def _remaining(started: float, timeout: Optional[float]) -> Optional[float]:
+        if timeout is None:
+            return None
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            raise asyncio.TimeoutError('Query deadline exceeded.')
+        return remaining
+
+    async def fetch(
+        self,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        recorder = _plan_recorder.get()
+        if recorder is not None and query.lstrip()[:6].upper() == 'SELECT':
+            # the recorder's own queries are neither recorded nor tracked
+            token = _plan_recorder.set(None)
+            trackers_token = _trackers.set(())
+            try:
+                await recorder.record(self, query, *args)
+            finally:
+                _trackers.reset(trackers_token)
+                _plan_recorder.reset(token)
+        timeout = self.get_timeout(timeout)
+        started = time.monotonic()
+        async with self.get_connection(timeout=timeout) as connection:
+            query_started = time.monotonic()
+            try:
+                return await self.client.fetch(
+                    connection,
+                    query,
+                    *args,
+                    timeout=self._remaining(started, timeout),
+                )
+            finally:
+                self._track(query, args, query_started)
+
+    async def execute(
+        self,
+        query: str,
+        *args,
+        timeout: Optional[float] = None,
+    ) -> str:
+        timeout = self.get_timeout(timeout)
+        started = time.monotonic()
+        async with self.get_connection(timeout=timeout) as connection:
+            query_started = time.monotonic()
+            try:
+                return await self.client.execute(
+                    connection,
+                    query,
+                    *args,
+                    timeout=self._remaining(started, timeout),
+                )
+            finally:
+                self._track(query, args, query_started)
+
+    async def copy_from_query(
+        self,
+        query: str,
+        *args,
+        output: Any,
+        timeout: Optional[float] = None,
+        **copy_options,
+    ) -> str:
+        """COPY (query) TO output, see asyncpg's Connection.copy_from_query."""
+        self._check_copy()
+        timeout = self.get_timeout(timeout)
+        started = time.monotonic()
+        async with self.get_connection(timeout=timeout) as connection:
+            query_started = time.monotonic()
+            try:
+                return await self.client.copy_from_query(
+                    connection,
+                    query,
+                    *args,
+                    output=output,
+                    timeout=self._remaining(started, timeout),
+                    **copy_options,
+                )
+            finally:
+                self._track(f'COPY ({query}) TO STDOUT', args, query_started)
+
+    async def copy_to_table(
+        self,
+        table_name: str,
+        records: Optional[Iterable[Sequence[Any]]] = None,
+        timeout: Optional[float] = None,
+        **copy_options,
+    ) -> str:
+        """
+        COPY table_name FROM copy_options['source'], or from records, a
+        sequence of row tuples, see asyncpg's Connection.copy_to_table.
+        """
+        self._check_copy()
+        timeout = self.get_timeout(timeout)
+        started = time.monotonic()
+        async with self.get_connection(timeout=timeout) as connection:
+            query_started = time.monotonic()
+            try:
+                return await self.client.copy_to_table(
+                    connection,
+                    table_name,
+                    records=records,
+                    timeout=self._remaining(started, timeout),
+                    **copy_options,
+                )
+            finally:
+                self._track(f'COPY {table_name} FROM STDIN', (), query_started)
+
+    def _check_copy(self):
+        if not self.client.supports_copy:
+            raise UnsupportedFeatureError(
+                f'{self.client.__class__.__name__} does not support COPY.'
+            )
+
+    async def explain(
+        self,
+        query: str,
+        *args,
+        analyze: bool = False,
+        timeout: Optional[float] = None,
+    ) -> QueryPlan:
+        """analyze=True runs the query to report actual rows and timings."""
+        self.management_system.check_supports('structured_plans')
+        records = await self.fetch(
+            self.management_system.get_explain_sql(query=query, analyze=analyze),
+            *args,
+            timeout=timeout,
+        )
+        return QueryPlan.from_records(records)
+
+    async def get_table_rows(
+        self,
+        table_names: List[str],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, float]:
+        """
+        The planner's estimate of each table's row count, resolving the
+        names like queries do. Tables never vacuumed or analyzed are left
+        out.
+        """
+        self.management_system.check_supports('row_estimates')
+        records = await self.fetch(
+            self.management_system.table_rows_sql(),
+            table_names,
+            timeout=timeout,
+        )
+        return {record['table_name']: record['rows'] for record in records}
+
+    def add_writer(self, writer: 'BufferedWriter'):
+        """close() closes writer first, writing its buffered rows."""
+        self._writers.append(writer)
+
+    def remove_writer(self, writer: 'BufferedWriter'):
+        """Called by writer once it is closed."""
+        if writer in self._writers:
+            self._writers.remove(writer)
+
+    async def refresh(
+        self,
+        view: Type['MaterializedView'],
+        concurrently: bool = True,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Recomputes a materialized view. Concurrently, reads keep seeing the
+        old rows until the refresh commits.
+        """
+        self.management_system.check_supports('materialized_views')
+        await self.execute(
+            self.management_system.get_refresh_materialized_view_sql(
+                view_name=view.table_name,
+                concurrently=concurrently,
+            ),
+            timeout=timeout,
+        )
+
+    def schedule_refresh(
+        self,
+        view: Type['MaterializedView'],
+        interval: float,
+        concurrently: bool = True,
+        timeout: Optional[float] = None,
+    ) -> asyncio.Task:
+        """
+        Refreshes view every interval seconds until the task is cancelled
+        or the database closed. A failed refresh is logged and retried on
+        the next interval.
+        """
+        async def refresh_periodically():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.refresh(view, concurrently=concurrently, timeout=timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception('Refreshing %s failed.', view.table_name)
+
+        task = asyncio.ensure_future(refresh_periodically())
+        self._refresh_tasks.append(task)
+        return task
+
+    @staticmethod
+    def _load_client(name: str) -> Type['AbstractClient']:
+        if name not in CLIENTS:
+            raise ValueError(f'Unknown client {name!r}, expected one of {", ".join(CLIENTS)}.')
+        module_name, _, class_name = CLIENTS[name].rpartition('.')
+        return getattr(importlib.import_module(module_name), class_name)
+
+    @staticmethod
+    def _load_models(models: List[Union[Type['Model'], str]]) -> List[Type['Model']]:
+        """Replaces module paths with the models defined in those modules."""
+        from pyasync_orm.models import Model
+
+        model_classes = []
+        for model in models:
+            if not isinstance(model, str):
+                model_classes.append(model)
+                continue
+            module = importlib.import_module(model)
+            model_classes += [
+                value for value in vars(module).values()
+                if inspect.isclass(value)
+                and issubclass(value, Model)
+                and value.__module__ == module.__name__
+            ]
+        return model_classes
+
+    def _get_type_codecs(self) -> Dict[str, Tuple['Dumps', 'Loads']]:
+        from pyasync_orm.fields import JSONField
+
+        type_codecs = {}
+        if not self.client.supports_type_codecs:
+            return type_codecs
+        codec_owners = {}
+        for model in self.models:
+            for field in vars(model).values():
+                if not isinstance(field, JSONField):
+                    continue
+                owner = (field.encoder, field.decoder)
+                previous_owner = codec_owners.setdefault(field.codec_type, owner)
+                if previous_owner != owner:
+                    raise ValueError(
+                        f'{model.__name__}.{field.name} uses a different '
+                        f'encoder or decoder than another {field.codec_type} '
+                        'field. Codecs are registered per data type.'
+                    )
+                type_codecs[field.codec_type] = field.codec
+        return type_codecs
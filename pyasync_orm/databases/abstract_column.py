@@ -15,6 +15,8 @@ class AbstractColumn(ABC):
         max_length: Optional[int] = None,
         max_digits: Optional[int] = None,
         decimal_places: Optional[int] = None,
+        generated: Optional[str] = None,
+        index_method: Optional[str] = None,
     ):
         self.column_name = column_name
         self.data_type = data_type
@@ -26,6 +28,10 @@ class AbstractColumn(ABC):
         self.max_length = max_length
         self.max_digits = max_digits
         self.decimal_places = decimal_places
+        # SQL expression of a stored generated column
+        self.generated = generated
+        # e.g. 'gin', columns with an index_method get an index of their own
+        self.index_method = index_method
 
     @abstractmethod
     def __str__(self):
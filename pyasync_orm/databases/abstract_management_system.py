@@ -1,12 +1,41 @@
+import hashlib
 from abc import ABC, abstractmethod
-from typing import Type, TYPE_CHECKING, List
+from typing import Type, TYPE_CHECKING, List, Sequence
 
 if TYPE_CHECKING:
     from pyasync_orm.databases.abstract_table import AbstractTable
+    from pyasync_orm.partitions import Partition
+
+
+class UnsupportedFeatureError(ValueError):
+    """The database or its client lacks a feature the call needs."""
 
 
 class AbstractManagementSystem(ABC):
     table_class: Type['AbstractTable']
+    placeholder_format: str
+    # whether a list can be passed as one parameter, e.g. to = ANY($1)
+    array_parameters = False
+    # optional features, a management system that sets one defines the
+    # methods listed with it
+    # get_notify_channel, get_notify_trigger_name, trigger_data_sql,
+    # get_create_notify_trigger_sql, get_drop_notify_trigger_sql
+    supports_change_notifications = False
+    # get_create_partition_sql, partition_data_sql, get_detach_partition_sql
+    supports_partitioning = False
+    # materialized_view_data_sql, get_create_materialized_view_sql,
+    # get_drop_materialized_view_sql, get_refresh_materialized_view_sql
+    supports_materialized_views = False
+    # get_explain_sql
+    supports_structured_plans = False
+    # table_rows_sql
+    supports_row_estimates = False
+    # get_try_lock_sql, get_unlock_sql
+    supports_advisory_locks = False
+    # index_validity_sql
+    supports_concurrent_indexes = False
+    # get_create_indexes_sql for columns with an index_method
+    supports_index_methods = False
     data_types = {
         'bool': None,
         'smallserial': None,
@@ -20,9 +49,11 @@ class AbstractManagementSystem(ABC):
         'varchar': None,
         'text': None,
         'json': None,
+        'jsonb': None,
         'date': None,
         'timestamp': None,
         'timestamp with time zone': None,
+        'tsvector': None,
     }
 
     @classmethod
@@ -48,3 +79,28 @@ class AbstractManagementSystem(ABC):
         db_table: 'AbstractTable'
     ) -> List[str]:
         pass
+
+    @classmethod
+    def check_supports(cls, feature: str):
+        """Raises UnsupportedFeatureError unless supports_<feature> is set."""
+        if not getattr(cls, f'supports_{feature}'):
+            raise UnsupportedFeatureError(
+                f'{cls.__name__} does not support {feature.replace("_", " ")}.'
+            )
+
+    @classmethod
+    def get_create_indexes_sql(cls, model_table: 'AbstractTable') -> List[str]:
+        """Indexes for the columns with an index_method."""
+        if any(column.index_method is not None for column in model_table.columns):
+            cls.check_supports('index_methods')
+        return []
+
+    @staticmethod
+    def get_query_hash(query: str) -> str:
+        """Stored with a view to tell whether its query changed."""
+        return hashlib.sha256(query.encode()).hexdigest()
+
+    @classmethod
+    def is_transactional(cls, sql: str) -> bool:
+        """Whether the statement can run inside a transaction."""
+        return True
@@ -1,11 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List, Type, TYPE_CHECKING, Any
-
-from pyasync_orm.fields import BaseField
+from typing import List, Type, TYPE_CHECKING, Any, Optional
 
 if TYPE_CHECKING:
     from pyasync_orm.databases.abstract_column import AbstractColumn
     from pyasync_orm.models import Model
+    from pyasync_orm.partitions import BasePartitioning
 
 
 class AbstractTable(ABC):
@@ -15,9 +14,11 @@ class AbstractTable(ABC):
         self,
         table_name: str,
         columns: List['AbstractColumn'],
+        partition_by: Optional['BasePartitioning'] = None,
     ):
         self.table_name = table_name
         self.columns = columns
+        self.partition_by = partition_by
 
     @classmethod
     def from_model(
@@ -31,9 +32,9 @@ class AbstractTable(ABC):
                     column_name=key,
                     **value.db_column_dict,
                 )
-                for key, value in model_class.__dict__.items()
-                if isinstance(value, BaseField)
-            ]
+                for key, value in model_class.get_fields().items()
+            ],
+            partition_by=model_class.partition_by,
         )
 
     @classmethod
@@ -1,4 +1,6 @@
-from typing import List, TYPE_CHECKING, Optional, Union, Any, Callable
+import copy
+import re
+from typing import List, TYPE_CHECKING, Optional, Union, Any, Callable, Sequence
 
 from pyasync_orm.databases.abstract_column import AbstractColumn
 from pyasync_orm.databases.abstract_management_system import AbstractManagementSystem
@@ -7,6 +9,14 @@ from pyasync_orm.databases.abstract_table import AbstractTable
 if TYPE_CHECKING:
     from asyncpg import Record
 
+    from pyasync_orm.partitions import Partition
+
+# statements PostgreSQL refuses to run inside a transaction block
+NON_TRANSACTIONAL = re.compile(
+    r'\bCONCURRENTLY\b|^\s*(VACUUM|ALTER\s+SYSTEM|(CREATE|DROP)\s+(DATABASE|TABLESPACE))\b',
+    re.IGNORECASE,
+)
+
 
 class DefaultDataType:
     def __init__(
@@ -21,12 +31,14 @@ class DefaultDataType:
         max_digits: Optional[int],
         decimal_places: Optional[int],
         max_length: Optional[int],
+        generated: Optional[str] = None,
     ):
         self.column_name = column_name
         self.data_type = data_type
         self.null = ' NOT NULL' if not null else ''
         self.unique = ' UNIQUE' if unique else ''
         self.default = f' DEFAULT {default}' if default is not None else ''
+        self.generated = f' GENERATED ALWAYS AS ({generated}) STORED' if generated else ''
         self.max_digits = max_digits
         self.decimal_places = decimal_places
         self.max_length = max_length
@@ -34,7 +46,10 @@ class DefaultDataType:
         self.auto_increment = auto_increment
 
     def __str__(self):
-        return f'{self.column_name} {self.data_type}{self.null}{self.unique}{self.default}'
+        return (
+            f'{self.column_name} {self.data_type}'
+            f'{self.null}{self.unique}{self.default}{self.generated}'
+        )
 
 
 class CharVarDataType(DefaultDataType):
@@ -88,6 +103,7 @@ class Column(AbstractColumn):
             max_length=self.max_length,
             primary_key=self.primary_key,
             auto_increment=self.auto_increment,
+            generated=self.generated,
         ))
 
 
@@ -140,8 +156,21 @@ class Table(AbstractTable):
         return Table(table_name=self.table_name, columns=add_columns)
 
 
+NOTIFY_FUNCTION_NAME = 'pyasync_orm_notify'
+
+
 class PostgreSQL(AbstractManagementSystem):
     table_class = Table
+    placeholder_format = '${position}'
+    array_parameters = True
+    supports_change_notifications = True
+    supports_partitioning = True
+    supports_materialized_views = True
+    supports_structured_plans = True
+    supports_row_estimates = True
+    supports_advisory_locks = True
+    supports_concurrent_indexes = True
+    supports_index_methods = True
     data_types = {
         'bool': 'boolean',
         'smallserial': 'smallserial',
@@ -155,9 +184,11 @@ class PostgreSQL(AbstractManagementSystem):
         'varchar': 'character varying',
         'text': 'text',
         'json': 'json',
+        'jsonb': 'jsonb',
         'date': 'date',
         'timestamp': 'timestamp',
         'timestamp with time zone': 'timestamp with time zone',
+        'tsvector': 'tsvector',
     }
 
     @classmethod
@@ -186,11 +217,87 @@ class PostgreSQL(AbstractManagementSystem):
 
     @classmethod
     def get_create_table_sql(cls, model_table: 'AbstractTable') -> str:
+        if model_table.partition_by is not None:
+            return cls._get_create_partitioned_table_sql(model_table=model_table)
         return (
             f'CREATE TABLE {model_table.table_name}'
             f'({", ".join([str(column) for column in model_table.columns])})'
         )
 
+    @classmethod
+    def _get_create_partitioned_table_sql(cls, model_table: 'AbstractTable') -> str:
+        # unique constraints on a partitioned table have to include the
+        # partition key, so the primary key becomes (id, partition key)
+        partition_key = model_table.partition_by.field_name
+        column_names = [column.column_name for column in model_table.columns]
+        if partition_key not in column_names:
+            raise ValueError(
+                f'{model_table.table_name} has no {partition_key} column to partition by.'
+            )
+        columns = []
+        primary_key = []
+        for column in model_table.columns:
+            if column.primary_key:
+                primary_key.append(column.column_name)
+                column = copy.copy(column)
+                column.primary_key = False
+                column.unique = False
+            elif column.unique and column.column_name != partition_key:
+                raise ValueError(
+                    f'{model_table.table_name}.{column.column_name} cannot be '
+                    f'unique without including the partition key {partition_key}.'
+                )
+            columns.append(str(column))
+        if partition_key not in primary_key:
+            primary_key.append(partition_key)
+        columns.append(f'PRIMARY KEY ({", ".join(primary_key)})')
+        return (
+            f'CREATE TABLE {model_table.table_name}'
+            f'({", ".join(columns)}) {model_table.partition_by}'
+        )
+
+    @classmethod
+    def get_create_partition_sql(cls, table_name: str, partition: 'Partition') -> str:
+        return (
+            f'CREATE TABLE IF NOT EXISTS {partition.name} '
+            f'PARTITION OF {table_name} {partition.bound}'
+        )
+
+    @classmethod
+    def partition_data_sql(cls, table_name: str) -> str:
+        return """
+            SELECT
+                child.relname AS partition_name
+            FROM
+                pg_inherits
+                JOIN pg_class AS parent ON pg_inherits.inhparent = parent.oid
+                JOIN pg_class AS child ON pg_inherits.inhrelid = child.oid
+            WHERE
+                parent.relname = '{table_name}';
+        """.format(table_name=table_name)
+
+    @classmethod
+    def get_detach_partition_sql(
+        cls,
+        table_name: str,
+        partition_name: str,
+        drop: bool = False,
+    ) -> List[str]:
+        sql_list = [f'ALTER TABLE {table_name} DETACH PARTITION {partition_name}']
+        if drop:
+            sql_list.append(f'DROP TABLE {partition_name}')
+        return sql_list
+
+    @classmethod
+    def get_create_indexes_sql(cls, model_table: 'AbstractTable') -> List[str]:
+        table_name = model_table.table_name
+        return [
+            f'CREATE INDEX {table_name}_{column.column_name}_{column.index_method}_index '
+            f'ON {table_name} USING {column.index_method} ({column.column_name})'
+            for column in model_table.columns
+            if column.index_method is not None
+        ]
+
     @classmethod
     def _get_add_columns_sql(cls, table: Table) -> List[str]:
         table_name = table.table_name
@@ -218,5 +325,144 @@ class PostgreSQL(AbstractManagementSystem):
         drop_columns_table = db_table - model_table
         # TODO check for column updates
         add_sql_list = cls._get_add_columns_sql(table=add_columns_table)
+        add_sql_list += cls.get_create_indexes_sql(model_table=add_columns_table)
         drop_sql_list = cls._get_drop_columns_sql(table=drop_columns_table)
         return add_sql_list + drop_sql_list
+
+    @classmethod
+    def get_notify_channel(cls, table_name: str) -> str:
+        return f'pyasync_orm_{table_name}'
+
+    @classmethod
+    def get_notify_trigger_name(cls, table_name: str) -> str:
+        return f'{table_name}_pyasync_orm_notify'
+
+    @classmethod
+    def trigger_data_sql(cls, table_name: str) -> str:
+        return """
+            SELECT
+                trigger_name
+            FROM
+                information_schema.triggers
+            WHERE
+                event_object_table = '{table_name}';
+        """.format(table_name=table_name)
+
+    @classmethod
+    def get_create_notify_trigger_sql(cls, table_name: str, pk_name: str) -> List[str]:
+        # the payload only carries the primary key to stay under
+        # NOTIFY's 8000 byte limit, subscribers fetch the rows they need;
+        # every table shares the function, so each trigger passes its
+        # primary key column, triggers created before that pass none
+        return [
+            f"""
+            CREATE OR REPLACE FUNCTION {NOTIFY_FUNCTION_NAME}() RETURNS trigger AS $$
+            DECLARE
+                pk_name text := coalesce(TG_ARGV[1], 'id');
+                row_id jsonb;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    row_id := to_jsonb(OLD) -> pk_name;
+                ELSE
+                    row_id := to_jsonb(NEW) -> pk_name;
+                END IF;
+                PERFORM pg_notify(
+                    TG_ARGV[0],
+                    json_build_object('operation', TG_OP, 'id', row_id)::text
+                );
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            f'CREATE TRIGGER {cls.get_notify_trigger_name(table_name)} '
+            f'AFTER INSERT OR UPDATE OR DELETE ON {table_name} '
+            f'FOR EACH ROW EXECUTE PROCEDURE '
+            f"{NOTIFY_FUNCTION_NAME}('{cls.get_notify_channel(table_name)}', '{pk_name}')",
+        ]
+
+    @classmethod
+    def get_drop_notify_trigger_sql(cls, table_name: str) -> List[str]:
+        return [
+            f'DROP TRIGGER IF EXISTS {cls.get_notify_trigger_name(table_name)} '
+            f'ON {table_name}',
+        ]
+
+    @classmethod
+    def materialized_view_data_sql(cls, view_name: str) -> str:
+        return """
+            SELECT
+                matviewname,
+                obj_description(
+                    format('%I.%I', schemaname, matviewname)::regclass,
+                    'pg_class'
+                ) AS query_hash
+            FROM
+                pg_matviews
+            WHERE
+                matviewname = '{view_name}';
+        """.format(view_name=view_name)
+
+    @classmethod
+    def get_create_materialized_view_sql(
+        cls,
+        view_name: str,
+        query: str,
+        unique_fields: Sequence[str],
+    ) -> List[str]:
+        # REFRESH ... CONCURRENTLY needs a unique index without a WHERE clause
+        return [
+            f'CREATE MATERIALIZED VIEW {view_name} AS {query}',
+            f'CREATE UNIQUE INDEX {view_name}_uindex ON {view_name} ({", ".join(unique_fields)})',
+            f"COMMENT ON MATERIALIZED VIEW {view_name} IS '{cls.get_query_hash(query)}'",
+        ]
+
+    @classmethod
+    def get_drop_materialized_view_sql(cls, view_name: str) -> str:
+        return f'DROP MATERIALIZED VIEW {view_name}'
+
+    @classmethod
+    def get_refresh_materialized_view_sql(cls, view_name: str, concurrently: bool) -> str:
+        concurrently_ = ' CONCURRENTLY' if concurrently else ''
+        return f'REFRESH MATERIALIZED VIEW{concurrently_} {view_name}'
+
+    @classmethod
+    def get_explain_sql(cls, query: str, analyze: bool = False) -> str:
+        analyze_ = ', ANALYZE' if analyze else ''
+        return f'EXPLAIN (FORMAT JSON{analyze_}) {query}'
+
+    @classmethod
+    def table_rows_sql(cls) -> str:
+        return """
+            SELECT
+                names.table_name, pg_class.reltuples AS rows
+            FROM
+                unnest($1::text[]) AS names(table_name)
+                JOIN pg_class ON pg_class.oid = to_regclass(names.table_name)
+            WHERE
+                -- reltuples is -1 until the table is first vacuumed or analyzed
+                pg_class.relkind IN ('r', 'p', 'm') AND pg_class.reltuples >= 0;
+        """
+
+    @classmethod
+    def is_transactional(cls, sql: str) -> bool:
+        return NON_TRANSACTIONAL.search(sql) is None
+
+    @classmethod
+    def get_try_lock_sql(cls, key: int) -> str:
+        return f'SELECT pg_try_advisory_lock({key}) AS locked'
+
+    @classmethod
+    def get_unlock_sql(cls, key: int) -> str:
+        return f'SELECT pg_advisory_unlock({key})'
+
+    @classmethod
+    def index_validity_sql(cls) -> str:
+        return """
+            SELECT
+                pg_index.indisvalid AS is_valid
+            FROM
+                pg_index
+                JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+            WHERE
+                pg_class.relname = $1;
+        """
@@ -0,0 +1,229 @@
+import re
+from typing import List, Optional, Union, Any, Callable, Tuple
+
+from pyasync_orm.databases.abstract_column import AbstractColumn
+from pyasync_orm.databases.abstract_management_system import AbstractManagementSystem
+from pyasync_orm.databases.abstract_table import AbstractTable
+
+NON_TRANSACTIONAL = re.compile(r'\s*VACUUM\b', re.IGNORECASE)
+
+
+class DefaultDataType:
+    def __init__(
+        self,
+        column_name: str,
+        data_type: str,
+        null: bool,
+        unique: bool,
+        primary_key: bool,
+        auto_increment: bool,
+        default: Optional[Union[Any, Callable[[], Any]]],
+        max_digits: Optional[int],
+        decimal_places: Optional[int],
+        max_length: Optional[int],
+    ):
+        self.column_name = column_name
+        self.data_type = data_type
+        self.null = ' NOT NULL' if not null else ''
+        self.primary_key = ' PRIMARY KEY' if primary_key else ''
+        # a primary key is already unique
+        self.unique = ' UNIQUE' if unique and not primary_key else ''
+        self.default = f' DEFAULT {default}' if default is not None else ''
+        self.max_digits = max_digits
+        self.decimal_places = decimal_places
+        self.max_length = max_length
+        self.auto_increment = auto_increment
+
+    def __str__(self):
+        return (
+            f'{self.column_name} {self.data_type}'
+            f'{self.null}{self.primary_key}{self.unique}{self.default}'
+        )
+
+
+class CharVarDataType(DefaultDataType):
+    def __str__(self):
+        self.data_type = f'{self.data_type}({self.max_length})'
+        return super().__str__()
+
+
+class NumericDataType(DefaultDataType):
+    def __str__(self):
+        self.data_type = f'{self.data_type}({self.max_digits}, {self.decimal_places})'
+        return super().__str__()
+
+
+class IntDataType(DefaultDataType):
+    def __str__(self):
+        if self.auto_increment and self.primary_key:
+            # only an "integer primary key" column aliases the rowid, SQLite
+            # has no sequences for other columns
+            string_ = f'{self.column_name} integer PRIMARY KEY AUTOINCREMENT'
+        else:
+            string_ = super().__str__()
+        return string_
+
+
+class Column(AbstractColumn):
+    data_type_classes = {
+        'default': DefaultDataType,
+        'varchar': CharVarDataType,
+        'numeric': NumericDataType,
+        'smallint': IntDataType,
+        'integer': IntDataType,
+        'bigint': IntDataType,
+    }
+
+    def __str__(self):
+        data_type_class = self.data_type_classes.get(self.data_type, DefaultDataType)
+        return str(data_type_class(
+            column_name=self.column_name,
+            data_type=self.data_type,
+            null=self.null,
+            unique=self.unique,
+            default=self.default,
+            max_digits=self.max_digits,
+            decimal_places=self.decimal_places,
+            max_length=self.max_length,
+            primary_key=self.primary_key,
+            auto_increment=self.auto_increment,
+        ))
+
+
+class Table(AbstractTable):
+    column_class = Column
+
+    @classmethod
+    def _split_declared_type(
+        cls,
+        declared_type: str,
+    ) -> Tuple[str, List[int]]:
+        match = re.match(r'^\s*([^(]+?)\s*(?:\((.*)\))?\s*$', declared_type)
+        data_type = match.group(1).lower()
+        arguments = [
+            int(argument)
+            for argument in (match.group(2) or '').split(',')
+            if argument.strip()
+        ]
+        return data_type, arguments
+
+    @classmethod
+    def from_db(
+        cls,
+        table_name: str,
+        column_data: List[dict],
+        index_data: List[dict],
+    ) -> 'Table':
+        unique_columns = [
+            data['column_name']
+            for data in index_data
+            if data['is_unique'] and data['origin'] != 'pk'
+        ]
+        columns = []
+        for record in column_data:
+            data_type, arguments = cls._split_declared_type(record['data_type'])
+            primary_key = bool(record['pk'])
+            columns.append(cls.column_class(
+                column_name=record['column_name'],
+                data_type=data_type,
+                null=not record['notnull'] and not primary_key,
+                primary_key=primary_key,
+                auto_increment=primary_key and data_type == 'integer',
+                unique=primary_key or record['column_name'] in unique_columns,
+                default=record['column_default'],
+                max_length=arguments[0] if data_type == 'varchar' and arguments else None,
+                max_digits=arguments[0] if data_type == 'numeric' and arguments else None,
+                decimal_places=arguments[1] if data_type == 'numeric' and len(arguments) > 1 else None,
+            ))
+        return cls(table_name=table_name, columns=columns)
+
+    def __sub__(self, other: 'Table') -> 'Table':
+        other_column_names = {column.column_name for column in other.columns}
+        add_columns = [column for column in self.columns if column.column_name not in other_column_names]
+        return Table(table_name=self.table_name, columns=add_columns)
+
+
+class SQLite(AbstractManagementSystem):
+    table_class = Table
+    placeholder_format = '?{position}'
+    data_types = {
+        'bool': 'boolean',
+        'smallserial': 'integer',
+        'serial': 'integer',
+        'bigserial': 'integer',
+        'smallint': 'smallint',
+        'integer': 'integer',
+        'bigint': 'bigint',
+        'numeric': 'numeric',
+        'double precision': 'real',
+        'varchar': 'varchar',
+        'text': 'text',
+        'json': 'text',
+        'jsonb': 'text',
+        'date': 'date',
+        'timestamp': 'timestamp',
+        'timestamp with time zone': 'timestamp with time zone',
+        'tsvector': None,
+    }
+
+    @classmethod
+    def column_data_sql(cls, table_name: str) -> str:
+        return """
+            SELECT
+                name AS column_name, dflt_value AS column_default,
+                "notnull", type AS data_type, pk
+            FROM
+                pragma_table_info('{table_name}');
+        """.format(table_name=table_name)
+
+    @classmethod
+    def index_data_sql(cls, table_name: str) -> str:
+        return """
+            SELECT
+                index_list.name AS indexname, index_list."unique" AS is_unique,
+                index_list.origin, index_info.name AS column_name
+            FROM
+                pragma_index_list('{table_name}') AS index_list
+                JOIN pragma_index_info(index_list.name) AS index_info;
+        """.format(table_name=table_name)
+
+    @classmethod
+    def get_create_table_sql(cls, model_table: 'AbstractTable') -> str:
+        if model_table.partition_by is not None:
+            cls.check_supports('partitioning')
+        return (
+            f'CREATE TABLE {model_table.table_name}'
+            f'({", ".join([str(column) for column in model_table.columns])})'
+        )
+
+    @classmethod
+    def _get_add_columns_sql(cls, table: Table) -> List[str]:
+        table_name = table.table_name
+        return [
+            f'ALTER TABLE {table_name} ADD COLUMN {column}'
+            for column in table.columns
+        ]
+
+    @classmethod
+    def _get_drop_columns_sql(cls, table: Table) -> List[str]:
+        table_name = table.table_name
+        return [
+            f'ALTER TABLE {table_name} DROP COLUMN {column.column_name}'
+            for column in table.columns
+        ]
+
+    @classmethod
+    def get_alter_table_sql(
+        cls,
+        model_table: 'AbstractTable',
+        db_table: 'AbstractTable'
+    ) -> List[str]:
+        add_columns_table = model_table - db_table
+        drop_columns_table = db_table - model_table
+        add_sql_list = cls._get_add_columns_sql(table=add_columns_table)
+        drop_sql_list = cls._get_drop_columns_sql(table=drop_columns_table)
+        return add_sql_list + drop_sql_list
+
+    @classmethod
+    def is_transactional(cls, sql: str) -> bool:
+        return NON_TRANSACTIONAL.match(sql) is None
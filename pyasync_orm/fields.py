@@ -1,9 +1,12 @@
 import json
 from abc import abstractmethod, ABC
 from enum import Enum
-from typing import Optional, Type, Union, Any, Callable
+from typing import Optional, Type, Union, Any, Callable, Tuple, Sequence
 
+from pyasync_orm.codecs import get_json_codec, get_jsonb_codec, Dumps, Loads
+from pyasync_orm.databases.abstract_management_system import UnsupportedFeatureError
 from pyasync_orm.orm import ORM
+from pyasync_orm.sql import to_literal
 
 
 class Symbol(Enum):
@@ -15,14 +18,194 @@ class Symbol(Enum):
     GREATER_THAN_OR_EQUAL_TO = '>='
 
 
-class SearchCondition:
+class Connector(Enum):
+    AND = 'AND'
+    OR = 'OR'
+
+
+class BaseSearchCondition(ABC):
+    """
+    Conditions combine with & (AND), | (OR) and ~ (NOT), e.g.
+    (Customer.a == 1) | ~(Customer.b > 2)
+    """
+
+    def __and__(self, other: 'BaseSearchCondition') -> 'SearchConditionGroup':
+        return SearchConditionGroup(Connector.AND, self, other)
+
+    def __or__(self, other: 'BaseSearchCondition') -> 'SearchConditionGroup':
+        return SearchConditionGroup(Connector.OR, self, other)
+
+    def __invert__(self) -> 'NegatedSearchCondition':
+        return NegatedSearchCondition(self)
+
+    @abstractmethod
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        """placeholder swaps a value for the next query parameter."""
+        pass
+
+
+class SearchCondition(BaseSearchCondition):
     def __init__(self, field_name: str, symbol: Symbol, field_value: Any):
         self.field_name = field_name
         self.symbol: str = symbol.value
         self.field_value = field_value
 
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        return f'{self.field_name} {self.symbol} {_value_sql(self.field_value, placeholder)}'
+
+
+def _value_sql(value: Any, placeholder: Callable[[Any], str]) -> str:
+    """
+    A field is a column of the outer query, e.g. to correlate an Exists,
+    and an ORM query a scalar subquery, anything else a parameter.
+    """
+    if isinstance(value, BaseField):
+        return f'{value.table_name}.{value.name}'
+    if isinstance(value, ORM):
+        return f'({value.build_subquery(placeholder=placeholder)})'
+    return placeholder(value)
+
+
+class InSearchCondition(BaseSearchCondition):
+    def __init__(self, field_name: str, field_values: Union[ORM, Sequence[Any]]):
+        self.field_name = field_name
+        self.field_values = field_values
+
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        if isinstance(self.field_values, ORM):
+            return f'{self.field_name} IN ({self.field_values.build_subquery(placeholder)})'
+        if not self.field_values:
+            # IN () is a syntax error
+            return '1 = 0'
+        placeholders = ', '.join(placeholder(value) for value in self.field_values)
+        return f'{self.field_name} IN ({placeholders})'
+
+
+class AnySearchCondition(BaseSearchCondition):
+    """field = ANY($1), one array parameter and so one statement for any number of values."""
+
+    def __init__(self, field_name: str, field_values: Sequence[Any]):
+        self.field_name = field_name
+        self.field_values = field_values
+
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        return f'{self.field_name} = ANY({placeholder(list(self.field_values))})'
+
+
+class Exists(BaseSearchCondition):
+    """
+    Whether query finds any rows, compare fields to the outer model's to
+    correlate it, e.g.
+    Customer.orm.filter(Exists(Order.orm.filter(Order.customer_id == Customer.id)))
+    """
+
+    def __init__(self, query: ORM):
+        self.query = query
+
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        return f'EXISTS ({self.query.build_subquery(placeholder)})'
+
+
+class SearchConditionGroup(BaseSearchCondition):
+    def __init__(self, connector: Connector, *search_conditions: BaseSearchCondition):
+        self.connector = connector
+        self.search_conditions: Tuple[BaseSearchCondition, ...] = ()
+        for search_condition in search_conditions:
+            # (a | b) | c is kept flat as (a OR b OR c)
+            if (
+                isinstance(search_condition, SearchConditionGroup)
+                and search_condition.connector == connector
+            ):
+                self.search_conditions += search_condition.search_conditions
+            else:
+                self.search_conditions += (search_condition,)
+
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        connector = f' {self.connector.value} '
+        return '(' + connector.join(
+            search_condition.to_sql(placeholder)
+            for search_condition in self.search_conditions
+        ) + ')'
+
+
+class NegatedSearchCondition(BaseSearchCondition):
+    def __init__(self, search_condition: BaseSearchCondition):
+        self.search_condition = search_condition
+
+    def __invert__(self) -> BaseSearchCondition:
+        return self.search_condition
+
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        return f'NOT ({self.search_condition.to_sql(placeholder)})'
+
+
+# how TextSearchCondition parses the search text into a tsquery
+TSQUERY_FUNCTIONS = {
+    'plain': 'plainto_tsquery',
+    'phrase': 'phraseto_tsquery',
+    'websearch': 'websearch_to_tsquery',
+    'raw': 'to_tsquery',
+}
+
+
+def _tsquery_sql(
+    query: str,
+    config: str,
+    search_type: str,
+    placeholder: Callable[[Any], str],
+) -> str:
+    try:
+        function = TSQUERY_FUNCTIONS[search_type]
+    except KeyError:
+        raise ValueError(
+            f'search_type must be one of {tuple(TSQUERY_FUNCTIONS)}, got {search_type!r}'
+        ) from None
+    return f'{function}({to_literal(config)}, {placeholder(query)})'
+
+
+class TextSearchCondition(BaseSearchCondition):
+    def __init__(self, field_name: str, query: str, config: str, search_type: str):
+        self.field_name = field_name
+        self.query = query
+        self.config = config
+        self.search_type = search_type
+
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        tsquery = _tsquery_sql(self.query, self.config, self.search_type, placeholder)
+        return f'{self.field_name} @@ {tsquery}'
+
+
+class SearchRank:
+    """An ORM.order_by term, best matches first unless descending=False."""
+
+    def __init__(
+        self,
+        field_name: str,
+        query: str,
+        config: str,
+        search_type: str,
+        descending: bool = True,
+    ):
+        self.field_name = field_name
+        self.query = query
+        self.config = config
+        self.search_type = search_type
+        self.descending = descending
+
+    def to_sql(self, placeholder: Callable[[Any], str]) -> str:
+        tsquery = _tsquery_sql(self.query, self.config, self.search_type, placeholder)
+        direction = ' DESC' if self.descending else ''
+        return f'ts_rank({self.field_name}, {tsquery}){direction}'
+
 
 class BaseField(ABC):
+    # array/numpy typecode for columnar results, None keeps python objects
+    array_typecode: Optional[str] = None
+    # the exact type of the values read from the column, None if it varies
+    python_type: Optional[type] = None
+    # db_column_dict of the connected database, see freeze()
+    _frozen_column: Optional[dict] = None
+
     def __init__(
         self,
         null: bool = True,
@@ -39,6 +222,7 @@ class BaseField(ABC):
             self.default = None
             self.unique = True
         self.name = ''  # set by Model.__init_subclass__
+        self.table_name = ''  # set by Model.__init_subclass__
 
     def __lt__(self, value: Any) -> SearchCondition:
         return SearchCondition(
@@ -82,13 +266,28 @@ class BaseField(ABC):
             field_value=value,
         )
 
+    def in_(self, values: Union[ORM, Sequence[Any]]) -> InSearchCondition:
+        """values is a sequence or an ORM query selecting one field with values()."""
+        return InSearchCondition(field_name=self.name, field_values=values)
+
+    def any_(self, values: Sequence[Any]) -> AnySearchCondition:
+        """Like in_ for databases with array parameters, such as PostgreSQL."""
+        return AnySearchCondition(field_name=self.name, field_values=values)
+
     @property
     @abstractmethod
     def data_type(self) -> str:
         pass
 
+    def freeze(self):
+        """Caches db_column_dict for the connected database."""
+        self._frozen_column = None
+        self._frozen_column = self.db_column_dict
+
     @property
     def db_column_dict(self) -> dict:
+        if self._frozen_column is not None:
+            return dict(self._frozen_column)
         return {
             'data_type': self.data_type,
             'null': self.null,
@@ -99,10 +298,15 @@ class BaseField(ABC):
             'max_length': getattr(self, 'max_length', None),
             'max_digits': getattr(self, 'max_digits', None),
             'decimal_places': getattr(self, 'decimal_places', None),
+            'generated': getattr(self, 'generated', None),
+            'index_method': getattr(self, 'index_method', None),
         }
 
 
 class BaseIntField(BaseField, ABC):
+    array_typecode = 'q'
+    python_type = int
+
     def __init__(
         self,
         auto_increment: bool = False,
@@ -160,18 +364,26 @@ class DecimalField(BaseField):
 
 
 class FloatField(BaseField):
+    array_typecode = 'd'
+    python_type = float
+
     @property
     def data_type(self) -> str:
         return ORM.database.management_system.data_types['double precision']
 
 
 class BooleanField(BaseField):
+    array_typecode = '?'
+    python_type = bool
+
     @property
     def data_type(self) -> str:
         return ORM.database.management_system.data_types['bool']
 
 
 class VarCharField(BaseField):
+    python_type = str
+
     def __init__(
         self,
         max_length: int,
@@ -186,26 +398,48 @@ class VarCharField(BaseField):
 
 
 class TextField(BaseField):
+    python_type = str
+
     @property
     def data_type(self) -> str:
         return ORM.database.management_system.data_types['text']
 
 
 class JSONField(BaseField):
+    # the PostgreSQL type the codec is registered for
+    codec_type = 'json'
+
     def __init__(
         self,
         encoder: Optional[Type[json.JSONEncoder]] = None,
         decoder: Optional[Type[json.JSONDecoder]] = None,
         **kwargs,
     ):
-        self.encoder = encoder or json.JSONEncoder
-        self.decoder = decoder or json.JSONDecoder
+        # None uses the fast library configured in pyasync_orm.codecs
+        self.encoder = encoder
+        self.decoder = decoder
         super().__init__(**kwargs)
 
     @property
     def data_type(self) -> str:
         return ORM.database.management_system.data_types['json']
 
+    @property
+    def codec(self) -> Tuple[Dumps, Loads]:
+        return get_json_codec(encoder=self.encoder, decoder=self.decoder)
+
+
+class JSONBField(JSONField):
+    codec_type = 'jsonb'
+
+    @property
+    def data_type(self) -> str:
+        return ORM.database.management_system.data_types['jsonb']
+
+    @property
+    def codec(self) -> Tuple[Dumps, Loads]:
+        return get_jsonb_codec(encoder=self.encoder, decoder=self.decoder)
+
 
 class DateField(BaseField):
     def __init__(
@@ -238,3 +472,70 @@ class DateTimeField(DateField):
             'timestamp' if self.with_time_zone else 'timestamp with time zone'
         )
         return ORM.database.management_system.data_types[timestamp]
+
+
+class TSVectorField(BaseField):
+    """
+    A tsvector generated from source_fields, e.g.
+    search_vector = TSVectorField(source_fields=('first_name', 'last_name'))
+    Migrations give it a GIN index, so matches() is an index lookup.
+    """
+    index_method = 'gin'
+
+    def __init__(
+        self,
+        source_fields: Sequence[str],
+        config: str = 'english',
+        **kwargs,
+    ):
+        self.source_fields = source_fields
+        self.config = config
+        super().__init__(**kwargs)
+
+    @property
+    def generated(self) -> str:
+        document = " || ' ' || ".join(
+            f"coalesce({field_name}, '')" for field_name in self.source_fields
+        )
+        return f'to_tsvector({to_literal(self.config)}, {document})'
+
+    @property
+    def data_type(self) -> str:
+        data_type = ORM.database.management_system.data_types['tsvector']
+        if data_type is None:
+            raise UnsupportedFeatureError(
+                f'{ORM.database.management_system.__name__} does not support full-text search.'
+            )
+        return data_type
+
+    def matches(
+        self,
+        query: str,
+        config: Optional[str] = None,
+        search_type: str = 'websearch',
+    ) -> TextSearchCondition:
+        """
+        search_type parses query as 'websearch' (quotes, or, -word),
+        'plain', 'phrase' or 'raw' tsquery syntax.
+        """
+        return TextSearchCondition(
+            field_name=self.name,
+            query=query,
+            config=config or self.config,
+            search_type=search_type,
+        )
+
+    def rank(
+        self,
+        query: str,
+        config: Optional[str] = None,
+        search_type: str = 'websearch',
+        descending: bool = True,
+    ) -> SearchRank:
+        return SearchRank(
+            field_name=self.name,
+            query=query,
+            config=config or self.config,
+            search_type=search_type,
+            descending=descending,
+        )
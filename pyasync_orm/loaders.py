@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Type, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pyasync_orm.models import Model
+
+
+# the loader of the current Database.batch_loads() block
+_loader: ContextVar[Optional['Loader']] = ContextVar('pyasync_orm_loader', default=None)
+
+
+class Loader:
+    """
+    Collects the primary key gets of one model made within window seconds,
+    or the same event loop tick with window=0, and loads them with a single
+    query. Each caller gets its own row, or the ValueError get would raise.
+    The query gets the time left to the earliest timeout of its callers.
+    """
+
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self._pending: Dict[Type['Model'], Dict[Any, List[asyncio.Future]]] = {}
+        # loop time by which the pending batch of a model must be loaded
+        self._deadlines: Dict[Type['Model'], float] = {}
+
+    async def load(
+        self,
+        model_class: Type['Model'],
+        pk: Any,
+        timeout: Optional[float] = None,
+    ) -> 'Model':
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        if model_class not in self._pending:
+            self._pending[model_class] = {}
+            loop.call_later(self.window, self._dispatch, model_class)
+        self._pending[model_class].setdefault(pk, []).append(future)
+        if timeout is not None:
+            deadline = loop.time() + timeout
+            self._deadlines[model_class] = min(
+                self._deadlines.get(model_class, deadline),
+                deadline,
+            )
+        return await future
+
+    def _dispatch(self, model_class: Type['Model']):
+        futures_by_pk = self._pending.pop(model_class)
+        deadline = self._deadlines.pop(model_class, None)
+        timeout = (
+            None if deadline is None
+            else max(deadline - asyncio.get_event_loop().time(), 0)
+        )
+        # the batch serves every caller, it must not run in the first one's
+        # transaction or inherit its priority, trackers or plan recorder
+        contextvars.Context().run(
+            asyncio.ensure_future,
+            self._load_batch(model_class, futures_by_pk, timeout),
+        )
+
+    @staticmethod
+    async def _load_batch(
+        model_class: Type['Model'],
+        futures_by_pk: Dict[Any, List[asyncio.Future]],
+        timeout: Optional[float],
+    ):
+        pks = list(futures_by_pk)
+        if model_class.orm.database.management_system.array_parameters:
+            search_condition = model_class.id.any_(pks)
+        else:
+            search_condition = model_class.id.in_(pks)
+        try:
+            models = await model_class.orm.filter(search_condition).all(timeout=timeout)
+        except Exception as error:
+            for futures in futures_by_pk.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+            return
+        models_by_pk = {model.id: model for model in models}
+        for pk, futures in futures_by_pk.items():
+            model = models_by_pk.get(pk)
+            for future in futures:
+                if future.done():
+                    continue
+                if model is None:
+                    future.set_exception(ValueError(
+                        f'{model_class.__name__} get query found no record.'
+                    ))
+                else:
+                    future.set_result(model)
@@ -1,14 +1,41 @@
 import inspect
 import os
+import re
 from contextlib import suppress
-from typing import Tuple, List, Any, TYPE_CHECKING
+from typing import Tuple, List, Any, TYPE_CHECKING, Set, Type
 
+from pyasync_orm.models import MaterializedView
 from pyasync_orm.orm import ORM
 
 if TYPE_CHECKING:
     from pyasync_orm.database import Database
     from pyasync_orm.models import Model
 
+MIGRATION_FILE = re.compile(r'^migration_(\d+)\.py$')
+
+
+def get_migrations_directory(database: 'Database') -> str:
+    """The migrations directory next to the module of the first model."""
+    return os.path.join(
+        os.path.dirname(inspect.getmodule(database.models[0]).__file__),
+        'migrations',
+    )
+
+
+def get_migration_paths(migrations_directory: str) -> List[str]:
+    """The migration_N.py files of the directory, ordered by N."""
+    if not os.path.isdir(migrations_directory):
+        return []
+    numbered_names = []
+    for name in os.listdir(migrations_directory):
+        match = MIGRATION_FILE.match(name)
+        if match:
+            numbered_names.append((int(match.group(1)), name))
+    return [
+        os.path.join(migrations_directory, name)
+        for _, name in sorted(numbered_names)
+    ]
+
 
 class Migration:
     def __init__(self, database: 'Database'):
@@ -34,19 +61,97 @@ class Migration:
             )
         return column_data, index_data
 
+    async def _get_trigger_names(self, table_name: str) -> Set[str]:
+        management_system = self.database.management_system
+        if not management_system.supports_change_notifications:
+            return set()
+        trigger_data_sql = management_system.trigger_data_sql(table_name=table_name)
+        async with self.database.get_connection() as connection:
+            trigger_data = await connection.fetch(trigger_data_sql)
+        return {record['trigger_name'] for record in trigger_data}
+
+    async def _add_notify_trigger_sql(self, model: 'Model', table_exists: bool):
+        management_system = self.database.management_system
+        trigger_names = (
+            await self._get_trigger_names(table_name=model.table_name)
+            if table_exists else set()
+        )
+        if model.notify_changes:
+            management_system.check_supports('change_notifications')
+            trigger_name = management_system.get_notify_trigger_name(model.table_name)
+            if trigger_name not in trigger_names:
+                self.sql += management_system.get_create_notify_trigger_sql(
+                    table_name=model.table_name,
+                    pk_name=model.id.name,
+                )
+        elif trigger_names:
+            trigger_name = management_system.get_notify_trigger_name(model.table_name)
+            if trigger_name in trigger_names:
+                self.sql += management_system.get_drop_notify_trigger_sql(
+                    table_name=model.table_name,
+                )
+
+    async def _add_materialized_view_sql(self, model: Type[MaterializedView]):
+        management_system = self.database.management_system
+        management_system.check_supports('materialized_views')
+        async with self.database.get_connection() as connection:
+            view_data = await connection.fetch(
+                management_system.materialized_view_data_sql(view_name=model.table_name)
+            )
+        query = model.get_view_sql()
+        if view_data:
+            if view_data[0]['query_hash'] == management_system.get_query_hash(query):
+                return
+            # the query changed, or the view predates query hashes
+            self.sql.append(
+                management_system.get_drop_materialized_view_sql(view_name=model.table_name)
+            )
+        self.sql += management_system.get_create_materialized_view_sql(
+            view_name=model.table_name,
+            query=query,
+            unique_fields=model.unique_fields,
+        )
+
     async def _add_sql(self, model: 'Model'):
+        if issubclass(model, MaterializedView):
+            await self._add_materialized_view_sql(model)
+            return
         # TODO check for model renames
         # if we are adding and dropping
         # if model is in same file
         # TODO check for column renames
         # if we are adding and dropping on same model
         # with same data type
-        # self.sql += ORM.database.management_system.get_alter_table_sql(
-        #     model_table=model_table,
-        #     db_table=db_table,
-        # )
-        # self.sql.append(ORM.database.management_system.get_create_table_sql(model_table=model_table))
-        pass
+        model_table = self.model_tables[model.table_name]
+        db_table = self.db_tables.get(model.table_name)
+        if db_table is None:
+            self.sql.append(
+                self.database.management_system.get_create_table_sql(
+                    model_table=model_table,
+                )
+            )
+            self.sql += self.database.management_system.get_create_indexes_sql(
+                model_table=model_table,
+            )
+            if model_table.partition_by is not None:
+                self.sql += [
+                    self.database.management_system.get_create_partition_sql(
+                        table_name=model_table.table_name,
+                        partition=partition,
+                    )
+                    for partition in model_table.partition_by.get_partitions(
+                        table_name=model_table.table_name,
+                    )
+                ]
+        else:
+            self.sql += self.database.management_system.get_alter_table_sql(
+                model_table=model_table,
+                db_table=db_table,
+            )
+        await self._add_notify_trigger_sql(
+            model=model,
+            table_exists=db_table is not None,
+        )
 
     def _gather_model_tables(self):
         for model in self.database.models:
@@ -59,37 +164,42 @@ class Migration:
 
     async def _gather_db_tables(self):
         # TODO go to database to get all tables
-        # column_data, index_data = await self._get_database_data(model.table_name)
-        # if column_data:
-        #     db_table = ORM.database.management_system.table_class.from_db(
-        #         table_name=model.table_name,
-        #         column_data=column_data,
-        #         index_data=index_data,
-        #     )
-        pass
+        for model in self.database.models:
+            column_data, index_data = await self._get_database_data(model.table_name)
+            if column_data:
+                db_table = self.database.management_system.table_class.from_db(
+                    table_name=model.table_name,
+                    column_data=column_data,
+                    index_data=index_data,
+                )
+                self.db_tables.update({model.table_name: db_table})
 
     async def _gather_tables(self):
         self._gather_model_tables()
         await self._gather_db_tables()
 
-    def _get_or_create_migrations_directory(self):
-        migration_path = os.path.dirname(
-            inspect.getmodule(self.database.models[0]).__file__
-        ) + '/migrations'
+    def _get_or_create_migrations_directory(self) -> str:
+        migrations_directory = get_migrations_directory(self.database)
         with suppress(FileExistsError):
-            os.mkdir(migration_path)
-        os.chdir(migration_path)
+            os.mkdir(migrations_directory)
+        return migrations_directory
 
-    def _write_to_file(self):
+    def _write_to_file(self, migrations_directory: str):
         # TODO raise error if non-migration files exist
-        file_number = len(os.listdir()) + 1
-        with open(f'migration_{file_number}.py', 'x') as file:
+        file_number = len(get_migration_paths(migrations_directory)) + 1
+        path = os.path.join(migrations_directory, f'migration_{file_number}.py')
+        with open(path, 'x') as file:
             file.write('migrations = [\n')
             for sql in self.sql:
-                file.write(f'\t\'{sql}\',\n')
+                file.write(f'\t{sql!r},\n')
             file.write(']\n')
 
     async def write_migration(self):
         await self._gather_tables()
-        self._get_or_create_migrations_directory()
-        self._write_to_file()
+        # views are created after the tables they select from
+        for model in sorted(
+            self.database.models,
+            key=lambda model_: issubclass(model_, MaterializedView),
+        ):
+            await self._add_sql(model)
+        self._write_to_file(self._get_or_create_migrations_directory())
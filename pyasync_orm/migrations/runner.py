@@ -0,0 +1,208 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from pyasync_orm.migrations.migration import get_migration_paths, get_migrations_directory
+
+if TYPE_CHECKING:
+    from pyasync_orm.database import Database
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = 'pyasync_orm_migrations'
+# the advisory lock key of migration runs, the same on every node
+MIGRATION_LOCK_KEY = 7_234_157_360_187_331_949
+CREATE_INDEX_CONCURRENTLY = re.compile(
+    r'^\s*CREATE\s+(UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)',
+    re.IGNORECASE,
+)
+
+
+class MigrationRunner:
+    """
+    Applies the migration_N.py files written by Migration.write_migration
+    in order and records them in the pyasync_orm_migrations table.
+
+    A run holds an advisory lock, so when many nodes deploy at once one
+    applies the migrations and run() returns right away on the others
+    instead of blocking their startup, unless told to wait. Consecutive
+    statements of a migration are applied in one transaction together with
+    its progress; statements PostgreSQL cannot run in a transaction, like
+    CREATE INDEX CONCURRENTLY, run on their own. An interrupted run resumes
+    from the first statement that was not recorded, dropping the invalid
+    index an interrupted CREATE INDEX CONCURRENTLY leaves behind.
+
+    The lock belongs to the session, so run migrations through a direct
+    connection rather than PgBouncer in transaction mode. SQLite has no
+    advisory locks, there a single process is expected to migrate.
+    """
+
+    def __init__(
+        self,
+        database: 'Database',
+        migrations_directory: Optional[str] = None,
+        statement_timeout: Optional[float] = None,
+    ):
+        self.database = database
+        self.migrations_directory = (
+            migrations_directory or get_migrations_directory(database)
+        )
+        self.statement_timeout = statement_timeout
+
+    @staticmethod
+    def load_migration(path: str) -> List[str]:
+        name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return list(module.migrations)
+
+    def get_migrations(self) -> List[Tuple[str, List[str]]]:
+        return [
+            (os.path.splitext(os.path.basename(path))[0], self.load_migration(path))
+            for path in get_migration_paths(self.migrations_directory)
+        ]
+
+    def _get_steps(self, statements: Sequence[str]) -> List[Tuple[int, int]]:
+        """
+        Splits the statements into (start, end) steps, consecutive
+        transactional statements make up one step.
+        """
+        management_system = self.database.management_system
+        steps = []
+        start = 0
+        for index, sql in enumerate(statements):
+            if not management_system.is_transactional(sql):
+                if start < index:
+                    steps.append((start, index))
+                steps.append((index, index + 1))
+                start = index + 1
+        if start < len(statements):
+            steps.append((start, len(statements)))
+        return steps
+
+    async def run(self, wait: float = 0.0, poll_interval: float = 1.0) -> List[str]:
+        """
+        Applies the pending migrations and returns their names. If another
+        node holds the lock for more than wait seconds nothing is applied.
+        """
+        if self.database.client.pool_options.pooler is not None:
+            raise ValueError(
+                'Migrations hold a session advisory lock, run them through a '
+                'direct connection instead of the pooler.'
+            )
+        async with self.database.session():
+            if not await self._lock(wait=wait, poll_interval=poll_interval):
+                logger.info('Another node is applying migrations, skipping.')
+                return []
+            try:
+                return await self._apply_pending()
+            finally:
+                await self._unlock()
+
+    async def _lock(self, wait: float, poll_interval: float) -> bool:
+        management_system = self.database.management_system
+        if not management_system.supports_advisory_locks:
+            return True
+        try_lock_sql = management_system.get_try_lock_sql(MIGRATION_LOCK_KEY)
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + wait
+        while True:
+            records = await self.database.fetch(try_lock_sql)
+            if records[0]['locked']:
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(poll_interval, remaining))
+
+    async def _unlock(self):
+        management_system = self.database.management_system
+        if not management_system.supports_advisory_locks:
+            return
+        try:
+            await self.database.fetch(management_system.get_unlock_sql(MIGRATION_LOCK_KEY))
+        except Exception:
+            # runs in a finally block, the run's own error must propagate;
+            # asyncpg's pool reset releases the session's advisory locks
+            logger.exception('Releasing the migration lock failed.')
+
+    async def _get_progress(self) -> Dict[str, Tuple[int, bool]]:
+        """Migration name -> (statements applied, whether it is complete)."""
+        await self.database.execute(
+            f'CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ('
+            'name varchar(255) PRIMARY KEY, '
+            'statements_applied integer NOT NULL, '
+            'applied_at timestamp)'
+        )
+        records = await self.database.fetch(
+            f'SELECT name, statements_applied, applied_at FROM {MIGRATIONS_TABLE}'
+        )
+        return {
+            record['name']: (record['statements_applied'], record['applied_at'] is not None)
+            for record in records
+        }
+
+    async def _record_progress(self, name: str, statements_applied: int, complete: bool):
+        placeholder_format = self.database.management_system.placeholder_format
+        name_, statements_applied_ = (
+            placeholder_format.format(position=position) for position in (1, 2)
+        )
+        applied_at = 'CURRENT_TIMESTAMP' if complete else 'NULL'
+        await self.database.execute(
+            f'INSERT INTO {MIGRATIONS_TABLE} (name, statements_applied, applied_at) '
+            f'VALUES ({name_}, {statements_applied_}, {applied_at}) '
+            'ON CONFLICT (name) DO UPDATE SET '
+            'statements_applied = excluded.statements_applied, '
+            'applied_at = excluded.applied_at',
+            name,
+            statements_applied,
+        )
+
+    async def _apply_pending(self) -> List[str]:
+        progress = await self._get_progress()
+        applied = []
+        for name, statements in self.get_migrations():
+            statements_applied, complete = progress.get(name, (0, False))
+            if complete:
+                continue
+            if statements_applied:
+                logger.info('Resuming %s at statement %d.', name, statements_applied + 1)
+            await self._apply(name, statements, statements_applied)
+            applied.append(name)
+        return applied
+
+    async def _apply(self, name: str, statements: List[str], statements_applied: int):
+        logger.info('Applying %s.', name)
+        for start, end in self._get_steps(statements):
+            if end <= statements_applied:
+                continue
+            complete = end == len(statements)
+            if self.database.management_system.is_transactional(statements[start]):
+                async with self.database.transaction():
+                    for sql in statements[start:end]:
+                        await self.database.execute(sql, timeout=self.statement_timeout)
+                    await self._record_progress(name, end, complete)
+            else:
+                await self._apply_non_transactional(statements[start])
+                await self._record_progress(name, end, complete)
+        if not statements:
+            await self._record_progress(name, 0, True)
+
+    async def _apply_non_transactional(self, sql: str):
+        match = CREATE_INDEX_CONCURRENTLY.match(sql)
+        if match is not None and self.database.management_system.supports_concurrent_indexes:
+            # the run may have stopped between building the index and
+            # recording it, or while building it
+            records = await self.database.fetch(
+                self.database.management_system.index_validity_sql(),
+                match.group(3),
+            )
+            if records and records[0]['is_valid']:
+                return
+            if records:
+                await self.database.execute(f'DROP INDEX CONCURRENTLY {match.group(3)}')
+        await self.database.execute(sql, timeout=self.statement_timeout)
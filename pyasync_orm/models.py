@@ -1,15 +1,25 @@
-from typing import Set
+from abc import ABC, abstractmethod
+from typing import Set, Dict, Optional, TYPE_CHECKING, Sequence, Union
 
 import inflection
 
 from pyasync_orm.fields import BaseField, BigIntegerField
 from pyasync_orm.orm import ORM
 
+if TYPE_CHECKING:
+    from pyasync_orm.partitions import BasePartitioning
+
 
 class Model:
     table_name: str
     orm: ORM
     id: BigIntegerField
+    # migrations add a trigger publishing row changes for ORM.subscribe
+    notify_changes: bool = False
+    # e.g. RangePartitioning('created_at'), migrations create a partitioned table
+    partition_by: Optional['BasePartitioning'] = None
+    read_only: bool = False
+    _frozen_fields: Optional[Dict[str, BaseField]] = None
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -30,11 +40,37 @@ class Model:
     def __repr__(self):
         return f'{self}'
 
+    @classmethod
+    def get_fields(cls) -> Dict[str, BaseField]:
+        # a parent's frozen fields are not the subclass's
+        frozen_fields = cls.__dict__.get('_frozen_fields')
+        if frozen_fields is not None:
+            return frozen_fields
+        return {
+            name: value for name, value in vars(cls).items()
+            if isinstance(value, BaseField)
+        }
+
+    @classmethod
+    def freeze(cls):
+        """
+        Caches the fields and their column metadata, and the ORM's empty
+        query, for the connected database. Database.connect calls it for
+        the models it is given.
+        """
+        cls._frozen_fields = None
+        fields = cls.get_fields()
+        for field in fields.values():
+            field.freeze()
+        cls._frozen_fields = fields
+        cls.orm.freeze()
+
     @classmethod
     def _set_field_names(cls):
         for name, field_instance in cls.__dict__.items():
             if isinstance(field_instance, BaseField):
                 field_instance.name = name
+                field_instance.table_name = cls.table_name
 
     def _validate_fields(self, field_names_to_set: Set[str]):
         extra_kwargs = set(self.__dict__.keys()) - field_names_to_set
@@ -51,3 +87,33 @@ class Model:
         for key, value in data.items():
             setattr(instance, key, value)
         return instance
+
+
+class MaterializedView(Model, ABC):
+    """
+    A read-only model over a materialized view of get_query, e.g.
+
+        class CustomerReport(MaterializedView):
+            first_name = fields.VarCharField(max_length=100)
+
+            @classmethod
+            def get_query(cls):
+                return Customer.orm.filter(Customer.id > 10)
+
+    Migrations create the view and a unique index on unique_fields so
+    Database.refresh can refresh it concurrently, without blocking reads.
+    """
+    read_only = True
+    unique_fields: Sequence[str] = ('id',)
+
+    @classmethod
+    @abstractmethod
+    def get_query(cls) -> Union[ORM, str]:
+        """An ORM query or SQL selecting the view's fields."""
+
+    @classmethod
+    def get_view_sql(cls) -> str:
+        query = cls.get_query()
+        if isinstance(query, ORM):
+            return query.build_literal_select()
+        return query
@@ -1,18 +1,34 @@
-from typing import TYPE_CHECKING, Type, Optional, List, TypeVar, Tuple
+import asyncio
+import functools
+import operator
+from typing import (
+    TYPE_CHECKING, Type, Optional, List, TypeVar, Tuple, Any, Union, Dict, Sequence,
+    Callable,
+)
 
-from pyasync_orm.database import Database
+from pyasync_orm.columnar import build_column
+from pyasync_orm.database import Database, _connection
+from pyasync_orm.loaders import _loader
+from pyasync_orm.plans import QueryPlan
 from pyasync_orm.sql import SQL
+from pyasync_orm.subscription import Subscription
+from pyasync_orm.writers import BufferedWriter
 
 if TYPE_CHECKING:
     from pyasync_orm.models import Model
-    from pyasync_orm.fields import SearchCondition
+    from pyasync_orm.fields import BaseSearchCondition, BaseField, SearchRank
 
     # removes IDE warning on subclasses
     ModelType = TypeVar('ModelType', bound=Model)
 
+    # '*', 'pk', a sequence of fields or field names, or None
+    Returning = Optional[Union[str, Sequence[Union[BaseField, str]]]]
+
 
 class ORM:
     database = Database()
+    # the empty query for the connected database, see freeze()
+    _frozen_sql: Optional[SQL] = None
 
     def __init__(
         self,
@@ -22,79 +38,484 @@ class ORM:
         self._model_class = model_class
         self._sql = sql
 
+    def freeze(self):
+        """Caches the empty query every chain starts from."""
+        self._frozen_sql = None
+        self._frozen_sql = self._new_sql()
+
+    def _new_sql(self) -> SQL:
+        if self._frozen_sql is not None:
+            return self._frozen_sql.copy()
+        management_system = self.database.management_system
+        if management_system is None:
+            return SQL(self._model_class.table_name)
+        return SQL(
+            self._model_class.table_name,
+            placeholder_format=management_system.placeholder_format,
+        )
+
     def _get_orm(self) -> 'ORM':
         return ORM(
             self._model_class,
-            sql=SQL(self._model_class.table_name),
+            sql=self._new_sql(),
         ) if self._sql is None else self
 
+    def _check_writable(self):
+        if self._model_class.read_only:
+            raise ValueError(f'{self._model_class.__name__} is read-only.')
+
+    def build_literal_select(self) -> str:
+        """The query as SQL with its values inlined, e.g. to define a view."""
+        return self._get_orm()._sql.build_literal_select()
+
+    def build_select(self) -> Tuple[str, Tuple]:
+        """The query as SQL with placeholders, and its values."""
+        return self._get_orm()._sql.build_select()
+
+    def build_subquery(self, placeholder: Callable[[Any], str]) -> str:
+        """The query as SQL taking its values as parameters of an outer query."""
+        return self._get_orm()._sql.build_subquery(placeholder=placeholder)
+
     def _add_search_conditions(
         self,
-        search_conditions: Tuple['SearchCondition'],
+        search_conditions: Tuple['BaseSearchCondition'],
     ):
         for search_condition in search_conditions:
-            self._sql.add_where(
-                field_name=search_condition.field_name,
-                symbol=search_condition.symbol,
-                field_value=search_condition.field_value,
-            )
+            self._sql.add_search_condition(search_condition=search_condition)
 
-    async def create(self, model: Optional['ModelType'] = None) -> 'ModelType':
+    async def create(
+        self,
+        model: Optional['ModelType'] = None,
+        returning: 'Returning' = '*',
+        timeout: Optional[float] = None,
+    ) -> Optional[Union['ModelType', Any]]:
+        self._check_writable()
         orm = self._get_orm()
         fields_dict = model.orm_fields if model else {}
-        sql, values = orm._sql.build_insert(fields_dict=fields_dict)
-        async with self.database.get_connection() as connection:
-            results = await connection.fetch(sql, *values)
-        return self._model_class.from_db(results[0])
+        columns = self._get_returning_columns(returning=returning)
+        sql, values = orm._sql.build_insert(fields_dict=fields_dict, returning=columns)
+        if columns is None:
+            await self.database.execute(sql, *values, timeout=timeout)
+            return None
+        results = await self.database.fetch(sql, *values, timeout=timeout)
+        return self._from_returning(results=results, returning=returning)[0]
 
-    def filter(self, *search_conditions: 'SearchCondition') -> 'ORM':
+    def filter(self, *search_conditions: 'BaseSearchCondition') -> 'ORM':
         orm = self._get_orm()
         orm._add_search_conditions(search_conditions=search_conditions)
         return orm
 
-    # TODO do I still need exclude or can I use != instead
-    # def exclude(self, **kwargs) -> 'ORM':
-    #     orm = self._get_orm()
-    #     orm._sql.add_where(where_dict=kwargs, not_=True)
-    #     return orm
+    def exclude(self, *search_conditions: 'BaseSearchCondition') -> 'ORM':
+        orm = self._get_orm()
+        if not search_conditions:
+            # like filter(), excluding nothing keeps every row
+            return orm
+        orm._add_search_conditions(
+            search_conditions=(~functools.reduce(operator.and_, search_conditions),),
+        )
+        return orm
+
+    def order_by(self, *orderings: Union['BaseField', str, 'SearchRank']) -> 'ORM':
+        """
+        Customer.orm.order_by('-id'), or best matches first with
+        .filter(Customer.search_vector.matches(text))
+        .order_by(Customer.search_vector.rank(text))
+        """
+        orm = self._get_orm()
+        for ordering in orderings:
+            if not isinstance(ordering, str) and not hasattr(ordering, 'to_sql'):
+                ordering = ordering.name
+            orm._sql.add_order_by(ordering=ordering)
+        return orm
 
-    async def get(self, *search_conditions: 'SearchCondition') -> 'ModelType':
+    def select_for_update(
+        self,
+        nowait: bool = False,
+        skip_locked: bool = False,
+        of: Sequence[Union[Type['Model'], str]] = (),
+    ) -> 'ORM':
+        """
+        Locks the selected rows until the surrounding Database.transaction()
+        ends, outside of one the lock only lasts for the query. nowait
+        fails on rows other transactions have locked, skip_locked leaves
+        them out.
+        """
+        orm = self._get_orm()
+        orm._sql.set_lock(
+            nowait=nowait,
+            skip_locked=skip_locked,
+            of=[table if isinstance(table, str) else table.table_name for table in of],
+        )
+        return orm
+
+    def values(self, *fields: Union['BaseField', str]) -> 'ORM':
+        """
+        Selects only fields, e.g. to filter by a subquery without a round trip
+        Order.customer_id.in_(Customer.orm.filter(Customer.vip == True).values('id'))
+        """
+        orm = self._get_orm()
+        orm._sql.columns = [field.name for field in self._get_fields(fields)]
+        return orm
+
+    def sample(self, percent: float, method: str = 'system', seed: Optional[int] = None) -> 'ORM':
+        """
+        Selects from a random percent of the table with TABLESAMPLE, the
+        same sample every time for the same seed. count() and
+        estimated_count() count the sample, writes raise a ValueError.
+        """
+        orm = self._get_orm()
+        orm._sql.set_sample(percent=percent, method=method, seed=seed)
+        return orm
+
+    async def get(
+        self,
+        *search_conditions: 'BaseSearchCondition',
+        timeout: Optional[float] = None,
+    ) -> 'ModelType':
+        pk = self._get_loadable_pk(search_conditions=search_conditions)
+        loader = _loader.get()
+        # gets in a transaction or session must see its connection's state
+        if loader is not None and pk is not None and _connection.get() is None:
+            return await loader.load(
+                self._model_class,
+                pk,
+                # the batch does not run under the caller's deadline
+                timeout=self.database.get_timeout(timeout),
+            )
         orm = self._get_orm()
         orm._add_search_conditions(search_conditions=search_conditions)
         sql, values = orm._sql.build_select()
-        async with self.database.get_connection() as connection:
-            results = await connection.fetch(sql, *values)
+        results = await self.database.fetch(sql, *values, timeout=timeout)
         if len(results) > 1:
             raise ValueError(
                 f'{self._model_class.__name__} get query '
                 'found more than one record.'
             )
+        if not results:
+            raise ValueError(f'{self._model_class.__name__} get query found no record.')
         return self._model_class.from_db(results[0])
 
-    async def all(self) -> List['ModelType']:
+    def _get_loadable_pk(
+        self,
+        search_conditions: Tuple['BaseSearchCondition'],
+    ) -> Optional[Any]:
+        """
+        The pk of a get by primary key alone, which a loader can batch. The
+        batch matches rows by the pk read back, so '5' or True for an
+        integer key are not batched.
+        """
+        if self._sql is not None or len(search_conditions) != 1:
+            return None
+        search_condition = search_conditions[0]
+        pk_field = self._model_class.id
+        if (
+            getattr(search_condition, 'symbol', None) == '='
+            and search_condition.field_name == pk_field.name
+            and pk_field.python_type is not None
+            and type(search_condition.field_value) is pk_field.python_type
+        ):
+            return search_condition.field_value
+        return None
+
+    async def explain(
+        self,
+        analyze: bool = False,
+        timeout: Optional[float] = None,
+    ) -> QueryPlan:
+        """
+        The plan of the query's select, e.g. to check
+        plan.seq_scans() == []. analyze=True runs the query.
+        """
         orm = self._get_orm()
         sql, values = orm._sql.build_select()
-        async with self.database.get_connection() as connection:
-            results = await connection.fetch(sql, *values)
-        return [self._model_class.from_db(result) for result in results]
+        return await self.database.explain(sql, *values, analyze=analyze, timeout=timeout)
 
-    async def update(self, model: 'ModelType') -> List['ModelType']:
+    async def all(self, timeout: Optional[float] = None) -> List['ModelType']:
         orm = self._get_orm()
-        sql, values = orm._sql.build_update(fields_dict=model.orm_fields)
-        async with self.database.get_connection() as connection:
-            results = await connection.fetch(sql, *values)
+        sql, values = orm._sql.build_select()
+        results = await self.database.fetch(sql, *values, timeout=timeout)
         return [self._model_class.from_db(result) for result in results]
 
-    async def delete(self) -> List['ModelType']:
+    def _get_fields(
+        self,
+        fields: Tuple[Union['BaseField', str], ...],
+    ) -> List['BaseField']:
+        """Model fields by field or name, all of them when none are given."""
+        if not fields:
+            return list(self._model_class.get_fields().values())
+        return [
+            getattr(self._model_class, field) if isinstance(field, str) else field
+            for field in fields
+        ]
+
+    async def to_columns(
+        self,
+        *fields: Union['BaseField', str],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Sequence]:
+        """
+        Returns {field name: column} without building a model per row.
+        Numeric columns are numpy arrays, or array.array without numpy.
+        """
         orm = self._get_orm()
-        sql, values = orm._sql.build_delete()
-        async with self.database.get_connection() as connection:
-            results = await connection.fetch(sql, *values)
+        model_fields = self._get_fields(fields)
+        sql, values = orm._sql.build_select(
+            columns=[field.name for field in model_fields],
+        )
+        results = await self.database.fetch(sql, *values, timeout=timeout)
+        return {
+            field.name: build_column(
+                records=results,
+                key=field.name,
+                typecode=field.array_typecode,
+            )
+            for field in model_fields
+        }
+
+    def _get_returning_columns(
+        self,
+        returning: 'Returning',
+    ) -> Optional[Union[str, List[str]]]:
+        if returning is None or returning == '*':
+            return returning
+        if returning == 'pk':
+            return [self._model_class.id.name]
+        if isinstance(returning, str):
+            # one field name, not a sequence of its characters
+            returning = (returning,)
+        return [field.name for field in self._get_fields(tuple(returning))]
+
+    def _from_returning(self, results: List[Any], returning: 'Returning') -> List[Any]:
+        if returning == 'pk':
+            pk = self._model_class.id.name
+            return [result[pk] for result in results]
         return [self._model_class.from_db(result) for result in results]
 
-    async def count(self) -> int:
+    async def _write(
+        self,
+        build: Callable[[SQL, Optional[Union[str, List[str]]]], Tuple[str, Tuple]],
+        returning: 'Returning',
+        batch_size: Optional[int],
+        pause: Optional[float],
+        timeout: Optional[float],
+    ) -> Union[List[Any], int]:
+        columns = self._get_returning_columns(returning=returning)
+        if batch_size is None:
+            # building adds values, the chain may be written again
+            sql, values = build(self._sql.copy(), columns)
+            if columns is None:
+                status = await self.database.execute(sql, *values, timeout=timeout)
+                return int(status.split()[-1])
+            results = await self.database.fetch(sql, *values, timeout=timeout)
+            return self._from_returning(results=results, returning=returning)
+
+        # every batch returns its keys so the next one can start after them
+        pk = self._model_class.id.name
+        if columns is None:
+            batch_columns = [pk]
+        elif columns == '*' or pk in columns:
+            batch_columns = columns
+        else:
+            batch_columns = columns + [pk]
+        affected_count = 0
+        results = []
+        after_key = None
+        while True:
+            batch_sql = self._sql.copy()
+            batch_sql.add_key_batch(key=pk, after_key=after_key, batch_size=batch_size)
+            sql, values = build(batch_sql, batch_columns)
+            batch_results = await self.database.fetch(sql, *values, timeout=timeout)
+            affected_count += len(batch_results)
+            if columns is not None:
+                results += batch_results
+            if len(batch_results) < batch_size:
+                break
+            after_key = max(result[pk] for result in batch_results)
+            if pause:
+                await asyncio.sleep(pause)
+        if columns is None:
+            return affected_count
+        return self._from_returning(results=results, returning=returning)
+
+    async def update(
+        self,
+        model: 'ModelType',
+        returning: 'Returning' = '*',
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ) -> Union[List[Any], int]:
+        """
+        returning='*' gives the updated models, 'pk' their primary keys,
+        a list of fields models with only those fields and None the
+        number of updated rows. With batch_size the rows are updated in
+        chunks ordered by primary key, each a statement and so a short
+        transaction of its own, sleeping pause seconds in between.
+        """
+        self._check_writable()
+        orm = self._get_orm()
+        return await orm._write(
+            build=lambda sql, columns: sql.build_update(
+                fields_dict=model.orm_fields,
+                returning=columns,
+            ),
+            returning=returning,
+            batch_size=batch_size,
+            pause=pause,
+            timeout=timeout,
+        )
+
+    async def delete(
+        self,
+        returning: 'Returning' = '*',
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ) -> Union[List[Any], int]:
+        """Takes the same returning and batching arguments as update."""
+        self._check_writable()
+        orm = self._get_orm()
+        return await orm._write(
+            build=lambda sql, columns: sql.build_delete(returning=columns),
+            returning=returning,
+            batch_size=batch_size,
+            pause=pause,
+            timeout=timeout,
+        )
+
+    async def claim(
+        self,
+        model: 'ModelType',
+        batch: int = 1,
+        returning: 'Returning' = '*',
+        timeout: Optional[float] = None,
+    ) -> Union[List[Any], int]:
+        """
+        Sets model's fields on up to batch matching rows that are not locked
+        by anyone else and returns them like update, e.g. for job queues
+
+            jobs = await Job.orm.filter(Job.status == 'new').order_by('id').claim(
+                Job(status='running'), batch=10,
+            )
+
+        Concurrent workers never claim the same row and never wait on
+        each other.
+        """
+        self._check_writable()
+        orm = self._get_orm()
+        columns = self._get_returning_columns(returning=returning)
+        sql, values = orm._sql.copy().build_claim(
+            fields_dict=model.orm_fields,
+            key=self._model_class.id.name,
+            batch_size=batch,
+            returning=columns,
+        )
+        if columns is None:
+            status = await self.database.execute(sql, *values, timeout=timeout)
+            return int(status.split()[-1])
+        results = await self.database.fetch(sql, *values, timeout=timeout)
+        return self._from_returning(results=results, returning=returning)
+
+    async def count(self, timeout: Optional[float] = None) -> int:
         orm = self._get_orm()
         sql, values = orm._sql.build_count()
-        async with self.database.get_connection() as connection:
-            results = await connection.fetch(sql, *values)
+        results = await self.database.fetch(sql, *values, timeout=timeout)
         return results[0]['count']
+
+    async def estimated_count(self, timeout: Optional[float] = None) -> int:
+        """
+        About how many rows count() would return, in milliseconds on any
+        table size: the table's row estimate kept by VACUUM and ANALYZE, or
+        the planner's estimate when the query is filtered.
+        """
+        orm = self._get_orm()
+        if not orm._sql.where.conditions_strings and orm._sql.sample is None:
+            table_name = self._model_class.table_name
+            table_rows = await self.database.get_table_rows([table_name], timeout=timeout)
+            rows = table_rows.get(table_name)
+            if rows is not None:
+                return int(rows)
+        plan = await orm.explain(timeout=timeout)
+        return plan.rows
+
+    async def copy_to(
+        self,
+        sink: Any,
+        format: str = 'csv',
+        timeout: Optional[float] = None,
+        **copy_options,
+    ) -> int:
+        """
+        Streams the query's rows with COPY to sink, a file path, a file
+        object or an async callable receiving each chunk of bytes.
+        Rows are never turned into models.
+        """
+        orm = self._get_orm()
+        sql, values = orm._sql.build_select()
+        status = await self.database.copy_from_query(
+            sql,
+            *values,
+            output=sink,
+            format=format,
+            timeout=timeout,
+            **copy_options,
+        )
+        return int(status.split()[-1])
+
+    async def copy_from(
+        self,
+        source: Any,
+        columns: Optional[List[str]] = None,
+        format: str = 'csv',
+        timeout: Optional[float] = None,
+        **copy_options,
+    ) -> int:
+        """
+        Loads rows into the model's table with COPY from source, a file
+        path, a file object or an async iterable of bytes.
+        """
+        self._check_writable()
+        status = await self.database.copy_to_table(
+            self._model_class.table_name,
+            source=source,
+            columns=columns,
+            format=format,
+            timeout=timeout,
+            **copy_options,
+        )
+        return int(status.split()[-1])
+
+    def buffered_writer(self, **writer_options) -> BufferedWriter:
+        """
+        writer = Customer.orm.buffered_writer(max_batch_size=500)
+        await writer.add(Customer(first_name='Ron'))
+
+        Inserts from many coroutines share a few batched statements
+        instead of a connection each, see BufferedWriter for the options.
+        """
+        self._check_writable()
+        writer = BufferedWriter(
+            database=self.database,
+            model_class=self._model_class,
+            **writer_options,
+        )
+        self.database.add_writer(writer)
+        return writer
+
+    def subscribe(self, **subscription_options) -> Subscription:
+        """
+        async for event in Customer.orm.subscribe(): ...
+
+        Needs the notify trigger migrations add for models with
+        notify_changes = True.
+        """
+        management_system = self.database.management_system
+        management_system.check_supports('change_notifications')
+        channel = management_system.get_notify_channel(
+            table_name=self._model_class.table_name,
+        )
+        return Subscription(
+            database=self.database,
+            channel=channel,
+            **subscription_options,
+        )
@@ -0,0 +1,214 @@
+import datetime
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Type, TYPE_CHECKING, Union
+
+from pyasync_orm.sql import to_literal
+
+if TYPE_CHECKING:
+    from pyasync_orm.database import Database
+    from pyasync_orm.models import Model
+
+Date = Union[datetime.date, datetime.datetime]
+
+INTERVALS = ('day', 'week', 'month', 'year')
+
+
+class Partition:
+    def __init__(self, name: str, bound: str):
+        self.name = name
+        self.bound = bound
+
+
+class BasePartitioning(ABC):
+    method: str
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+
+    def __str__(self):
+        return f'PARTITION BY {self.method} ({self.field_name})'
+
+    @abstractmethod
+    def get_partitions(self, table_name: str) -> List[Partition]:
+        """The child partitions migrations create with the table."""
+        pass
+
+
+class RangePartitioning(BasePartitioning):
+    """
+    One partition per interval of a date or timestamp field, named
+    <table>_p<YYYYMMDD> after the first day it holds. premake partitions
+    are kept ready ahead of the current one.
+    """
+    method = 'RANGE'
+    name_pattern = re.compile(r'_p(\d{8})$')
+
+    def __init__(self, field_name: str, interval: str = 'month', premake: int = 3):
+        if interval not in INTERVALS:
+            raise ValueError(f'interval must be one of {INTERVALS}, got {interval!r}')
+        self.interval = interval
+        self.premake = premake
+        super().__init__(field_name=field_name)
+
+    def get_period_start(self, value: Date) -> datetime.date:
+        if isinstance(value, datetime.datetime):
+            value = value.date()
+        if self.interval == 'week':
+            return value - datetime.timedelta(days=value.weekday())
+        if self.interval == 'month':
+            return value.replace(day=1)
+        if self.interval == 'year':
+            return value.replace(month=1, day=1)
+        return value
+
+    def get_next_period_start(self, start: datetime.date) -> datetime.date:
+        if self.interval == 'day':
+            return start + datetime.timedelta(days=1)
+        if self.interval == 'week':
+            return start + datetime.timedelta(weeks=1)
+        if self.interval == 'month':
+            return (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        return start.replace(year=start.year + 1)
+
+    def get_partition(self, table_name: str, start: datetime.date) -> Partition:
+        return Partition(
+            name=f'{table_name}_p{start:%Y%m%d}',
+            bound=(
+                f'FOR VALUES FROM ({to_literal(start)}) '
+                f'TO ({to_literal(self.get_next_period_start(start))})'
+            ),
+        )
+
+    def get_upcoming_partitions(
+        self,
+        table_name: str,
+        today: Optional[datetime.date] = None,
+    ) -> List[Partition]:
+        start = self.get_period_start(today or datetime.date.today())
+        partitions = []
+        for _ in range(self.premake + 1):
+            partitions.append(self.get_partition(table_name=table_name, start=start))
+            start = self.get_next_period_start(start)
+        return partitions
+
+    def get_partitions(self, table_name: str) -> List[Partition]:
+        return self.get_upcoming_partitions(table_name=table_name)
+
+    def get_partition_end(self, partition_name: str) -> Optional[datetime.date]:
+        """When a partition named by get_partition stops, None for others."""
+        match = self.name_pattern.search(partition_name)
+        if match is None:
+            return None
+        start = datetime.datetime.strptime(match.group(1), '%Y%m%d').date()
+        return self.get_next_period_start(start)
+
+
+class ListPartitioning(BasePartitioning):
+    """values maps a partition name suffix to the values it holds."""
+    method = 'LIST'
+
+    def __init__(
+        self,
+        field_name: str,
+        values: Dict[str, Sequence[Any]],
+        default: bool = True,
+    ):
+        self.values = values
+        self.default = default
+        super().__init__(field_name=field_name)
+
+    def get_partitions(self, table_name: str) -> List[Partition]:
+        partitions = [
+            Partition(
+                name=f'{table_name}_{suffix}',
+                bound=f'FOR VALUES IN ({", ".join(to_literal(value) for value in values)})',
+            )
+            for suffix, values in self.values.items()
+        ]
+        if self.default:
+            partitions.append(Partition(name=f'{table_name}_default', bound='DEFAULT'))
+        return partitions
+
+
+class HashPartitioning(BasePartitioning):
+    method = 'HASH'
+
+    def __init__(self, field_name: str, modulus: int):
+        self.modulus = modulus
+        super().__init__(field_name=field_name)
+
+    def get_partitions(self, table_name: str) -> List[Partition]:
+        return [
+            Partition(
+                name=f'{table_name}_h{remainder}',
+                bound=f'FOR VALUES WITH (MODULUS {self.modulus}, REMAINDER {remainder})',
+            )
+            for remainder in range(self.modulus)
+        ]
+
+
+def _get_range_partitioning(model: Type['Model']) -> RangePartitioning:
+    if not isinstance(model.partition_by, RangePartitioning):
+        raise ValueError(f'{model.__name__} is not range partitioned.')
+    return model.partition_by
+
+
+async def create_upcoming_partitions(
+    model: Type['Model'],
+    database: Optional['Database'] = None,
+    today: Optional[datetime.date] = None,
+) -> List[str]:
+    """
+    Creates the current and the next premake partitions of a range
+    partitioned model if they are missing. Run it from a periodic job.
+    """
+    database = database or model.orm.database
+    database.management_system.check_supports('partitioning')
+    partitioning = _get_range_partitioning(model)
+    partitions = partitioning.get_upcoming_partitions(
+        table_name=model.table_name,
+        today=today,
+    )
+    for partition in partitions:
+        await database.execute(
+            database.management_system.get_create_partition_sql(
+                table_name=model.table_name,
+                partition=partition,
+            )
+        )
+    return [partition.name for partition in partitions]
+
+
+async def detach_old_partitions(
+    model: Type['Model'],
+    older_than: Date,
+    drop: bool = False,
+    database: Optional['Database'] = None,
+) -> List[str]:
+    """
+    Detaches, and with drop=True drops, the partitions of a range
+    partitioned model holding only rows before older_than.
+    """
+    database = database or model.orm.database
+    management_system = database.management_system
+    management_system.check_supports('partitioning')
+    partitioning = _get_range_partitioning(model)
+    if isinstance(older_than, datetime.datetime):
+        older_than = older_than.date()
+    records = await database.fetch(
+        management_system.partition_data_sql(table_name=model.table_name),
+    )
+    detached = []
+    for record in records:
+        partition_end = partitioning.get_partition_end(record['partition_name'])
+        if partition_end is None or partition_end > older_than:
+            continue
+        for sql in management_system.get_detach_partition_sql(
+            table_name=model.table_name,
+            partition_name=record['partition_name'],
+            drop=drop,
+        ):
+            await database.execute(sql)
+        detached.append(record['partition_name'])
+    return detached
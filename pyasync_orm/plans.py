@@ -0,0 +1,151 @@
+import json
+import os
+import re
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pyasync_orm.database import Database
+
+
+# the recorder Database.fetch explains SELECTs to, see Database.record_plans
+_plan_recorder: ContextVar[Optional['PlanRecorder']] = ContextVar(
+    'pyasync_orm_plan_recorder',
+    default=None,
+)
+
+
+class QueryPlan:
+    """The output of EXPLAIN (FORMAT JSON) for one statement."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+
+    @classmethod
+    def from_records(cls, records: List[Any]) -> 'QueryPlan':
+        explained = records[0]['QUERY PLAN']
+        if isinstance(explained, str):
+            explained = json.loads(explained)
+        return cls(data=explained[0])
+
+    @property
+    def plan(self) -> Dict[str, Any]:
+        return self.data['Plan']
+
+    @property
+    def total_cost(self) -> float:
+        return self.plan['Total Cost']
+
+    @property
+    def rows(self) -> int:
+        """The planner's row estimate for the whole statement."""
+        return self.plan['Plan Rows']
+
+    def nodes(self) -> Iterator[Dict[str, Any]]:
+        nodes = [self.plan]
+        while nodes:
+            node = nodes.pop()
+            yield node
+            nodes += node.get('Plans', [])
+
+    def seq_scans(self) -> List[str]:
+        """Names of the tables read by sequential scans."""
+        return sorted({
+            node['Relation Name'] for node in self.nodes()
+            if node['Node Type'] == 'Seq Scan'
+        })
+
+
+class PlanRecorder:
+    """
+    Keeps a baseline plan per query shape, the SQL with placeholders, in a
+    JSON file and reports plans that got worse than their baseline:
+
+    - a sequential scan of a table with at least seq_scan_rows rows
+      the baseline did not scan sequentially
+    - a row estimate more than row_estimate_factor times the baseline's
+    - a total cost more than cost_factor times the baseline's
+
+    Shapes without a baseline, or every shape with update=True, are
+    recorded as the new baseline by save().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        update: bool = False,
+        seq_scan_rows: int = 1000,
+        row_estimate_factor: float = 10.0,
+        cost_factor: float = 2.0,
+    ):
+        self.path = path
+        self.update = update
+        self.seq_scan_rows = seq_scan_rows
+        self.row_estimate_factor = row_estimate_factor
+        self.cost_factor = cost_factor
+        self.baselines: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                self.baselines = json.load(file)
+        self.plans: Dict[str, Dict[str, Any]] = {}
+        self.regressions: List[str] = []
+
+    @staticmethod
+    def get_shape(query: str) -> str:
+        return re.sub(r'\s+', ' ', query).strip()
+
+    async def record(self, database: 'Database', query: str, *args):
+        shape = self.get_shape(query)
+        if shape in self.plans:
+            return
+        plan = await database.explain(query, *args)
+        self.plans[shape] = plan.data
+        baseline = self.baselines.get(shape)
+        if baseline is not None and not self.update:
+            self.regressions += await self.compare(
+                database=database,
+                shape=shape,
+                plan=plan,
+                baseline=QueryPlan(baseline),
+            )
+
+    async def compare(
+        self,
+        database: 'Database',
+        shape: str,
+        plan: QueryPlan,
+        baseline: QueryPlan,
+    ) -> List[str]:
+        regressions = []
+        new_seq_scans = set(plan.seq_scans()) - set(baseline.seq_scans())
+        if new_seq_scans:
+            table_rows = await database.get_table_rows(sorted(new_seq_scans))
+            for table_name in sorted(new_seq_scans):
+                rows = table_rows.get(table_name, 0)
+                if rows >= self.seq_scan_rows:
+                    regressions.append(
+                        f'{shape}: new sequential scan of {table_name} ({rows:.0f} rows)'
+                    )
+        if plan.rows > baseline.rows * self.row_estimate_factor:
+            regressions.append(
+                f'{shape}: row estimate grew from {baseline.rows} to {plan.rows}'
+            )
+        if plan.total_cost > baseline.total_cost * self.cost_factor:
+            regressions.append(
+                f'{shape}: cost grew from {baseline.total_cost} to {plan.total_cost}'
+            )
+        return regressions
+
+    def save(self):
+        baselines = dict(self.baselines)
+        for shape, plan in self.plans.items():
+            if self.update or shape not in baselines:
+                baselines[shape] = plan
+        with open(self.path, 'w') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+
+    def assert_no_regressions(self):
+        if self.regressions:
+            raise AssertionError(
+                'Query plan regressions:\n' + '\n'.join(self.regressions)
+            )
@@ -1,4 +1,9 @@
-from typing import List, Optional, Tuple, Any
+import datetime
+import re
+from typing import List, Optional, Tuple, Any, TYPE_CHECKING, Union, Sequence, Callable
+
+if TYPE_CHECKING:
+    from pyasync_orm.fields import BaseSearchCondition, SearchRank
 
 
 def not_implemented(*args, **kwargs):
@@ -39,6 +44,19 @@ LOOKUPS = {
 }
 
 
+def to_literal(value: Any) -> str:
+    """Renders value as SQL for statements that cannot take parameters, like DDL."""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
 class Condition:
     key: str
     operator: str
@@ -101,7 +119,7 @@ class Where:
     def __str__(self):
         if self.conditions_strings:
             where = 'WHERE '
-            where += 'AND '.join([condition for condition in self.conditions_strings])
+            where += ' AND '.join([condition for condition in self.conditions_strings])
         else:
             where = ''
         return where
@@ -111,10 +129,21 @@ class SQL:
     table_name: str
     where: Optional[Where]
 
-    def __init__(self, table_name: str):
+    def __init__(
+        self,
+        table_name: str,
+        placeholder_format: str = '${position}',
+    ):
         self.table_name = table_name
+        self.placeholder_format = placeholder_format
         self.values = ()
         self.where = Where()
+        # rendered by build_select, so its values follow every WHERE value
+        self.order_by: List[Union[str, 'SearchRank']] = []
+        self.lock = ''
+        # (method, percent, seed) of set_sample, rendered like order_by
+        self.sample: Optional[Tuple[str, float, Optional[int]]] = None
+        self.columns: Optional[List[str]] = None
 
     # def _extract_values(self, values_dict: dict) -> dict:
     #     new_values = tuple(values_dict.values())
@@ -125,9 +154,19 @@ class SQL:
     #         for key in values_dict
     #     }
 
+    def copy(self) -> 'SQL':
+        sql = SQL(self.table_name, placeholder_format=self.placeholder_format)
+        sql.values = self.values
+        sql.where.conditions_strings = list(self.where.conditions_strings)
+        sql.order_by = list(self.order_by)
+        sql.lock = self.lock
+        sql.sample = self.sample
+        sql.columns = self.columns
+        return sql
+
     def _swap_value_with_placeholder(self, value: Any) -> str:
         self.values += (value,)
-        return f'${len(self.values)}'
+        return self.placeholder_format.format(position=len(self.values))
 
     # def add_where(
     #     self,
@@ -148,36 +187,197 @@ class SQL:
         )
         self.where.add(f'{field_name} {symbol} {placeholder_value}')
 
-    def build_select(self) -> Tuple[str, Tuple]:
-        return (
-            f'SELECT * FROM {self.table_name} {self.where}',
-            self.values,
+    def add_search_condition(self, search_condition: 'BaseSearchCondition'):
+        self.where.add(search_condition.to_sql(
+            placeholder=self._swap_value_with_placeholder,
+        ))
+
+    def add_order_by(self, ordering: Union[str, 'SearchRank']):
+        """ordering is a column name, '-name' for descending, or a SearchRank."""
+        if not isinstance(ordering, str):
+            self.order_by.append(ordering)
+        elif ordering.startswith('-'):
+            self.order_by.append(f'{ordering[1:]} DESC')
+        else:
+            self.order_by.append(ordering)
+
+    def set_lock(
+        self,
+        nowait: bool = False,
+        skip_locked: bool = False,
+        of: Sequence[str] = (),
+    ):
+        if nowait and skip_locked:
+            raise ValueError('nowait and skip_locked cannot be combined.')
+        self.lock = 'FOR UPDATE'
+        if of:
+            self.lock += f' OF {", ".join(of)}'
+        if nowait:
+            self.lock += ' NOWAIT'
+        elif skip_locked:
+            self.lock += ' SKIP LOCKED'
+
+    def set_sample(self, percent: float, method: str = 'system', seed: Optional[int] = None):
+        """
+        Reads about percent of the table. 'system' picks whole pages and is
+        fast, 'bernoulli' picks rows and is more even but scans the table.
+        """
+        if method not in ('system', 'bernoulli'):
+            raise ValueError(f"method must be 'system' or 'bernoulli', got {method!r}")
+        if not 0 <= percent <= 100:
+            raise ValueError(f'percent must be between 0 and 100, got {percent}')
+        self.sample = (method, percent, seed)
+
+    def _build_sample(self, placeholder: Callable[[Any], str]) -> str:
+        if self.sample is None:
+            return ''
+        method, percent, seed = self.sample
+        sample = f' TABLESAMPLE {method.upper()} ({placeholder(percent)})'
+        if seed is not None:
+            sample += f' REPEATABLE ({placeholder(seed)})'
+        return sample
+
+    def _check_not_sampled(self, statement: str):
+        if self.sample is not None:
+            raise ValueError(f'{statement} cannot run on a sample, filter the rows instead.')
+
+    def add_key_batch(self, key: str, after_key: Any, batch_size: int):
+        """
+        Narrows the query to the next batch_size rows ordered by key, after
+        after_key unless it is None, so updates and deletes can run in chunks.
+        """
+        batch_where = Where()
+        batch_where.conditions_strings = list(self.where.conditions_strings)
+        if after_key is not None:
+            batch_where.add(f'{key} > {self._swap_value_with_placeholder(after_key)}')
+        limit = self._swap_value_with_placeholder(batch_size)
+        self.where = Where()
+        self.where.add(
+            f'{key} IN (SELECT {key} FROM {self.table_name} {batch_where} '
+            f'ORDER BY {key} LIMIT {limit})'
+        )
+
+    @staticmethod
+    def _build_returning(returning: Optional[Union[str, List[str]]]) -> str:
+        if not returning:
+            return ''
+        if isinstance(returning, str):
+            return f' RETURNING {returning}'
+        return f' RETURNING {", ".join(returning)}'
+
+    def _build_order_by(self, placeholder: Callable[[Any], str]) -> str:
+        return ', '.join(
+            ordering if isinstance(ordering, str) else ordering.to_sql(placeholder=placeholder)
+            for ordering in self.order_by
+        )
+
+    def build_select(self, columns: Optional[List[str]] = None) -> Tuple[str, Tuple]:
+        columns = columns or self.columns
+        select_columns = ', '.join(columns) if columns else '*'
+        # the chain may be built again, its values stay as they are
+        sql = self.copy()
+        sample = sql._build_sample(placeholder=sql._swap_value_with_placeholder)
+        select = f'SELECT {select_columns} FROM {self.table_name}{sample} {self.where}'
+        if self.order_by:
+            order_by = sql._build_order_by(placeholder=sql._swap_value_with_placeholder)
+            select = f'{select.rstrip()} ORDER BY {order_by}'
+        if self.lock:
+            select = f'{select.rstrip()} {self.lock}'
+        return select, sql.values
+
+    def build_subquery(
+        self,
+        placeholder: Callable[[Any], str],
+        columns: Optional[List[str]] = None,
+    ) -> str:
+        """
+        The select with every value swapped by placeholder, e.g. for the
+        next parameter of an outer query.
+        """
+        sql, values = self.build_select(columns=columns)
+        prefix, suffix = self.placeholder_format.split('{position}')
+        position = re.compile(re.escape(prefix) + r'(\d+)' + re.escape(suffix))
+        return position.sub(
+            lambda match: placeholder(values[int(match.group(1)) - 1]),
+            sql.rstrip(),
         )
 
-    def build_update(self, fields_dict: dict) -> Tuple[str, Tuple]:
+    def build_literal_select(self, columns: Optional[List[str]] = None) -> str:
+        """The select with its values inlined, e.g. to define a view."""
+        return self.build_subquery(placeholder=to_literal, columns=columns)
+
+    def build_update(
+        self,
+        fields_dict: dict,
+        returning: Optional[Union[str, List[str]]] = '*',
+    ) -> Tuple[str, Tuple]:
+        self._check_not_sampled('UPDATE')
         set_values = ', '.join(
             f'{key} = {self._swap_value_with_placeholder(value)}'
             for key, value in fields_dict.items()
         )
         return (
             f'UPDATE {self.table_name} '
-            f'SET {set_values} {self.where} RETURNING *',
+            f'SET {set_values} {self.where}{self._build_returning(returning)}',
             self.values,
         )
 
-    def build_delete(self) -> Tuple[str, Tuple]:
+    def build_claim(
+        self,
+        fields_dict: dict,
+        key: str,
+        batch_size: int,
+        returning: Optional[Union[str, List[str]]] = '*',
+    ) -> Tuple[str, Tuple]:
+        """
+        Locks up to batch_size matching rows no other transaction has locked
+        and updates them, one statement so the locks never outlive it.
+        """
+        self._check_not_sampled('claim')
+        order_by = ''
+        if self.order_by:
+            order_by = f' ORDER BY {self._build_order_by(self._swap_value_with_placeholder)}'
+        limit = self._swap_value_with_placeholder(batch_size)
+        set_values = ', '.join(
+            f'{field_name} = {self._swap_value_with_placeholder(value)}'
+            for field_name, value in fields_dict.items()
+        )
+        if isinstance(returning, str):
+            returning = f'{self.table_name}.{returning}'
+        elif returning:
+            returning = [f'{self.table_name}.{column}' for column in returning]
+        select = f'SELECT {key} FROM {self.table_name} {self.where}'.rstrip()
         return (
-            f'DELETE FROM {self.table_name} {self.where} RETURNING *',
+            f'WITH claimed AS ({select}{order_by} LIMIT {limit} FOR UPDATE SKIP LOCKED) '
+            f'UPDATE {self.table_name} SET {set_values} FROM claimed '
+            f'WHERE {self.table_name}.{key} = claimed.{key}'
+            f'{self._build_returning(returning)}',
             self.values,
         )
 
-    def build_count(self) -> Tuple[str, Tuple]:
+    def build_delete(
+        self,
+        returning: Optional[Union[str, List[str]]] = '*',
+    ) -> Tuple[str, Tuple]:
+        self._check_not_sampled('DELETE')
         return (
-            f'SELECT COUNT(*) FROM {self.table_name} {self.where}',
+            f'DELETE FROM {self.table_name} {self.where}{self._build_returning(returning)}',
             self.values,
         )
 
-    def build_insert(self, fields_dict: dict) -> Tuple[str, Tuple]:
+    def build_count(self) -> Tuple[str, Tuple]:
+        sql = self.copy()
+        sample = sql._build_sample(placeholder=sql._swap_value_with_placeholder)
+        return (
+            f'SELECT COUNT(*) AS count FROM {self.table_name}{sample} {self.where}',
+            sql.values,
+        )
+
+    def build_insert(
+        self,
+        fields_dict: dict,
+        returning: Optional[Union[str, List[str]]] = '*',
+    ) -> Tuple[str, Tuple]:
         if not fields_dict:
             columns, values = 'DEFAULT', ''
         else:
@@ -190,6 +390,47 @@ class SQL:
             values = f'({placeholders})'
         return (
             f'INSERT INTO {self.table_name} {columns}'
-            f' VALUES{values} RETURNING *',
+            f' VALUES{values}{self._build_returning(returning)}',
+            self.values,
+        )
+
+    def build_insert_many(
+        self,
+        column_names: Sequence[str],
+        rows: Sequence[Sequence[Any]],
+        returning: Optional[Union[str, List[str]]] = None,
+    ) -> Tuple[str, Tuple]:
+        """One INSERT of every row, each holding a value per column name."""
+        rows_sql = ', '.join(
+            '(' + ', '.join(self._swap_value_with_placeholder(value) for value in row) + ')'
+            for row in rows
+        )
+        return (
+            f'INSERT INTO {self.table_name} ({", ".join(column_names)})'
+            f' VALUES {rows_sql}{self._build_returning(returning)}',
+            self.values,
+        )
+
+    def build_insert_unnest(
+        self,
+        column_names: Sequence[str],
+        column_types: Sequence[str],
+        rows: Sequence[Sequence[Any]],
+        returning: Optional[Union[str, List[str]]] = None,
+    ) -> Tuple[str, Tuple]:
+        """
+        One INSERT of every row taking an array parameter per column, for
+        databases with array parameters. Rows are inserted in their order.
+        """
+        arrays = ', '.join(
+            f'{self._swap_value_with_placeholder(list(column))}::{column_type}[]'
+            for column, column_type in zip(zip(*rows), column_types)
+        )
+        columns = ', '.join(column_names)
+        return (
+            f'INSERT INTO {self.table_name} ({columns})'
+            f' SELECT {columns} FROM unnest({arrays}) WITH ORDINALITY'
+            f' AS batch ({columns}, ordinality) ORDER BY ordinality'
+            f'{self._build_returning(returning)}',
             self.values,
         )
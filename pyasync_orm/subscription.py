@@ -0,0 +1,152 @@
+import asyncio
+import json
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from pyasync_orm.database import Database
+
+
+class ChangeEvent:
+    INSERT = 'INSERT'
+    UPDATE = 'UPDATE'
+    DELETE = 'DELETE'
+    # notifications may have been missed, reload whatever state is mirrored
+    RESYNC = 'RESYNC'
+
+    def __init__(self, operation: str, pk: Optional[Any] = None):
+        self.operation = operation
+        self.pk = pk
+
+    def __str__(self):
+        return f'<ChangeEvent: {self.operation} {self.pk}>'
+
+    def __repr__(self):
+        return f'{self}'
+
+    def __eq__(self, other: Any) -> bool:
+        return (
+            isinstance(other, ChangeEvent)
+            and (self.operation, self.pk) == (other.operation, other.pk)
+        )
+
+
+class Subscription:
+    """
+    Async iterator over the change notifications of one channel, received
+    on a dedicated connection outside the pool. A lost connection is
+    reopened with exponential backoff and followed by a RESYNC event, as is
+    a queue overflow when the consumer falls behind.
+    """
+
+    def __init__(
+        self,
+        database: 'Database',
+        channel: str,
+        max_queue_size: int = 10_000,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+        ping_interval: float = 30.0,
+    ):
+        self._database = database
+        self._channel = channel
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._ping_interval = ping_interval
+        self._connection = None
+        self._connection_lost = asyncio.Event()
+        self._supervisor: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def __aiter__(self) -> 'Subscription':
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        if self._closed:
+            raise StopAsyncIteration
+        if self._supervisor is None:
+            # the first connection error is raised to the caller
+            self._connection = await self._connect()
+            self._supervisor = asyncio.ensure_future(self._supervise())
+        return await self._queue.get()
+
+    async def __aenter__(self) -> 'Subscription':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        self._closed = True
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+        if self._connection is not None:
+            await self._close_connection()
+
+    def _put(self, event: ChangeEvent):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(ChangeEvent(ChangeEvent.RESYNC))
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str):
+        data = json.loads(payload)
+        self._put(ChangeEvent(operation=data['operation'], pk=data['id']))
+
+    def _on_termination(self, connection: Any):
+        self._connection_lost.set()
+
+    async def _connect(self) -> Any:
+        connection = await self._database.client.create_listener_connection()
+        connection.add_termination_listener(self._on_termination)
+        await connection.add_listener(self._channel, self._on_notification)
+        self._connection_lost.clear()
+        return connection
+
+    async def _close_connection(self):
+        try:
+            await asyncio.wait_for(self._connection.close(), timeout=5)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._connection.terminate()
+        self._connection = None
+
+    async def _is_alive(self) -> bool:
+        try:
+            await asyncio.wait_for(self._connection.execute('SELECT 1'), self._ping_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return False
+        return True
+
+    async def _reconnect(self):
+        await self._close_connection()
+        delay = self._reconnect_delay
+        while True:
+            try:
+                self._connection = await self._connect()
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_reconnect_delay)
+        self._put(ChangeEvent(ChangeEvent.RESYNC))
+
+    async def _supervise(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._connection_lost.wait(), self._ping_interval)
+            except asyncio.TimeoutError:
+                # a silently dropped TCP connection is only noticed by using it
+                if await self._is_alive():
+                    continue
+            await self._reconnect()
@@ -0,0 +1,122 @@
+import warnings
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pyasync_orm.plans import PlanRecorder
+
+# the trackers of the enclosing Database.track() blocks
+_trackers: ContextVar[Tuple['QueryTracker', ...]] = ContextVar(
+    'pyasync_orm_trackers',
+    default=(),
+)
+
+
+class QueryShape:
+    """The queries of one shape, the SQL with placeholders, run in a block."""
+
+    def __init__(self, shape: str):
+        self.shape = shape
+        self.count = 0
+        self.seconds = 0.0
+        # hashes of the distinct arguments, keeping the arguments would hold
+        # on to every value passed in the block
+        self.parameters: Set[int] = set()
+
+    def __str__(self):
+        return f'<QueryShape: {self.count} x {self.shape}>'
+
+    def __repr__(self):
+        return f'{self}'
+
+
+class QueryTracker:
+    """
+    Counts the queries run inside a Database.track() block, including ones
+    in tasks created from it, their total time and how often each shape
+    ran. A shape run with more than n_plus_one different parameters is
+    reported as an N+1 pattern, as are more than max_queries queries or
+    more than max_seconds spent in the database. Reports raise an
+    AssertionError when the block exits, or warn with on_exceeded='warn'.
+    """
+
+    def __init__(
+        self,
+        max_queries: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        n_plus_one: Optional[int] = 10,
+        on_exceeded: str = 'raise',
+    ):
+        if on_exceeded not in ('raise', 'warn'):
+            raise ValueError(f"on_exceeded must be 'raise' or 'warn', got {on_exceeded!r}")
+        self.max_queries = max_queries
+        self.max_seconds = max_seconds
+        self.n_plus_one = n_plus_one
+        self.on_exceeded = on_exceeded
+        self.queries = 0
+        self.seconds = 0.0
+        self.shapes: Dict[str, QueryShape] = {}
+
+    def __str__(self):
+        return f'<QueryTracker: {self.queries} queries in {self.seconds:.3f}s>'
+
+    def __repr__(self):
+        return f'{self}'
+
+    def record(self, query: str, args: Tuple[Any, ...], seconds: float):
+        shape = PlanRecorder.get_shape(query)
+        if shape not in self.shapes:
+            self.shapes[shape] = QueryShape(shape)
+        query_shape = self.shapes[shape]
+        query_shape.count += 1
+        query_shape.seconds += seconds
+        query_shape.parameters.add(self._hash_args(args))
+        self.queries += 1
+        self.seconds += seconds
+
+    @staticmethod
+    def _hash_args(args: Tuple[Any, ...]) -> int:
+        try:
+            return hash(args)
+        except TypeError:
+            # lists or dicts, e.g. the array of = ANY($1)
+            return hash(repr(args))
+
+    def repeated(self) -> List[QueryShape]:
+        """Shapes run more than once, the most frequent first."""
+        return sorted(
+            (query_shape for query_shape in self.shapes.values() if query_shape.count > 1),
+            key=lambda query_shape: query_shape.count,
+            reverse=True,
+        )
+
+    def n_plus_one_shapes(self) -> List[QueryShape]:
+        if self.n_plus_one is None:
+            return []
+        return [
+            query_shape for query_shape in self.repeated()
+            if len(query_shape.parameters) > self.n_plus_one
+        ]
+
+    def get_problems(self) -> List[str]:
+        problems = []
+        if self.max_queries is not None and self.queries > self.max_queries:
+            problems.append(f'{self.queries} queries, the budget is {self.max_queries}')
+        if self.max_seconds is not None and self.seconds > self.max_seconds:
+            problems.append(
+                f'{self.seconds:.3f}s in the database, the budget is {self.max_seconds}s'
+            )
+        problems += [
+            f'N+1: {len(query_shape.parameters)} different parameters for {query_shape.shape}'
+            for query_shape in self.n_plus_one_shapes()
+        ]
+        return problems
+
+    def check(self):
+        problems = self.get_problems()
+        if not problems:
+            return
+        message = 'Query budget exceeded:\n' + '\n'.join(problems)
+        if self.on_exceeded == 'warn':
+            warnings.warn(message)
+        else:
+            raise AssertionError(message)
@@ -0,0 +1,233 @@
+import asyncio
+import contextvars
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Type, TYPE_CHECKING
+
+from pyasync_orm.sql import SQL
+
+if TYPE_CHECKING:
+    from pyasync_orm.database import Database
+    from pyasync_orm.models import Model
+
+# under the bind parameter limit of both PostgreSQL and SQLite
+MAX_PARAMETERS = 32_766
+
+Item = Tuple['Model', asyncio.Future]
+
+
+class WriterMetrics:
+    def __init__(self):
+        self.rows_added = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.flushes = 0
+        self.last_flush_size = 0
+        self.last_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+        self.last_error: Optional[BaseException] = None
+
+    def __str__(self):
+        return (
+            f'<WriterMetrics: {self.rows_written} written, {self.rows_failed} failed, '
+            f'{self.flushes} flushes>'
+        )
+
+    def __repr__(self):
+        return f'{self}'
+
+
+class BufferedWriter:
+    """
+    Collects models from many coroutines and inserts them in batches of up
+    to max_batch_size rows, at the latest max_delay seconds after the
+    first row of a batch was added. add() waits while max_pending rows
+    are queued, so producers slow down to what the database can take.
+
+    With method='insert' one multi-row INSERT is run per batch and each
+    row's future resolves to its primary key. method='copy' uses COPY,
+    which is faster but PostgreSQL only, and resolves the futures to None.
+    Database.close() writes whatever is still buffered.
+    """
+
+    def __init__(
+        self,
+        database: 'Database',
+        model_class: Type['Model'],
+        max_batch_size: int = 1000,
+        max_delay: float = 0.05,
+        max_pending: int = 10_000,
+        method: str = 'insert',
+    ):
+        if method not in ('insert', 'copy'):
+            raise ValueError(f"method must be 'insert' or 'copy', got {method!r}")
+        self.database = database
+        self.model_class = model_class
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.method = method
+        self.metrics = WriterMetrics()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._pending: Set[asyncio.Future] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def add(self, model: 'Model') -> asyncio.Future:
+        """
+        Queues model and returns a future of its primary key, awaiting it
+        is optional: await (await writer.add(model))
+        """
+        if self._closed:
+            raise ValueError('The writer is closed.')
+        if self._task is None:
+            # the flush task outlives the caller, it must not inherit its
+            # deadline, transaction, priority or trackers
+            self._task = contextvars.Context().run(asyncio.ensure_future, self._run())
+        future = asyncio.get_event_loop().create_future()
+        # put waits while the queue is full, a cancelled put must not leave
+        # a future flush() would wait for forever
+        await self._queue.put((model, future))
+        # failures are counted in metrics, nobody has to await the future;
+        # the flush task cannot resolve it before this runs
+        future.add_done_callback(self._forget)
+        self._pending.add(future)
+        self.metrics.rows_added += 1
+        return future
+
+    def _forget(self, future: asyncio.Future):
+        self._pending.discard(future)
+        if not future.cancelled():
+            future.exception()
+
+    async def flush(self):
+        """Waits until every row added so far is written or failed."""
+        await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._task is not None:
+                # the sentinel is queued behind every buffered row
+                await self._queue.put(None)
+                await self._task
+        finally:
+            self.database.remove_writer(self)
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+            if stop:
+                return
+
+    async def _write(self, batch: List[Item]):
+        started = time.monotonic()
+        # rows setting different fields cannot share a statement
+        groups: Dict[Tuple[str, ...], List[Item]] = {}
+        for model, future in batch:
+            groups.setdefault(tuple(model.orm_fields), []).append((model, future))
+        for column_names, items in groups.items():
+            try:
+                if self.method == 'copy':
+                    pks = await self._copy(column_names, items)
+                else:
+                    pks = await self._insert(column_names, items)
+            except Exception as error:
+                self.metrics.rows_failed += len(items)
+                self.metrics.last_error = error
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.metrics.rows_written += len(items)
+            for (_, future), pk in zip(items, pks):
+                if not future.done():
+                    future.set_result(pk)
+        seconds = time.monotonic() - started
+        self.metrics.flushes += 1
+        self.metrics.last_flush_size = len(batch)
+        self.metrics.last_flush_seconds = seconds
+        self.metrics.total_flush_seconds += seconds
+
+    async def _insert(self, column_names: Tuple[str, ...], items: List[Item]) -> List[Any]:
+        if not column_names:
+            # every column takes its default, which has no multi-row form
+            return [
+                await self.model_class.orm.create(returning='pk')
+                for _ in items
+            ]
+        pk = self.model_class.id.name
+        management_system = self.database.management_system
+        if management_system.array_parameters:
+            # one array parameter per column, no matter how many rows
+            rows_per_statement = len(items)
+        else:
+            rows_per_statement = max(MAX_PARAMETERS // len(column_names), 1)
+        pks = []
+        for start in range(0, len(items), rows_per_statement):
+            statement_items = items[start:start + rows_per_statement]
+            rows = [
+                [model.orm_fields[column_name] for column_name in column_names]
+                for model, _ in statement_items
+            ]
+            sql = SQL(
+                self.model_class.table_name,
+                placeholder_format=management_system.placeholder_format,
+            )
+            if management_system.array_parameters:
+                fields = self.model_class.get_fields()
+                sql, values = sql.build_insert_unnest(
+                    column_names=column_names,
+                    column_types=[fields[column_name].data_type for column_name in column_names],
+                    rows=rows,
+                    returning=[pk],
+                )
+            else:
+                sql, values = sql.build_insert_many(
+                    column_names=column_names,
+                    rows=rows,
+                    returning=[pk],
+                )
+            results = await self.database.fetch(sql, *values)
+            if pk in column_names:
+                pks += [model.orm_fields[pk] for model, _ in statement_items]
+            else:
+                # RETURNING rows come in no particular order, but the
+                # auto-incremented keys grow in the order rows are inserted
+                pks += sorted(result[pk] for result in results)
+        return pks
+
+    async def _copy(self, column_names: Tuple[str, ...], items: List[Item]) -> List[Any]:
+        if not column_names:
+            return await self._insert(column_names, items)
+        await self.database.copy_to_table(
+            self.model_class.table_name,
+            records=[
+                tuple(model.orm_fields[column_name] for column_name in column_names)
+                for model, _ in items
+            ],
+            columns=list(column_names),
+        )
+        return [None] * len(items)
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from pyasync_orm.admission import AcquireTimeoutError, AdmissionControl, QueueFullError
+from pyasync_orm.clients.aiosqlite_client import AIOSQLiteClient
+from pyasync_orm.database import Database
+
+
+class TestAdmissionControl:
+    @pytest.mark.asyncio
+    async def test_priorities(self):
+        admission = AdmissionControl(limit=1, max_queue_depth=2)
+        await admission.acquire()
+        admitted = []
+
+        async def query(priority: str, name: str):
+            try:
+                await admission.acquire(priority)
+            except QueueFullError:
+                admitted.append(f'{name} rejected')
+                return
+            admitted.append(name)
+            admission.release()
+
+        batch = asyncio.ensure_future(query('batch', 'batch 1'))
+        await asyncio.sleep(0)
+        shed = asyncio.ensure_future(query('batch', 'batch 2'))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(query('interactive', 'interactive'))
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(batch, shed, interactive)
+
+        assert admitted == ['batch 2 rejected', 'interactive', 'batch 1']
+        assert admission.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_full(self):
+        admission = AdmissionControl(limit=1, max_queue_depth=0)
+        await admission.acquire()
+
+        with pytest.raises(QueueFullError):
+            await admission.acquire('batch')
+        assert admission.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_acquire_timeout(self):
+        admission = AdmissionControl(limit=1, acquire_timeout=0.01)
+        await admission.acquire()
+
+        with pytest.raises(AcquireTimeoutError):
+            await admission.acquire()
+        assert admission.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_priority(self):
+        with pytest.raises(ValueError):
+            await AdmissionControl().acquire('realtime')
+
+    def test_adaptive_limit(self):
+        admission = AdmissionControl(limit=20, adaptive=True)
+        for latency in [0.01] * 300 + [0.1] * 50:
+            admission.in_flight += 1
+            admission.release(latency)
+
+        assert admission.limit < 10
+
+        for _ in range(200):
+            admission.in_flight += 1
+            admission.release(0.01)
+
+        assert admission.limit == 20
+
+    @pytest.mark.asyncio
+    async def test_database(self):
+        database = Database()
+        await database.connect(
+            client=AIOSQLiteClient,
+            admission=AdmissionControl(limit=1, acquire_timeout=0.01),
+        )
+        try:
+            async with database.get_connection():
+                with database.priority('batch'):
+                    with pytest.raises(AcquireTimeoutError):
+                        await database.fetch('SELECT 1')
+            assert await database.fetch('SELECT 1 AS one') == [{'one': 1}]
+            assert database.admission.in_flight == 0
+        finally:
+            await database.close()
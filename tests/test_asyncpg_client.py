@@ -0,0 +1,148 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from pyasync_orm.clients.abstract_client import PoolOptions
+from pyasync_orm.clients.asyncpg_client import AsyncPGClient
+from pyasync_orm.database import Database
+
+
+class TestAsyncPGClient:
+    def test___init__(self):
+        client = AsyncPGClient(dsn='postgresql://localhost/db', min_size=2)
+
+        assert client.connect_kwargs == {'dsn': 'postgresql://localhost/db'}
+
+    def test__get_pool_kwargs(self):
+        client = AsyncPGClient(dsn='postgresql://localhost/db')
+        client.pool_options = PoolOptions(
+            max_queries=10,
+            max_idle_time=60,
+            session_settings={'application_name': 'tests'},
+        )
+
+        pool_kwargs = client._get_pool_kwargs({
+            'dsn': 'postgresql://localhost/db',
+            'server_settings': {'search_path': 'app'},
+        })
+
+        assert pool_kwargs == {
+            'dsn': 'postgresql://localhost/db',
+            'max_queries': 10,
+            'max_inactive_connection_lifetime': 60,
+            'server_settings': {'search_path': 'app', 'application_name': 'tests'},
+        }
+        assert client.connect_kwargs['server_settings'] == pool_kwargs['server_settings']
+
+    def test__get_pool_kwargs_pgbouncer(self):
+        client = AsyncPGClient(dsn='postgresql://localhost/db')
+        client.pool_options = PoolOptions(
+            session_settings={'application_name': 'tests'},
+            pooler='pgbouncer',
+        )
+
+        pool_kwargs = client._get_pool_kwargs({'dsn': 'postgresql://localhost/db'})
+
+        assert pool_kwargs['statement_cache_size'] == 0
+
+    def test__get_pool_kwargs_pgbouncer_session_settings(self):
+        client = AsyncPGClient(dsn='postgresql://localhost/db')
+        client.pool_options = PoolOptions(
+            session_settings={'search_path': 'app'},
+            pooler='pgbouncer-prepared',
+        )
+
+        with pytest.raises(ValueError):
+            client._get_pool_kwargs({'dsn': 'postgresql://localhost/db'})
+
+    @pytest.mark.parametrize('query', [
+        'SET search_path = app',
+        'LISTEN jobs',
+        "SELECT pg_advisory_lock(1)",
+        'CREATE TEMP TABLE ids (id bigint)',
+    ])
+    def test__check_session_state(self, query):
+        connection = mock.Mock(is_in_transaction=mock.Mock(return_value=False))
+
+        with pytest.raises(ValueError):
+            AsyncPGClient._check_session_state(connection, query)
+
+    @pytest.mark.parametrize('query', [
+        'UPDATE customers SET first_name = $1',
+        'SET LOCAL statement_timeout = 100',
+        'SELECT pg_advisory_xact_lock(1)',
+    ])
+    def test__check_session_state_allowed(self, query):
+        connection = mock.Mock(is_in_transaction=mock.Mock(return_value=True))
+
+        AsyncPGClient._check_session_state(connection, query)
+
+    @pytest.mark.asyncio
+    async def test_get_connection_timeout(self):
+        client = AsyncPGClient(dsn='postgresql://localhost/db')
+        connection = mock.Mock()
+        client.connection_pool = mock.Mock(
+            acquire=mock.AsyncMock(return_value=connection),
+            release=mock.AsyncMock(),
+        )
+
+        with pytest.raises(asyncio.TimeoutError):
+            async with client.get_connection():
+                raise asyncio.TimeoutError()
+
+        client.connection_pool.expire_connections.assert_not_called()
+        client.connection_pool.release.assert_awaited_once_with(connection)
+
+    @pytest.mark.asyncio
+    async def test__init_connection_prepared_statements(self):
+        client = AsyncPGClient(dsn='postgresql://localhost/db')
+        client.pool_options = PoolOptions(prepared_statements=['SELECT 1'])
+        connection = mock.Mock(prepare=mock.AsyncMock())
+
+        await client._init_connection(connection)
+
+        connection.prepare.assert_awaited_once_with('SELECT 1')
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('closed, expired', [(False, False), (True, True)])
+    async def test_get_connection_os_error(self, closed, expired):
+        client = AsyncPGClient(dsn='postgresql://localhost/db')
+        connection = mock.Mock(is_closed=mock.Mock(return_value=closed))
+        client.connection_pool = mock.Mock(
+            acquire=mock.AsyncMock(return_value=connection),
+            release=mock.AsyncMock(),
+        )
+
+        with pytest.raises(FileNotFoundError):
+            async with client.get_connection():
+                raise FileNotFoundError('rows.csv')
+
+        assert client.connection_pool.expire_connections.called == expired
+
+    @pytest.mark.asyncio
+    async def test_transaction_timeouts(self):
+        database = Database()
+        database.client = AsyncPGClient(dsn='postgresql://localhost/db')
+        connection = mock.MagicMock(
+            execute=mock.AsyncMock(),
+            fetch=mock.AsyncMock(return_value=[]),
+        )
+        database.client.connection_pool = mock.Mock(
+            acquire=mock.AsyncMock(return_value=connection),
+            release=mock.AsyncMock(),
+        )
+
+        with database.deadline(10):
+            async with database.transaction():
+                await database.fetch('SELECT 1', timeout=1)
+                await database.fetch('SELECT 2')
+
+        # one SET LOCAL from the deadline, the first statement's timeout
+        # does not carry over to the second
+        [set_local] = connection.execute.await_args_list
+        assert set_local.args[0].startswith('SET LOCAL statement_timeout = ')
+        assert 9000 < int(set_local.args[0].split()[-1]) <= 10000
+        first, second = connection.fetch.await_args_list
+        assert first.kwargs['timeout'] <= 1
+        assert 1 < second.kwargs['timeout'] <= 10
@@ -0,0 +1,60 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from pyasync_orm import fields
+from pyasync_orm.clients.aiosqlite_client import AIOSQLiteClient
+from pyasync_orm.clients.asyncpg_client import AsyncPGClient
+from pyasync_orm.codecs import get_json_codec, get_jsonb_codec
+from pyasync_orm.database import Database
+from pyasync_orm.models import Model
+
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return str(o)
+        return super().default(o)
+
+
+class Document(Model):
+    data = fields.JSONField()
+    indexed_data = fields.JSONBField()
+
+
+class TestCodecs:
+    def test_json_codec_round_trip(self):
+        dumps, loads = get_json_codec()
+
+        assert loads(dumps({'a': [1, 2]})) == {'a': [1, 2]}
+
+    def test_jsonb_codec_version_byte(self):
+        dumps, loads = get_jsonb_codec()
+
+        data = dumps({'a': 1})
+
+        assert data[:1] == b'\x01'
+        assert loads(data) == {'a': 1}
+
+    def test_json_codec_encoder(self):
+        dumps, _ = get_json_codec(encoder=DecimalEncoder)
+
+        assert json.loads(dumps({'a': Decimal('1.5')})) == {'a': '1.5'}
+
+    def test_get_type_codecs(self):
+        database = Database()
+        database.client = AsyncPGClient(dsn='postgresql://localhost/db')
+        database.models = [Document]
+
+        assert set(database._get_type_codecs()) == {'json', 'jsonb'}
+
+    @pytest.mark.asyncio
+    async def test_sqlite_json_and_jsonb(self):
+        database = Database()
+        # both map to text on SQLite, which registers no codecs
+        await database.connect(client=AIOSQLiteClient, models=[Document])
+        try:
+            assert database.client.type_codecs == {}
+        finally:
+            await database.close()
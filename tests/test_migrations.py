@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+from pyasync_orm.clients.aiosqlite_client import AIOSQLiteClient
+from pyasync_orm.database import Database
+from pyasync_orm.databases.postgresql import PostgreSQL
+from pyasync_orm.migrations.migration import get_migration_paths
+from pyasync_orm.migrations.runner import MigrationRunner
+
+
+def write_migration(directory, number, statements):
+    path = directory / f'migration_{number}.py'
+    path.write_text(f'migrations = {statements!r}\n')
+
+
+@pytest.fixture
+async def database(tmp_path):
+    database = Database()
+    await database.connect(client=AIOSQLiteClient, database=str(tmp_path / 'db.sqlite3'))
+    yield database
+    await database.close()
+
+
+async def table_names(database):
+    records = await database.fetch("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {record['name'] for record in records}
+
+
+class TestMigrationRunner:
+    def test_get_migration_paths(self, tmp_path):
+        for number in (10, 2, 1):
+            write_migration(tmp_path, number, [])
+        (tmp_path / '__init__.py').write_text('')
+
+        paths = get_migration_paths(str(tmp_path))
+
+        assert [path.rsplit('/', 1)[1] for path in paths] == [
+            'migration_1.py', 'migration_2.py', 'migration_10.py',
+        ]
+
+    def test_is_transactional(self):
+        assert PostgreSQL.is_transactional('CREATE INDEX a_index ON a (id)')
+        assert not PostgreSQL.is_transactional('CREATE INDEX CONCURRENTLY a_index ON a (id)')
+        assert not PostgreSQL.is_transactional('VACUUM a')
+
+    @pytest.mark.asyncio
+    async def test_run(self, database, tmp_path):
+        write_migration(tmp_path, 1, ['CREATE TABLE a (id integer)', 'VACUUM'])
+        write_migration(tmp_path, 2, ['CREATE TABLE b (id integer)'])
+        runner = MigrationRunner(database, migrations_directory=str(tmp_path))
+
+        assert await runner.run() == ['migration_1', 'migration_2']
+        assert await runner.run() == []
+        assert {'a', 'b'} <= await table_names(database)
+
+    @pytest.mark.asyncio
+    async def test_run_rolls_back_failed_step(self, database, tmp_path):
+        write_migration(tmp_path, 1, ['CREATE TABLE a (id integer)', 'CREATE TABLE a (id integer)'])
+        runner = MigrationRunner(database, migrations_directory=str(tmp_path))
+
+        with pytest.raises(sqlite3.OperationalError, match='table a already exists'):
+            await runner.run()
+
+        assert 'a' not in await table_names(database)
+        write_migration(tmp_path, 1, ['CREATE TABLE a (id integer)'])
+        assert await runner.run() == ['migration_1']
+
+    @pytest.mark.asyncio
+    async def test_unlock_failure_is_logged(self, database, tmp_path, caplog):
+        # SQLite has no pg_advisory_unlock
+        database.management_system = PostgreSQL
+        runner = MigrationRunner(database, migrations_directory=str(tmp_path))
+
+        await runner._unlock()
+
+        assert 'Releasing the migration lock failed.' in caplog.text
@@ -1,10 +1,32 @@
+import asyncio
+import io
+from unittest import mock
+
 import pytest
 
+from pyasync_orm.clients.aiosqlite_client import AIOSQLiteClient
+from pyasync_orm.database import Database
+from pyasync_orm.fields import Exists
+from pyasync_orm.loaders import Loader
 from pyasync_orm.orm import ORM
 from pyasync_orm.sql import SQL
+from pyasync_orm.writers import BufferedWriter
 from tests.models import Customer
 
 
+@pytest.fixture
+async def sqlite_database():
+    database = Database()
+    await database.connect(client=AIOSQLiteClient)
+    await database.execute(
+        'CREATE TABLE customers (id integer PRIMARY KEY AUTOINCREMENT, first_name varchar(100))'
+    )
+    with mock.patch.object(ORM, 'database', database), \
+            mock.patch.object(Customer.orm, '_frozen_sql', None):
+        yield database
+    await database.close()
+
+
 class TestORM:
     def test___init__(self):
         assert Customer.orm._model_class == Customer
@@ -26,6 +48,24 @@ class TestORM:
         assert original_orm == same_orm
         Customer.orm._sql = None
 
+    def test_build_select(self):
+        assert Customer.orm.filter(Customer.id == 1).build_select() == (
+            'SELECT * FROM customers WHERE id = $1', (1,),
+        )
+
+    @pytest.mark.postgres
+    def test_frozen_fields(self):
+        Customer.freeze()
+
+        assert Customer.get_fields() is Customer.get_fields()
+        assert Customer.first_name.db_column_dict['data_type'] == 'character varying'
+        assert Customer.orm._new_sql() is not Customer.orm._new_sql()
+        assert Customer.orm.filter(Customer.id == 1).build_select() == (
+            'SELECT * FROM customers WHERE id = $1', (1,),
+        )
+        assert Customer.orm._frozen_sql.values == ()
+
+    @pytest.mark.postgres
     @pytest.mark.asyncio
     async def test_create(self):
         customer = await Customer.orm.create()
@@ -37,11 +77,314 @@ class TestORM:
 
         assert isinstance(orm, ORM)
 
-    # def test_exclude(self):
-    #     orm = Customer.orm.exclude(Customer.id == 1)
-    #
-    #     assert isinstance(orm, ORM)
+    def test_exclude(self):
+        orm = Customer.orm.exclude(Customer.id == 1)
+
+        assert isinstance(orm, ORM)
+        assert orm._sql.build_select() == (
+            'SELECT * FROM customers WHERE NOT (id = $1)', (1,),
+        )
+
+    def test_exclude_nothing(self):
+        assert Customer.orm.exclude().build_select() == Customer.orm.build_select()
+
+    def test__get_returning_columns(self):
+        assert Customer.orm._get_returning_columns('first_name') == ['first_name']
+        assert Customer.orm._get_returning_columns(['id', Customer.first_name]) == [
+            'id', 'first_name',
+        ]
+        assert Customer.orm._get_returning_columns('pk') == ['id']
+
+    def test_filter_or_not(self):
+        orm = Customer.orm.filter(
+            Customer.id > 0,
+            (Customer.id == 1) | ~(Customer.first_name == 'Ron'),
+        )
+
+        assert orm._sql.build_select() == (
+            'SELECT * FROM customers '
+            'WHERE id > $1 AND (id = $2 OR NOT (first_name = $3))',
+            (0, 1, 'Ron'),
+        )
+
+    def test_filter_in_subquery(self):
+        orm = Customer.orm.filter(
+            Customer.id > 0,
+            Customer.id.in_(Customer.orm.filter(Customer.first_name == 'Ron').values('id')),
+        )
+
+        assert orm._sql.build_select() == (
+            'SELECT * FROM customers WHERE id > $1 AND '
+            'id IN (SELECT id FROM customers WHERE first_name = $2)',
+            (0, 'Ron'),
+        )
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_filter_exists(self):
+        customer = await Customer.orm.create(Customer(first_name='Ron'))
+
+        customers = await Customer.orm.filter(
+            Exists(Customer.orm.filter(Customer.first_name == 'Ron')),
+        ).all()
+        no_customers = await Customer.orm.filter(
+            ~Exists(Customer.orm.filter(Customer.first_name == 'Ron')),
+        ).all()
+
+        assert [customer_.id for customer_ in customers] == [customer.id]
+        assert no_customers == []
+
+    def test_select_for_update(self):
+        orm = Customer.orm.filter(Customer.id == 1).select_for_update(
+            skip_locked=True,
+            of=[Customer],
+        )
+
+        assert orm._sql.build_select() == (
+            'SELECT * FROM customers WHERE id = $1 FOR UPDATE OF customers SKIP LOCKED',
+            (1,),
+        )
+
+    def test_sample(self):
+        orm = Customer.orm.sample(10, method='bernoulli', seed=1).filter(Customer.id > 1)
 
+        assert orm._sql.build_select() == (
+            'SELECT * FROM customers TABLESAMPLE BERNOULLI ($2) REPEATABLE ($3) '
+            'WHERE id > $1',
+            (1, 10, 1),
+        )
+        assert orm._sql.build_count() == (
+            'SELECT COUNT(*) AS count FROM customers TABLESAMPLE BERNOULLI ($2) '
+            'REPEATABLE ($3) WHERE id > $1',
+            (1, 10, 1),
+        )
+        with pytest.raises(ValueError):
+            orm._sql.build_delete()
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_estimated_count(self):
+        await Customer.orm.create()
+        await ORM.database.execute('ANALYZE customers')
+
+        assert await Customer.orm.estimated_count() == 1
+        assert await Customer.orm.filter(Customer.id == 0).estimated_count() == 1
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_get_table_rows(self):
+        await ORM.database.execute('CREATE SCHEMA IF NOT EXISTS other')
+        try:
+            # a table of the same name outside the search path
+            await ORM.database.execute('CREATE TABLE other.customers (id bigint)')
+            await ORM.database.execute('INSERT INTO other.customers VALUES (1), (2)')
+            await ORM.database.execute('ANALYZE other.customers')
+            await Customer.orm.create()
+            await ORM.database.execute('ANALYZE customers')
+
+            assert await ORM.database.get_table_rows(['customers', 'other.customers']) == {
+                'customers': 1,
+                'other.customers': 2,
+            }
+        finally:
+            await ORM.database.execute('DROP SCHEMA other CASCADE')
+
+    @pytest.mark.asyncio
+    async def test_estimated_count_without_estimate(self):
+        with mock.patch.object(ORM, 'database') as database:
+            database.get_table_rows = mock.AsyncMock(return_value={})
+            explain = mock.AsyncMock(return_value=mock.Mock(rows=5))
+            with mock.patch.object(ORM, 'explain', explain):
+                assert await Customer.orm.estimated_count() == 5
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_buffered_writer(self):
+        writer = Customer.orm.buffered_writer(max_batch_size=10)
+
+        futures = await asyncio.gather(*(
+            writer.add(Customer(first_name=str(index))) for index in range(25)
+        ))
+        await writer.flush()
+        await writer.close()
+
+        customers = await Customer.orm.filter(Customer.id.in_(
+            [future.result() for future in futures],
+        )).order_by('id').all()
+        assert [customer.first_name for customer in customers] == [
+            str(index) for index in range(25)
+        ]
+        assert writer.metrics.rows_written == 25
+        assert writer.metrics.flushes >= 3
+        assert writer not in ORM.database._writers
+
+    @pytest.mark.asyncio
+    async def test_buffered_writer_cancelled_add(self):
+        writer = BufferedWriter(database=Database(), model_class=Customer, max_pending=1)
+        # no flush task takes rows off the queue
+        writer._task = mock.Mock()
+        future = await writer.add(Customer(first_name='first'))
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(writer.add(Customer(first_name='second')), timeout=0.01)
+        future.set_result(1)
+
+        await asyncio.wait_for(writer.flush(), timeout=1)
+        assert writer.metrics.rows_added == 1
+
+    def test_build_insert_unnest(self):
+        sql = SQL(table_name=Customer.table_name)
+
+        assert sql.build_insert_unnest(
+            column_names=['first_name'],
+            column_types=['character varying'],
+            rows=[['a'], ['b']],
+            returning=['id'],
+        ) == (
+            'INSERT INTO customers (first_name) SELECT first_name FROM '
+            'unnest($1::character varying[]) WITH ORDINALITY '
+            'AS batch (first_name, ordinality) ORDER BY ordinality RETURNING id',
+            (['a', 'b'],),
+        )
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_buffered_writer_context(self):
+        writer = Customer.orm.buffered_writer(max_delay=0.01)
+
+        with ORM.database.deadline(0.05):
+            await writer.add(Customer(first_name='first'))
+        await asyncio.sleep(0.1)
+        future = await writer.add(Customer(first_name='second'))
+        await writer.close()
+
+        assert await future
+        assert writer.metrics.rows_failed == 0
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_batch_loads(self):
+        customer_1 = await Customer.orm.create()
+        customer_2 = await Customer.orm.create()
+
+        with ORM.database.batch_loads():
+            customers = await asyncio.gather(
+                Customer.orm.get(Customer.id == customer_1.id),
+                Customer.orm.get(Customer.id == customer_2.id),
+                Customer.orm.get(Customer.id == customer_1.id),
+                Customer.orm.get(Customer.id == 0),
+                return_exceptions=True,
+            )
+
+        assert [customer.id for customer in customers[:3]] == [
+            customer_1.id, customer_2.id, customer_1.id,
+        ]
+        assert isinstance(customers[3], ValueError)
+
+    def test__get_loadable_pk(self):
+        assert Customer.orm._get_loadable_pk((Customer.id == 5,)) == 5
+        assert Customer.orm._get_loadable_pk((Customer.id == '5',)) is None
+        assert Customer.orm._get_loadable_pk((Customer.id == True,)) is None  # noqa: E712
+
+    @pytest.mark.asyncio
+    async def test_batch_loads_transaction(self, sqlite_database):
+        created = asyncio.Event()
+        pks = []
+
+        async def get_outside():
+            await created.wait()
+            return await Customer.orm.get(Customer.id == pks[0])
+
+        with sqlite_database.batch_loads():
+            outside = asyncio.ensure_future(get_outside())
+            with pytest.raises(ZeroDivisionError):
+                async with sqlite_database.transaction():
+                    ronald = await Customer.orm.create(Customer(first_name='Ronald'))
+                    pks.append(ronald.id)
+                    created.set()
+                    in_transaction = await asyncio.wait_for(
+                        Customer.orm.get(Customer.id == ronald.id),
+                        timeout=5,
+                    )
+                    1 / 0
+
+        assert in_transaction.first_name == 'Ronald'
+        # the row was rolled back, the other task never saw it
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(outside, timeout=5)
+
+    @pytest.mark.asyncio
+    async def test_batch_loads_timeout(self):
+        loader = Loader()
+
+        with mock.patch.object(Loader, '_load_batch', new=mock.AsyncMock()) as load_batch:
+            loads = [
+                asyncio.ensure_future(loader.load(Customer, pk, timeout=timeout))
+                for pk, timeout in ((1, 5), (2, 1), (3, None))
+            ]
+            await asyncio.sleep(0.01)
+        for load in loads:
+            load.cancel()
+
+        model_class, futures_by_pk, timeout = load_batch.await_args.args
+        assert list(futures_by_pk) == [1, 2, 3]
+        assert 0.9 < timeout <= 1
+
+    def test_any(self):
+        orm = Customer.orm.filter(Customer.id.any_([1, 2]))
+
+        assert orm._sql.build_select() == ('SELECT * FROM customers WHERE id = ANY($1)', ([1, 2],))
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_claim(self):
+        for _ in range(3):
+            await Customer.orm.create(Customer(first_name='new'))
+        new_customers = Customer.orm.filter(Customer.first_name == 'new').order_by('id')
+
+        claimed = await new_customers.claim(Customer(first_name='claimed'), batch=2)
+        claimed_rest = await new_customers.claim(Customer(first_name='claimed'), batch=2)
+
+        assert [customer.first_name for customer in claimed] == ['claimed', 'claimed']
+        assert len(claimed_rest) == 1
+        assert claimed_rest[0].id not in {customer.id for customer in claimed}
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_update_chain_twice(self):
+        customer = await Customer.orm.create(Customer(first_name='Ron'))
+        customers = Customer.orm.filter(Customer.id == customer.id)
+
+        await customers.update(Customer(first_name='Ronald'), returning=None)
+        updated = await customers.update(Customer(first_name='Ronnie'))
+
+        assert [customer_.first_name for customer_ in updated] == ['Ronnie']
+        assert customers._sql.values == (customer.id,)
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_transaction_rollback(self):
+        with pytest.raises(ZeroDivisionError):
+            async with ORM.database.transaction():
+                await Customer.orm.create()
+                1 / 0
+
+        assert await Customer.orm.count() == 0
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_filter_or_all(self):
+        customer_1 = await Customer.orm.create(Customer(first_name='Ron'))
+        customer_2 = await Customer.orm.create(Customer(first_name='Ronald'))
+        await Customer.orm.create(Customer(first_name='Other'))
+
+        customers = await Customer.orm.filter(
+            (Customer.first_name == 'Ron') | (Customer.first_name == 'Ronald'),
+        ).all()
+
+        assert [customer_1.id, customer_2.id] == [customer.id for customer in customers]
+
+    @pytest.mark.postgres
     @pytest.mark.asyncio
     async def test_get(self):
         customer = await Customer.orm.create()
@@ -50,6 +393,7 @@ class TestORM:
 
         assert customer.id == customer_got.id
 
+    @pytest.mark.postgres
     @pytest.mark.asyncio
     async def test_all(self):
         customer_1 = await Customer.orm.create()
@@ -60,6 +404,7 @@ class TestORM:
         assert len(customers) == 2
         assert [customer_1.id, customer_2.id] == [customer.id for customer in customers]
 
+    @pytest.mark.postgres
     @pytest.mark.asyncio
     async def test_update(self):
         await Customer.orm.create(Customer(first_name='Ron'))
@@ -70,6 +415,7 @@ class TestORM:
 
         assert updated_customers[0].first_name == 'Ronald'
 
+    @pytest.mark.postgres
     @pytest.mark.asyncio
     async def test_delete(self):
         customer = await Customer.orm.create()
@@ -79,6 +425,7 @@ class TestORM:
         assert customers_deleted[0].id == customer.id
         assert await Customer.orm.count() == 0
 
+    @pytest.mark.postgres
     @pytest.mark.asyncio
     async def test_delete(self):
         assert await Customer.orm.count() == 0
@@ -86,3 +433,70 @@ class TestORM:
         await Customer.orm.create()
 
         assert await Customer.orm.count() == 1
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_count_timeout(self):
+        assert await Customer.orm.count(timeout=5) == 0
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_explain(self):
+        plan = await Customer.orm.filter(Customer.id == 1).explain()
+
+        # the primary key is unique
+        assert plan.rows == 1
+
+    @pytest.mark.asyncio
+    async def test_deadline_exceeded(self):
+        with ORM.database.deadline(0):
+            with pytest.raises(asyncio.TimeoutError):
+                await Customer.orm.count()
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_copy_to_copy_from(self):
+        await Customer.orm.create(Customer(first_name='Ron'))
+        await Customer.orm.create(Customer(first_name='Ronald'))
+        sink = io.BytesIO()
+
+        copied = await Customer.orm.filter(Customer.first_name == 'Ron').copy_to(sink)
+        await Customer.orm.delete()
+        sink.seek(0)
+        loaded = await Customer.orm.copy_from(sink)
+
+        assert copied == loaded == 1
+        assert (await Customer.orm.get()).first_name == 'Ron'
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_to_columns(self):
+        customer_1 = await Customer.orm.create(Customer(first_name='Ron'))
+        customer_2 = await Customer.orm.create(Customer(first_name='Ronald'))
+
+        columns = await Customer.orm.to_columns(Customer.id, 'first_name')
+
+        assert list(columns['id']) == [customer_1.id, customer_2.id]
+        assert list(columns['first_name']) == ['Ron', 'Ronald']
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_delete_returning_none(self):
+        await Customer.orm.create()
+        await Customer.orm.create()
+
+        assert await Customer.orm.delete(returning=None) == 2
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_update_batch_size(self):
+        customers = [await Customer.orm.create() for _ in range(5)]
+
+        updated_pks = await Customer.orm.update(
+            Customer(first_name='Ronald'),
+            returning='pk',
+            batch_size=2,
+        )
+
+        assert updated_pks == [customer.id for customer in customers]
+        assert await Customer.orm.filter(Customer.first_name == 'Ronald').count() == 5
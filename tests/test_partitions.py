@@ -0,0 +1,96 @@
+import datetime
+
+import pytest
+
+from pyasync_orm.databases.abstract_management_system import UnsupportedFeatureError
+from pyasync_orm.databases.postgresql import PostgreSQL, Table, Column
+from pyasync_orm.databases.sqlite import SQLite
+from pyasync_orm.partitions import HashPartitioning, ListPartitioning, RangePartitioning
+
+
+def events_table() -> Table:
+    return Table(
+        table_name='events',
+        columns=[
+            Column(
+                column_name='id',
+                data_type='bigint',
+                null=False,
+                unique=True,
+                primary_key=True,
+                auto_increment=True,
+            ),
+            Column(
+                column_name='created_at',
+                data_type='date',
+                null=False,
+                unique=False,
+                primary_key=False,
+            ),
+        ],
+        partition_by=RangePartitioning('created_at', interval='month', premake=2),
+    )
+
+
+class TestPartitions:
+    def test_get_create_table_sql(self):
+        sql = PostgreSQL.get_create_table_sql(model_table=events_table())
+
+        assert sql == (
+            'CREATE TABLE events(id bigserial, created_at date NOT NULL, '
+            'PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)'
+        )
+
+    def test_unique_without_partition_key(self):
+        table = events_table()
+        table.columns.append(Column(
+            column_name='name',
+            data_type='text',
+            null=False,
+            unique=True,
+            primary_key=False,
+        ))
+
+        with pytest.raises(ValueError):
+            PostgreSQL.get_create_table_sql(model_table=table)
+
+    def test_sqlite_does_not_support_partitioning(self):
+        with pytest.raises(UnsupportedFeatureError):
+            SQLite.get_create_table_sql(model_table=events_table())
+
+    def test_range_partitions(self):
+        partitions = events_table().partition_by.get_upcoming_partitions(
+            table_name='events',
+            today=datetime.date(2026, 11, 15),
+        )
+
+        assert [partition.name for partition in partitions] == [
+            'events_p20261101', 'events_p20261201', 'events_p20270101',
+        ]
+        assert partitions[1].bound == "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+        assert PostgreSQL.get_create_partition_sql('events', partitions[0]) == (
+            'CREATE TABLE IF NOT EXISTS events_p20261101 PARTITION OF events '
+            "FOR VALUES FROM ('2026-11-01') TO ('2026-12-01')"
+        )
+
+    def test_partition_end(self):
+        partitioning = RangePartitioning('created_at', interval='week')
+
+        assert partitioning.get_partition_end('events_p20261019') == datetime.date(2026, 10, 26)
+        assert partitioning.get_partition_end('events_default') is None
+
+    def test_list_partitions(self):
+        partitioning = ListPartitioning('region', values={'eu': ['de', "it's"]})
+
+        assert [(p.name, p.bound) for p in partitioning.get_partitions('events')] == [
+            ('events_eu', "FOR VALUES IN ('de', 'it''s')"),
+            ('events_default', 'DEFAULT'),
+        ]
+
+    def test_hash_partitions(self):
+        partitioning = HashPartitioning('id', modulus=2)
+
+        assert [p.bound for p in partitioning.get_partitions('events')] == [
+            'FOR VALUES WITH (MODULUS 2, REMAINDER 0)',
+            'FOR VALUES WITH (MODULUS 2, REMAINDER 1)',
+        ]
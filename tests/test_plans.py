@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from pyasync_orm.plans import PlanRecorder, QueryPlan
+
+
+def make_plan(node_type='Index Scan', rows=1, cost=8.3) -> QueryPlan:
+    return QueryPlan({
+        'Plan': {
+            'Node Type': 'Limit',
+            'Plan Rows': rows,
+            'Total Cost': cost,
+            'Plans': [{
+                'Node Type': node_type,
+                'Relation Name': 'customers',
+                'Plan Rows': rows,
+                'Total Cost': cost,
+            }],
+        },
+    })
+
+
+class TestQueryPlan:
+    def test_from_records(self):
+        records = [{'QUERY PLAN': json.dumps([make_plan().data])}]
+
+        plan = QueryPlan.from_records(records)
+
+        assert plan.rows == 1
+        assert plan.total_cost == 8.3
+        assert [node['Node Type'] for node in plan.nodes()] == ['Limit', 'Index Scan']
+
+    def test_seq_scans(self):
+        assert make_plan().seq_scans() == []
+        assert make_plan(node_type='Seq Scan').seq_scans() == ['customers']
+
+
+class TestPlanRecorder:
+    @pytest.mark.asyncio
+    async def test_compare(self, tmp_path):
+        recorder = PlanRecorder(str(tmp_path / 'plans.json'))
+
+        regressions = await recorder.compare(
+            database=None,
+            shape='SELECT * FROM customers WHERE id = $1',
+            plan=make_plan(rows=500, cost=40.0),
+            baseline=make_plan(),
+        )
+
+        assert regressions == [
+            'SELECT * FROM customers WHERE id = $1: row estimate grew from 1 to 500',
+            'SELECT * FROM customers WHERE id = $1: cost grew from 8.3 to 40.0',
+        ]
+
+    def test_save(self, tmp_path):
+        path = str(tmp_path / 'plans.json')
+        recorder = PlanRecorder(path)
+        recorder.plans['SELECT 1'] = make_plan().data
+
+        recorder.save()
+
+        assert PlanRecorder(path).baselines == {'SELECT 1': make_plan().data}
+
+    def test_get_shape(self):
+        assert PlanRecorder.get_shape('\n  SELECT *\n  FROM customers ') == 'SELECT * FROM customers'
+
+    def test_assert_no_regressions(self, tmp_path):
+        recorder = PlanRecorder(str(tmp_path / 'plans.json'))
+        recorder.regressions.append('SELECT 1: cost grew from 1 to 3')
+
+        with pytest.raises(AssertionError):
+            recorder.assert_no_regressions()
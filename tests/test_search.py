@@ -0,0 +1,77 @@
+from unittest import mock
+
+import pytest
+
+from pyasync_orm import fields
+from pyasync_orm.databases.abstract_management_system import UnsupportedFeatureError
+from pyasync_orm.databases.postgresql import PostgreSQL, Table, Column
+from pyasync_orm.databases.sqlite import SQLite
+from pyasync_orm.models import Model
+from pyasync_orm.orm import ORM
+
+
+class Article(Model):
+    title = fields.TextField()
+    body = fields.TextField()
+    search_vector = fields.TSVectorField(source_fields=('title', 'body'))
+
+
+class TestSearch:
+    def test_matches_order_by_rank(self):
+        orm = Article.orm.filter(
+            Article.search_vector.matches('async orm'),
+        ).order_by(Article.search_vector.rank('async orm'), '-id')
+
+        assert orm._sql.build_select() == (
+            "SELECT * FROM articles WHERE search_vector @@ "
+            "websearch_to_tsquery('english', $1) ORDER BY "
+            "ts_rank(search_vector, websearch_to_tsquery('english', $2)) DESC, id DESC",
+            ('async orm', 'async orm'),
+        )
+
+    def test_order_by_rank_then_filter(self):
+        orm = Article.orm.order_by(
+            Article.search_vector.rank('async orm'),
+        ).filter(Article.id > 1)
+
+        assert orm._sql.build_select() == (
+            "SELECT * FROM articles WHERE id > $1 ORDER BY "
+            "ts_rank(search_vector, websearch_to_tsquery('english', $2)) DESC",
+            (1, 'async orm'),
+        )
+        assert orm._sql.build_count() == (
+            'SELECT COUNT(*) AS count FROM articles WHERE id > $1',
+            (1,),
+        )
+        assert orm._sql.build_select() == orm._sql.build_select()
+
+    def test_search_vector_column(self):
+        search_vector = Article.search_vector
+        table = Table(
+            table_name='articles',
+            columns=[
+                Column(
+                    column_name='search_vector',
+                    data_type='tsvector',
+                    null=True,
+                    unique=False,
+                    primary_key=False,
+                    generated=search_vector.generated,
+                    index_method=search_vector.index_method,
+                ),
+            ],
+        )
+
+        assert PostgreSQL.get_create_table_sql(model_table=table) == (
+            'CREATE TABLE articles(search_vector tsvector GENERATED ALWAYS AS '
+            "(to_tsvector('english', coalesce(title, '') || ' ' || coalesce(body, ''))) STORED)"
+        )
+        assert PostgreSQL.get_create_indexes_sql(model_table=table) == [
+            'CREATE INDEX articles_search_vector_gin_index '
+            'ON articles USING gin (search_vector)',
+        ]
+
+    def test_sqlite_does_not_support_search(self):
+        with mock.patch.object(ORM, 'database', mock.MagicMock(management_system=SQLite)):
+            with pytest.raises(UnsupportedFeatureError, match='full-text search'):
+                Article.search_vector.data_type
@@ -0,0 +1,126 @@
+import pytest
+
+from pyasync_orm.clients.aiosqlite_client import AIOSQLiteClient
+from pyasync_orm.database import Database
+from pyasync_orm.databases.abstract_management_system import UnsupportedFeatureError
+from pyasync_orm.databases.sqlite import SQLite, Table, Column
+from pyasync_orm.sql import SQL
+
+
+@pytest.fixture
+async def client():
+    client = AIOSQLiteClient()
+    await client.create_connection_pool(database=':memory:')
+    yield client
+    await client.close_connection_pool()
+
+
+def customers_table() -> Table:
+    return Table(
+        table_name='customers',
+        columns=[
+            Column(
+                column_name='id',
+                data_type='bigint',
+                null=False,
+                unique=True,
+                primary_key=True,
+                auto_increment=True,
+            ),
+            Column(
+                column_name='first_name',
+                data_type='varchar',
+                null=True,
+                unique=True,
+                primary_key=False,
+                max_length=100,
+            ),
+        ],
+    )
+
+
+class TestSQLite:
+    def test_get_create_table_sql(self):
+        sql = SQLite.get_create_table_sql(model_table=customers_table())
+
+        assert sql == (
+            'CREATE TABLE customers('
+            'id integer PRIMARY KEY AUTOINCREMENT, '
+            'first_name varchar(100) UNIQUE)'
+        )
+
+    def test_auto_increment_not_primary_key(self):
+        column = Column(
+            column_name='number',
+            data_type='bigint',
+            null=False,
+            unique=True,
+            primary_key=False,
+            auto_increment=True,
+        )
+
+        assert str(column) == 'number bigint NOT NULL UNIQUE'
+
+    def test_placeholders(self):
+        sql = SQL(table_name='customers', placeholder_format=SQLite.placeholder_format)
+        sql.add_where(field_name='id', symbol='=', field_value=1)
+
+        assert sql.build_select() == ('SELECT * FROM customers WHERE id = ?1', (1,))
+
+    @pytest.mark.asyncio
+    async def test_from_db(self, client):
+        async with client.get_connection() as connection:
+            await connection.execute(SQLite.get_create_table_sql(customers_table()))
+            column_data = await connection.fetch(SQLite.column_data_sql('customers'))
+            index_data = await connection.fetch(SQLite.index_data_sql('customers'))
+
+        table = Table.from_db('customers', column_data, index_data)
+
+        assert [str(column) for column in table.columns] == [
+            str(column) for column in customers_table().columns
+        ]
+
+    @pytest.mark.asyncio
+    async def test_fetch_returning(self, client):
+        async with client.get_connection() as connection:
+            await connection.execute(SQLite.get_create_table_sql(customers_table()))
+            results = await connection.fetch(
+                'INSERT INTO customers (first_name) VALUES(?1) RETURNING *',
+                'Ron',
+            )
+
+        assert results == [{'id': 1, 'first_name': 'Ron'}]
+
+    @pytest.mark.asyncio
+    async def test_connect_by_name(self):
+        database = Database()
+        await database.connect(client='aiosqlite', prepare=['SELECT 1'])
+        try:
+            assert isinstance(database.client, AIOSQLiteClient)
+        finally:
+            await database.close()
+
+        with pytest.raises(ValueError):
+            await database.connect(client='mysql')
+
+    @pytest.mark.asyncio
+    async def test_copy_not_supported(self):
+        database = Database()
+        await database.connect(client='aiosqlite')
+        try:
+            with pytest.raises(UnsupportedFeatureError):
+                await database.copy_from_query('SELECT 1', output='/dev/null')
+            with pytest.raises(UnsupportedFeatureError):
+                await database.copy_to_table('customers', records=[])
+        finally:
+            await database.close()
+
+    def test_check_supports(self):
+        assert not SQLite.supports_advisory_locks
+        with pytest.raises(UnsupportedFeatureError, match='does not support materialized views'):
+            SQLite.check_supports('materialized_views')
+
+    @pytest.mark.asyncio
+    async def test_listener_not_supported(self, client):
+        with pytest.raises(UnsupportedFeatureError):
+            await client.create_listener_connection()
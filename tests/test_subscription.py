@@ -0,0 +1,77 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+
+from pyasync_orm.databases.postgresql import PostgreSQL
+from pyasync_orm.migrations.migration import Migration
+from pyasync_orm.subscription import Subscription, ChangeEvent
+
+
+class FakeListenerConnection:
+    def __init__(self):
+        self.listeners = {}
+
+    def add_termination_listener(self, callback):
+        pass
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    async def close(self):
+        pass
+
+    def notify(self, channel, operation, pk):
+        payload = json.dumps({'operation': operation, 'id': pk})
+        self.listeners[channel](self, 1, channel, payload)
+
+
+class FakeClient:
+    def __init__(self):
+        self.connection = FakeListenerConnection()
+
+    async def create_listener_connection(self):
+        return self.connection
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = FakeClient()
+
+
+class TestSubscription:
+    @pytest.mark.asyncio
+    async def test_notification(self):
+        database = FakeDatabase()
+        async with Subscription(database=database, channel='customers') as subscription:
+            next_event = asyncio.ensure_future(subscription.__anext__())
+            await asyncio.sleep(0)
+            database.client.connection.notify('customers', ChangeEvent.INSERT, 1)
+
+            event = await next_event
+
+        assert event == ChangeEvent(ChangeEvent.INSERT, 1)
+
+    def test_queue_overflow_resync(self):
+        subscription = Subscription(database=FakeDatabase(), channel='customers', max_queue_size=1)
+
+        subscription._put(ChangeEvent(ChangeEvent.INSERT, 1))
+        subscription._put(ChangeEvent(ChangeEvent.INSERT, 2))
+
+        assert subscription._queue.get_nowait() == ChangeEvent(ChangeEvent.RESYNC)
+
+    @pytest.mark.asyncio
+    async def test_notify_trigger_pk(self):
+        migration = Migration(mock.MagicMock(management_system=PostgreSQL))
+        model = mock.Mock(table_name='customers', notify_changes=True)
+        model.id.name = 'customer_id'
+
+        await migration._add_notify_trigger_sql(model, table_exists=False)
+
+        assert migration.sql[-1] == (
+            'CREATE TRIGGER customers_pyasync_orm_notify '
+            'AFTER INSERT OR UPDATE OR DELETE ON customers FOR EACH ROW EXECUTE PROCEDURE '
+            "pyasync_orm_notify('pyasync_orm_customers', 'customer_id')"
+        )
+        assert 'OLD.id' not in migration.sql[0]
@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pytest
+
+from pyasync_orm.clients.aiosqlite_client import AIOSQLiteClient
+from pyasync_orm.database import Database
+from pyasync_orm.databases.postgresql import PostgreSQL
+from pyasync_orm.tracking import QueryTracker
+
+
+@pytest.fixture
+async def database():
+    database = Database()
+    await database.connect(client=AIOSQLiteClient)
+    await database.execute('CREATE TABLE customers (id integer PRIMARY KEY)')
+    yield database
+    await database.close()
+
+
+class TestQueryTracker:
+    def test_record(self):
+        tracker = QueryTracker()
+        tracker.record('SELECT * FROM customers WHERE id = $1', (1,), 0.5)
+        tracker.record('SELECT *  FROM customers\n WHERE id = $1', (2,), 0.25)
+        tracker.record('SELECT * FROM orders', (), 0.25)
+
+        assert tracker.queries == 3
+        assert tracker.seconds == 1.0
+        [repeated] = tracker.repeated()
+        assert repeated.shape == 'SELECT * FROM customers WHERE id = $1'
+        assert repeated.count == 2
+        assert len(repeated.parameters) == 2
+
+    def test_n_plus_one(self):
+        tracker = QueryTracker(n_plus_one=2)
+        for pk in (1, 2, 2):
+            tracker.record('SELECT * FROM customers WHERE id = $1', (pk,), 0.0)
+
+        assert tracker.n_plus_one_shapes() == []
+
+        tracker.record('SELECT * FROM customers WHERE id = $1', (3,), 0.0)
+
+        assert len(tracker.n_plus_one_shapes()) == 1
+        with pytest.raises(AssertionError, match='N\\+1'):
+            tracker.check()
+
+    def test_record_unhashable(self):
+        tracker = QueryTracker()
+        tracker.record('SELECT * FROM customers WHERE id = ANY($1)', ([1, 2],), 0.0)
+        tracker.record('SELECT * FROM customers WHERE id = ANY($1)', ([1, 2],), 0.0)
+        tracker.record('SELECT * FROM customers WHERE id = ANY($1)', ([3],), 0.0)
+
+        assert len(tracker.shapes['SELECT * FROM customers WHERE id = ANY($1)'].parameters) == 2
+
+    def test_warn(self):
+        tracker = QueryTracker(max_queries=0, on_exceeded='warn')
+        tracker.record('SELECT 1', (), 0.0)
+
+        with pytest.warns(UserWarning, match='1 queries, the budget is 0'):
+            tracker.check()
+
+    @pytest.mark.asyncio
+    async def test_track(self, database):
+        with pytest.raises(AssertionError, match='3 queries, the budget is 2'):
+            async with database.track(max_queries=2) as tracker:
+                async with database.track() as inner_tracker:
+                    for pk in range(3):
+                        await database.fetch('SELECT * FROM customers WHERE id = ?1', pk)
+
+        assert tracker.queries == 3
+        assert inner_tracker.queries == 3
+
+        await database.fetch('SELECT * FROM customers')
+        assert tracker.queries == 3
+
+    @pytest.mark.asyncio
+    async def test_track_copy(self, database):
+        database.client.supports_copy = True
+        database.client.copy_to_table = mock.AsyncMock(return_value='COPY 2')
+
+        async with database.track() as tracker:
+            await database.copy_to_table('customers', records=[(1,), (2,)])
+
+        assert [shape.shape for shape in tracker.shapes.values()] == [
+            'COPY customers FROM STDIN',
+        ]
+
+    @pytest.mark.asyncio
+    async def test_track_explain(self, database):
+        database.management_system = PostgreSQL
+        database.client.fetch = mock.AsyncMock(
+            return_value=[{'QUERY PLAN': [{'Plan': {'Plan Rows': 1}}]}],
+        )
+
+        async with database.track() as tracker:
+            await database.explain('SELECT * FROM customers')
+
+        assert [shape.shape for shape in tracker.shapes.values()] == [
+            'EXPLAIN (FORMAT JSON) SELECT * FROM customers',
+        ]
@@ -0,0 +1,82 @@
+from unittest import mock
+
+import pytest
+
+from pyasync_orm import fields
+from pyasync_orm.databases.abstract_management_system import UnsupportedFeatureError
+from pyasync_orm.databases.postgresql import PostgreSQL
+from pyasync_orm.databases.sqlite import SQLite
+from pyasync_orm.migrations.migration import Migration
+from pyasync_orm.models import MaterializedView
+from tests.models import Customer
+
+
+class CustomerReport(MaterializedView):
+    first_name = fields.VarCharField(max_length=100)
+
+    @classmethod
+    def get_query(cls):
+        return Customer.orm.filter(Customer.id > 10, Customer.first_name != "O'Brien")
+
+
+class TestMaterializedView:
+    def test_get_view_sql(self):
+        assert CustomerReport.get_view_sql() == (
+            "SELECT * FROM customers WHERE id > 10 AND first_name != 'O''Brien'"
+        )
+
+    def test_get_create_materialized_view_sql(self):
+        assert PostgreSQL.get_create_materialized_view_sql(
+            view_name=CustomerReport.table_name,
+            query='SELECT * FROM customers',
+            unique_fields=CustomerReport.unique_fields,
+        ) == [
+            'CREATE MATERIALIZED VIEW customer_reports AS SELECT * FROM customers',
+            'CREATE UNIQUE INDEX customer_reports_uindex ON customer_reports (id)',
+            "COMMENT ON MATERIALIZED VIEW customer_reports IS "
+            f"'{PostgreSQL.get_query_hash('SELECT * FROM customers')}'",
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('query_hash, recreated', [
+        (PostgreSQL.get_query_hash(CustomerReport.get_view_sql()), False),
+        ('a hash of another query', True),
+        (None, True),
+    ])
+    async def test_migration_recreates_changed_view(self, query_hash, recreated):
+        database = mock.MagicMock(management_system=PostgreSQL)
+        connection = database.get_connection.return_value.__aenter__.return_value
+        connection.fetch = mock.AsyncMock(return_value=[{'query_hash': query_hash}])
+        migration = Migration(database)
+
+        await migration._add_materialized_view_sql(CustomerReport)
+
+        assert migration.sql == ([
+            'DROP MATERIALIZED VIEW customer_reports',
+            *PostgreSQL.get_create_materialized_view_sql(
+                view_name='customer_reports',
+                query=CustomerReport.get_view_sql(),
+                unique_fields=CustomerReport.unique_fields,
+            ),
+        ] if recreated else [])
+
+    def test_get_query_is_abstract(self):
+        class QuerylessReport(MaterializedView):
+            first_name = fields.VarCharField(max_length=100)
+
+        with pytest.raises(TypeError):
+            QuerylessReport.from_db({'first_name': 'Ron'})
+
+    @pytest.mark.asyncio
+    async def test_migration_not_supported(self):
+        migration = Migration(mock.MagicMock(management_system=SQLite))
+
+        with pytest.raises(UnsupportedFeatureError):
+            await migration._add_materialized_view_sql(CustomerReport)
+
+    @pytest.mark.asyncio
+    async def test_read_only(self):
+        with pytest.raises(ValueError):
+            await CustomerReport.orm.create(CustomerReport(first_name='Ron'))
+        with pytest.raises(ValueError):
+            await CustomerReport.orm.delete()